@@ -0,0 +1,91 @@
+import json
+import os
+import struct
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Tuple, Union
+
+import pandas as pd
+import pyarrow as pa
+
+# A bundle is one file holding every qscript analysis as its own Arrow IPC file:
+#
+#   MAGIC | version (u32) | padding to ALIGNMENT
+#   one Arrow IPC file per analysis, each starting at a multiple of ALIGNMENT
+#   JSON index: format, version, metadata and the offset/length of every analysis
+#   index offset (u64) | index length (u64) | MAGIC
+#
+# Segments are aligned so their buffers can be used in place from a memory map.
+BUNDLE_SUFFIX = '.qsbundle'
+BUNDLE_FORMAT = 'qscript-analyses'
+BUNDLE_VERSION = 1
+MAGIC = b'QSBUNDLE'
+ALIGNMENT = 64
+_HEADER = struct.Struct('<8sI')
+_TRAILER = struct.Struct('<QQ8s')
+
+def _pad(f, position: int) -> int:
+    padding = -position % ALIGNMENT
+    f.write(b'\0' * padding)
+    return position + padding
+
+def write_bundle(path: Union[str, Path], frames: Dict[str, pd.DataFrame], metadata: dict = None) -> Path:
+    """Write DataFrames as one bundle; the file only appears under its name once complete."""
+    path = Path(path)
+    temp_path = path.with_name(path.name + '.tmp')
+    index = {
+        'format': BUNDLE_FORMAT,
+        'version': BUNDLE_VERSION,
+        'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'metadata': metadata or {},
+        'analyses': {}
+    }
+    with open(temp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, BUNDLE_VERSION))
+        position = _pad(f, _HEADER.size)
+        for name, df in frames.items():
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            segment = sink.getvalue()
+            f.write(segment)
+            index['analyses'][name] = {'offset': position, 'length': segment.size, 'rows': table.num_rows}
+            position = _pad(f, position + segment.size)
+        encoded = json.dumps(index).encode('utf-8')
+        f.write(encoded)
+        f.write(_TRAILER.pack(position, len(encoded), MAGIC))
+    os.replace(temp_path, path)
+    return path
+
+def read_bundle(source: Union[str, Path, bytes]) -> Tuple[Dict[str, pa.Table], dict]:
+    """Tables and index of a bundle, read in place without parsing.
+
+    A path is memory-mapped, so the tables reference the mapped file; bytes (such as an
+    upload) are wrapped without copying. Raises ValueError for files that are not bundles
+    or were written by a newer version.
+    """
+    if isinstance(source, (str, Path)):
+        buffer = pa.memory_map(str(source), 'r').read_buffer()
+    else:
+        buffer = pa.py_buffer(source)
+    if buffer.size < _HEADER.size + _TRAILER.size:
+        raise ValueError("Not a qscript analysis bundle")
+    magic, version = _HEADER.unpack(buffer.slice(0, _HEADER.size).to_pybytes())
+    index_offset, index_length, end_magic = _TRAILER.unpack(
+        buffer.slice(buffer.size - _TRAILER.size).to_pybytes())
+    if magic != MAGIC or end_magic != MAGIC:
+        raise ValueError("Not a qscript analysis bundle")
+    if version > BUNDLE_VERSION:
+        raise ValueError(f"Bundle version {version} is newer than the supported version {BUNDLE_VERSION}")
+    index = json.loads(buffer.slice(index_offset, index_length).to_pybytes())
+    tables = {}
+    for name, entry in index['analyses'].items():
+        segment = buffer.slice(entry['offset'], entry['length'])
+        tables[name] = pa.ipc.open_file(segment).read_all()
+    return tables, index
+
+def read_bundle_frames(source: Union[str, Path, bytes]) -> Tuple[Dict[str, pd.DataFrame], dict]:
+    """read_bundle with every table converted to pandas; dictionary columns become categories."""
+    tables, index = read_bundle(source)
+    return {name: table.to_pandas() for name, table in tables.items()}, index
@@ -0,0 +1,132 @@
+import json
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from analyzer.sampling import confidence_interval
+
+# Label of the row that folds every class or service ranked below the top N
+OTHER_LABEL = 'Other'
+
+class DashboardAggregate:
+    """In-memory class, service and hour totals per level for one job, kept in step with log_facts.
+
+    Built once from log_facts and then updated with each committed batch's fact deltas, so
+    the dashboard payload for a new data version is a re-render of a few thousand cells
+    rather than four summary queries plus pandas pivots.
+
+    With top_n set, class and service pivots and totals keep the top_n names by total
+    count and fold the rest into one OTHER_LABEL row, so the payload stays bounded as
+    class cardinality grows.
+    """
+
+    def __init__(self, job_id: str, log_levels: List[str], estimates: bool = False, top_n: Optional[int] = None):
+        self.job_id = job_id
+        self.log_levels = list(log_levels)
+        self.estimates = estimates
+        self.top_n = top_n
+        self.version = 0
+        self.class_level: Dict[Tuple[str, str], list] = {}
+        self.service_level: Dict[Tuple[str, str], list] = {}
+        self.timeline: Dict[Tuple[str, str], list] = {}
+        self._rendered: Optional[Tuple[int, bytes]] = None
+
+    @staticmethod
+    def _add(cells: Dict[Tuple[str, str], list], key: Tuple[str, str], count, est_count, est_variance):
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = [count, est_count, est_variance]
+        else:
+            cell[0] += count
+            cell[1] += est_count
+            cell[2] += est_variance
+
+    def add_facts(self, facts: Iterable[tuple], unknown_hour: str = ''):
+        """Add (hour, service, class, level, count, est_count, est_variance) fact deltas."""
+        for hour, service, class_name, level, count, est_count, est_variance in facts:
+            est_count = count if est_count is None else est_count
+            est_variance = est_variance or 0.0
+            self._add(self.class_level, (class_name, level), count, est_count, est_variance)
+            self._add(self.service_level, (service, level), count, est_count, est_variance)
+            if hour != unknown_hour:
+                self._add(self.timeline, (hour, level), count, est_count, est_variance)
+
+    @classmethod
+    def load(cls, conn: sqlite3.Connection, job_id: str, log_levels: List[str], version: int,
+             estimates: bool = False, unknown_hour: str = '', top_n: Optional[int] = None) -> 'DashboardAggregate':
+        """Build the aggregate from the job's log_facts rows as of data_version `version`."""
+        aggregate = cls(job_id, log_levels, estimates, top_n)
+        aggregate.add_facts(conn.execute('''
+            SELECT hour, service, class, level, count, est_count, est_variance
+            FROM log_facts
+            WHERE job_id = ?
+        ''', (job_id,)), unknown_hour)
+        aggregate.version = version
+        return aggregate
+
+    def _value(self, cell: list):
+        return round(cell[1]) if self.estimates else cell[0]
+
+    def _folded(self, cells: Dict[Tuple[str, str], list]) -> Dict[Tuple[str, str], list]:
+        """Cells with every name outside the top_n by total estimated count merged into OTHER_LABEL."""
+        totals = {}
+        for (name, _), cell in cells.items():
+            totals[name] = totals.get(name, 0.0) + cell[1]
+        if self.top_n is None or len(totals) <= self.top_n:
+            return cells
+        top = set(sorted(totals, key=lambda name: (-totals[name], name))[:self.top_n])
+        folded = {}
+        for (name, level), (count, est_count, est_variance) in cells.items():
+            self._add(folded, (name if name in top else OTHER_LABEL, level), count, est_count, est_variance)
+        return folded
+
+    def _pivot(self, cells: Dict[Tuple[str, str], list], key: str) -> Dict[str, list]:
+        """Columnar pivot with one row per class or service and one column per log level."""
+        cells = self._folded(cells)
+        names = sorted({name for name, _ in cells})
+        levels = self.log_levels + sorted({level for _, level in cells} - set(self.log_levels))
+        pivot = {key: names}
+        for level in levels:
+            pivot[level] = [self._value(cells[(name, level)]) if (name, level) in cells else 0 for name in names]
+        return pivot
+
+    def _totals(self, cells: Dict[Tuple[str, str], list], key: str) -> Dict[str, list]:
+        totals = {}
+        for (name, _), cell in self._folded(cells).items():
+            total = totals.setdefault(name, [0, 0.0, 0.0])
+            for i in range(3):
+                total[i] += cell[i]
+        names = sorted(totals)
+        result = {key: names, 'count': [self._value(totals[name]) for name in names]}
+        if self.estimates:
+            result['ci'] = [round(confidence_interval(totals[name][2])) for name in names]
+        return result
+
+    def _timeline(self) -> Dict[str, list]:
+        keys = sorted(self.timeline)
+        result = {
+            'hour': [hour for hour, _ in keys],
+            'level': [level for _, level in keys],
+            'count': [self._value(self.timeline[key]) for key in keys]
+        }
+        if self.estimates:
+            result['ci'] = [round(confidence_interval(self.timeline[key][2])) for key in keys]
+        return result
+
+    def payload(self) -> dict:
+        """Complete dashboard data: hourly timeline, class/service pivots and totals, all columnar."""
+        return {
+            'job_id': self.job_id,
+            'data_version': self.version,
+            'estimates': self.estimates,
+            'timeline': self._timeline(),
+            'class_pivot': self._pivot(self.class_level, 'class'),
+            'service_pivot': self._pivot(self.service_level, 'service'),
+            'class_totals': self._totals(self.class_level, 'class'),
+            'service_totals': self._totals(self.service_level, 'service')
+        }
+
+    def render(self) -> bytes:
+        """JSON-encoded payload, serialized once per data version."""
+        if self._rendered is None or self._rendered[0] != self.version:
+            self._rendered = (self.version, json.dumps(self.payload()).encode('utf-8'))
+        return self._rendered[1]
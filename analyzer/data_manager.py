@@ -2,10 +2,17 @@ import sqlite3
 import pandas as pd
 import logging
 import os
+import functools
 import xlsxwriter
 import streamlit as st
 import time
-from datetime import datetime
+import yaml
+from datetime import datetime, timedelta
+from analyzer.dashboard import OTHER_LABEL
+from analyzer.db import DB_PATH, ReadPool, connect
+from analyzer.dimensions import LOG_DIMENSIONS
+from analyzer.query_cache import MISSING, QueryCache
+from analyzer.sampling import confidence_interval
 
 # Configure logging
 logging.basicConfig(
@@ -15,11 +22,121 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Hour bucket of fact rows whose timestamp was missing or unparseable
+UNKNOWN_HOUR = ''
+
+# Summary views derived from log_facts; they replace the tables of the same names
+SUMMARY_VIEWS = {
+    'class_level_counts': """
+        SELECT job_id, class, level, SUM(count) AS count, SUM(est_count) AS est_count, SUM(est_variance) AS est_variance
+        FROM log_facts
+        GROUP BY job_id, class, level
+    """,
+    'service_level_counts': """
+        SELECT job_id, service, level, SUM(count) AS count, SUM(est_count) AS est_count, SUM(est_variance) AS est_variance
+        FROM log_facts
+        GROUP BY job_id, service, level
+    """,
+    'timeline_counts': f"""
+        SELECT job_id, hour, level, SUM(count) AS count, SUM(est_count) AS est_count, SUM(est_variance) AS est_variance
+        FROM log_facts
+        WHERE hour != '{UNKNOWN_HOUR}'
+        GROUP BY job_id, hour, level
+    """,
+    'class_service_counts': """
+        SELECT job_id, class, service, SUM(count) AS count, SUM(est_count) AS est_count, SUM(est_variance) AS est_variance
+        FROM log_facts
+        GROUP BY job_id, class, service
+    """
+}
+
+# Dimensions of log_facts that can be filtered and grouped by
+FACT_DIMENSIONS = ('hour', 'service', 'class', 'level')
+
+def _add_missing_columns(cursor: sqlite3.Cursor, table: str, columns: dict):
+    """Add columns introduced after a table was first created; returns the names that were added."""
+    existing = {row[1] for row in cursor.execute(f'PRAGMA table_info({table})')}
+    added = []
+    for name, definition in columns.items():
+        if name not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN {name} {definition}')
+            added.append(name)
+    return added
+
+def _hour_key_sql(wall_time: str) -> str:
+    """SQL hour key of a 'YYYY-MM-DD HH:MM:SS' expression, or UNKNOWN_HOUR when it is not a real time.
+
+    SQLite rolls dates such as Feb 30 or hour 24 over into the next month or day instead of
+    rejecting them, so a time is valid only when the round trip gives it back unchanged.
+    """
+    return (f"CASE WHEN datetime(julianday({wall_time})) = {wall_time} "
+            f"THEN substr({wall_time}, 1, 13) || ':00:00' ELSE '{UNKNOWN_HOUR}' END")
+
+# Wall time of an Apache-like '%d/%b/%Y:%H:%M:%S %z' logtime, as 'YYYY-MM-DD HH:MM:SS'
+_APACHE_WALL_TIME = ("printf('%s-%02d-%s %s', substr(timestamp, 8, 4), "
+                     "(instr('JanFebMarAprMayJunJulAugSepOctNovDec', substr(timestamp, 4, 3)) + 2) / 3, "
+                     "substr(timestamp, 1, 2), substr(timestamp, 13, 8))")
+
+# Hour key of a logs.timestamp in SQL, matching LogProcessor.time_keys for the formats
+# parse_log_timestamp accepts ('%Y-%m-%d %H:%M:%S' with optional ',%f', and
+# '%d/%b/%Y:%H:%M:%S %z' keyed by its wall time); UNKNOWN_HOUR otherwise
+HOUR_KEY_SQL = f"""
+    CASE
+        WHEN timestamp GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+             OR (timestamp GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9],[0-9]*'
+                 AND length(timestamp) <= 26 AND substr(timestamp, 21) NOT GLOB '*[^0-9]*')
+        THEN {_hour_key_sql('substr(timestamp, 1, 19)')}
+        WHEN timestamp GLOB '[0-9][0-9]/[A-Z][a-z][a-z]/[0-9][0-9][0-9][0-9]:[0-9][0-9]:[0-9][0-9]:[0-9][0-9] [+-][0-9][0-9][0-9][0-9]'
+             AND instr('JanFebMarAprMayJunJulAugSepOctNovDec', substr(timestamp, 4, 3)) % 3 = 1
+        THEN {_hour_key_sql(_APACHE_WALL_TIME)}
+        ELSE '{UNKNOWN_HOUR}'
+    END
+"""
+
+def _migrate_summary_tables(cursor: sqlite3.Cursor):
+    """Rebuild log_facts from the logs table when the database still has the old summary tables.
+
+    The old tables cannot be combined back into the cube, so every stored log row is
+    re-aggregated, in one INSERT ... SELECT so SQLite streams the rows instead of Python
+    holding them. Sampled jobs keep their scale factor, taken from the old estimates.
+    """
+    legacy = [row[0] for row in cursor.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ({})".format(
+            ', '.join('?' * len(SUMMARY_VIEWS))), list(SUMMARY_VIEWS))]
+    if not legacy:
+        return
+    logger.info(f"Migrating summary tables {legacy} to log_facts")
+    weights = "SELECT NULL AS job_id, 1.0 AS weight WHERE 0"
+    if 'class_level_counts' in legacy:
+        columns = {row[1] for row in cursor.execute('PRAGMA table_info(class_level_counts)')}
+        if 'est_count' in columns:
+            weights = """
+                SELECT job_id, SUM(COALESCE(est_count, count)) * 1.0 / NULLIF(SUM(count), 0) AS weight
+                FROM class_level_counts
+                GROUP BY job_id
+            """
+    
+    # estimate_variance(count, weight) is count * weight * (weight - 1)
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO log_facts (job_id, hour, service, class, level, count, est_count, est_variance)
+        SELECT l.job_id, {HOUR_KEY_SQL} AS hour_key, l.service, l.class, l.level, COUNT(*),
+               COUNT(*) * COALESCE(w.weight, 1.0),
+               COUNT(*) * COALESCE(w.weight, 1.0) * (COALESCE(w.weight, 1.0) - 1.0)
+        FROM logs l
+        LEFT JOIN ({weights}) w ON w.job_id = l.job_id
+        GROUP BY l.job_id, hour_key, l.service, l.class, l.level
+    ''')
+    rebuilt = cursor.rowcount
+    for table in legacy:
+        cursor.execute(f'DROP TABLE {table}')
+    logger.info(f"Rebuilt {rebuilt} log_facts rows from the logs table")
+
+
 def init_db():
     """Initialize SQLite database with jobs, logs, metadata, and summary tables."""
     try:
         os.makedirs('data', exist_ok=True)
-        conn = sqlite3.connect('data/logs.db', timeout=30)
+        conn = connect(DB_PATH)
         cursor = conn.cursor()
         
         # Optimize SQLite settings
@@ -37,7 +154,13 @@ def init_db():
                 total_files INTEGER,
                 start_time TEXT,
                 last_updated TEXT,
-                current_file TEXT
+                current_file TEXT,
+                mode TEXT DEFAULT 'full',
+                sample_rate REAL,
+                sample_method TEXT,
+                sample_unit TEXT,
+                sample_size INTEGER,
+                data_version INTEGER DEFAULT 0
             )
         ''')
         
@@ -54,6 +177,10 @@ def init_db():
                 folder TEXT,
                 file_name TEXT,
                 line_idx INTEGER,
+                pod_id INTEGER,
+                host_id INTEGER,
+                container_id INTEGER,
+                thread_id INTEGER,
                 FOREIGN KEY (job_id) REFERENCES jobs (job_id)
             )
         ''')
@@ -68,44 +195,147 @@ def init_db():
             )
         ''')
         
-        # Summary tables
+        # Fact cube every summary view is derived from: one row per (job, hour, service, class, level)
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS class_level_counts (
+            CREATE TABLE IF NOT EXISTS log_facts (
                 job_id TEXT,
+                hour TEXT,
+                service TEXT,
                 class TEXT,
                 level TEXT,
                 count INTEGER,
-                PRIMARY KEY (job_id, class, level)
-            )
+                est_count REAL,
+                est_variance REAL DEFAULT 0,
+                PRIMARY KEY (job_id, hour, service, class, level)
+            ) WITHOUT ROWID
         ''')
+        _migrate_summary_tables(cursor)
+        for name, sql in SUMMARY_VIEWS.items():
+            cursor.execute(f'CREATE VIEW IF NOT EXISTS {name} AS {sql}')
+        
+        # Minute buckets for zooming into incidents; hour and day views are rolled up from log_facts
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS service_level_counts (
+            CREATE TABLE IF NOT EXISTS timeline_minute_counts (
                 job_id TEXT,
-                service TEXT,
+                minute TEXT,
                 level TEXT,
                 count INTEGER,
-                PRIMARY KEY (job_id, service, level)
+                est_count REAL,
+                est_variance REAL DEFAULT 0,
+                PRIMARY KEY (job_id, minute, level)
             )
         ''')
+        
+        # Heavy-hitter message templates per class and level, merged after every file
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS timeline_counts (
+            CREATE TABLE IF NOT EXISTS message_topk (
                 job_id TEXT,
-                hour TEXT,
+                class TEXT,
                 level TEXT,
-                count INTEGER,
-                PRIMARY KEY (job_id, hour, level)
+                message TEXT,
+                count REAL,
+                error REAL,
+                example TEXT,
+                PRIMARY KEY (job_id, class, level, message)
             )
         ''')
+        
+        # Pod, host, container and thread values, stored once and referenced by id from logs and the rollups
         cursor.execute('''
-            CREATE TABLE IF NOT EXISTS class_service_counts (
+            CREATE TABLE IF NOT EXISTS dimension_values (
+                id INTEGER PRIMARY KEY,
+                dimension TEXT,
+                value TEXT,
+                UNIQUE(dimension, value)
+            )
+        ''')
+        
+        # Per-level counts of every dimension value, upserted with each batch like log_facts
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS dimension_level_counts (
                 job_id TEXT,
-                class TEXT,
-                service TEXT,
+                value_id INTEGER,
+                level TEXT,
                 count INTEGER,
-                PRIMARY KEY (job_id, class, service)
+                est_count REAL,
+                est_variance REAL DEFAULT 0,
+                PRIMARY KEY (job_id, value_id, level)
+            ) WITHOUT ROWID
+        ''')
+        for dimension in LOG_DIMENSIONS:
+            cursor.execute(f'''
+                CREATE VIEW IF NOT EXISTS {dimension}_level_counts AS
+                SELECT r.job_id, d.value AS {dimension}, r.level, r.count, r.est_count, r.est_variance
+                FROM dimension_level_counts r
+                JOIN dimension_values d ON d.id = r.value_id
+                WHERE d.dimension = '{dimension}'
+            ''')
+        
+        # Dimension ids added to databases created before them; older rows keep NULL
+        _add_missing_columns(cursor, 'logs', {f'{dimension}_id': 'INTEGER' for dimension in LOG_DIMENSIONS})
+        
+        # Sampling and data version columns added to databases created before them
+        _add_missing_columns(cursor, 'jobs', {
+            'mode': "TEXT DEFAULT 'full'",
+            'sample_rate': 'REAL',
+            'sample_method': 'TEXT',
+            'sample_unit': 'TEXT',
+            'sample_size': 'INTEGER',
+            'data_version': 'INTEGER DEFAULT 0'
+        })
+        
+        # Ingestion stage timings, per file and accumulated per job
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_stats (
+                job_id TEXT,
+                file_path TEXT,
+                lines INTEGER,
+                bytes_decompressed INTEGER,
+                decompress_seconds REAL,
+                decode_seconds REAL,
+                timestamp_seconds REAL,
+                raw_insert_seconds REAL,
+                summary_seconds REAL,
+                sketch_seconds REAL DEFAULT 0,
+                metadata_seconds REAL,
+                commit_seconds REAL,
+                total_seconds REAL,
+                PRIMARY KEY (job_id, file_path)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_stats (
+                job_id TEXT PRIMARY KEY,
+                files INTEGER,
+                lines INTEGER,
+                bytes_decompressed INTEGER,
+                decompress_seconds REAL,
+                decode_seconds REAL,
+                timestamp_seconds REAL,
+                raw_insert_seconds REAL,
+                summary_seconds REAL,
+                sketch_seconds REAL DEFAULT 0,
+                metadata_seconds REAL,
+                commit_seconds REAL,
+                total_seconds REAL
+            )
+        ''')
+        
+        # Last committed line of files being ingested, so a file processed again resumes after it
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_progress (
+                job_id TEXT,
+                file_path TEXT,
+                line_idx INTEGER,
+                lines INTEGER,
+                PRIMARY KEY (job_id, file_path)
             )
         ''')
         
+        # Stages split out of the timings after the tables were first created
+        for table in ('file_stats', 'job_stats'):
+            _add_missing_columns(cursor, table, {'sketch_seconds': 'REAL DEFAULT 0'})
+        
         # Optimized indexes
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_job_id ON logs (job_id)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_class ON logs (class)')
@@ -117,10 +347,11 @@ def init_db():
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_job_id_class_timestamp_level ON logs (job_id, class, timestamp, level)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_logs_job_id_service_timestamp_level ON logs (job_id, service, timestamp, level)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_job_metadata_job_id_type ON job_metadata (job_id, type)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_class_level_counts_job_id ON class_level_counts (job_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_service_level_counts_job_id ON service_level_counts (job_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_timeline_counts_job_id ON timeline_counts (job_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_class_service_counts_job_id ON class_service_counts (job_id)')
+        # Covering indexes so class- and service-first views and slices never touch the table
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_log_facts_job_id_class ON log_facts '
+                       '(job_id, class, level, service, hour, count, est_count, est_variance)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_log_facts_job_id_service ON log_facts '
+                       '(job_id, service, level, class, hour, count, est_count, est_variance)')
         
         conn.commit()
         conn.close()
@@ -132,11 +363,103 @@ def init_db():
         logger.error(f"Error initializing database: {str(e)}")
         raise
 
-@st.cache_data(hash_funcs={str: lambda x: x})
+# Query cache budget used when config.yaml has no cache.max_mb setting
+DEFAULT_CACHE_MB = 256
+
+def _config_section(name: str) -> dict:
+    """One top-level section of config/config.yaml, or {} if the file or section is missing."""
+    try:
+        with open('config/config.yaml', 'r') as f:
+            return (yaml.safe_load(f) or {}).get(name) or {}
+    except (OSError, yaml.YAMLError) as e:
+        logger.warning(f"Using defaults for config section '{name}': {str(e)}")
+        return {}
+
+@st.cache_resource
+def get_query_cache() -> QueryCache:
+    """Process-wide query result cache shared by all Streamlit sessions."""
+    max_mb = _config_section('cache').get('max_mb', DEFAULT_CACHE_MB)
+    logger.info(f"Query cache budget: {max_mb} MB")
+    return QueryCache(int(max_mb * 1024 * 1024))
+
+@st.cache_resource
+def get_read_pool() -> ReadPool:
+    """Process-wide pool of read-only database connections shared by all Streamlit sessions."""
+    settings = _config_section('database')
+    logger.info(f"Read connection pool settings: {settings}")
+    return ReadPool(DB_PATH,
+                    size=settings.get('read_pool_size', 4),
+                    mmap_mb=settings.get('mmap_mb', 256),
+                    cache_mb=settings.get('cache_mb', 64))
+
+def read_connection():
+    """Borrow a pooled read-only connection; close() returns it to the pool."""
+    return get_read_pool().acquire()
+
+def read_snapshot():
+    """Context manager under which every read on this thread sees the same committed batch."""
+    return get_read_pool().snapshot()
+
+def get_data_version(job_id: str) -> int:
+    """Current data_version of a job; it advances with every batch the backend commits."""
+    try:
+        conn = read_connection()
+        row = conn.execute("SELECT data_version FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        conn.close()
+        return row[0] or 0 if row else 0
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error fetching data version for job_id {job_id}: {str(e)}")
+        return 0
+
+def _freeze(value):
+    """Hashable form of a query argument (lists of classes, services and levels become tuples)."""
+    if isinstance(value, (list, tuple, set)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+class _Uncached:
+    """Fallback result of a versioned_cache reader that is returned but not cached, e.g. after a database error."""
+
+    def __init__(self, value):
+        self.value = value
+
+def versioned_cache(func):
+    """Cache a job reader in the shared query cache under (job_id, data_version, query, arguments).
+
+    The reader's first argument must be the job_id. Results for a running job are dropped as
+    soon as its data_version advances, and `reader.clear()` drops every cached result of that reader.
+    The version and the result are read from one snapshot, so a cached result always matches its version.
+    A reader returns its error fallback wrapped in _Uncached, so a failed query is retried on the next call
+    instead of serving that fallback until the job's data_version advances, which for a finished job is never.
+    """
+    query = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(job_id: str, *args, **kwargs):
+        cache = get_query_cache()
+        with read_snapshot():
+            key = (job_id, get_data_version(job_id), query, _freeze(args),
+                   tuple(sorted((name, _freeze(value)) for name, value in kwargs.items())))
+            value = cache.get(key)
+            if value is MISSING:
+                value = func(job_id, *args, **kwargs)
+                if isinstance(value, _Uncached):
+                    return value.value
+                cache.put(key, value)
+        return value
+
+    wrapper.clear = lambda: get_query_cache().invalidate(query=query)
+    return wrapper
+
+def clear_query_cache(job_id: str = None):
+    """Drop cached query results for one job, or for all jobs."""
+    get_query_cache().invalidate(job_id=job_id)
+
+@versioned_cache
 def get_job_metadata(job_id: str):
     """Fetch unique classes and services for a job from job_metadata table, cached."""
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=30)
+        conn = read_connection()
         classes = pd.read_sql_query(
             "SELECT value FROM job_metadata WHERE job_id = ? AND type = 'class'",
             conn,
@@ -157,7 +480,7 @@ def get_job_metadata(job_id: str):
             'message': f"Database error fetching metadata: {str(e)}",
             'timestamp': time.time()
         })
-        return [], []
+        return _Uncached(([], []))
     except Exception as e:
         logger.error(f"Error fetching metadata for job_id {job_id}: {str(e)}")
         st.session_state.notifications.append({
@@ -165,13 +488,13 @@ def get_job_metadata(job_id: str):
             'message': f"Error fetching metadata: {str(e)}",
             'timestamp': time.time()
         })
-        return [], []
+        return _Uncached(([], []))
 
-@st.cache_data(hash_funcs={str: lambda x: x})
+@versioned_cache
 def get_logs_by_class_and_level(job_id: str, class_name: str, level: str, page: int, logs_per_page: int, search_query: str = None, use_regex: bool = False):
     """Retrieve logs by class and level from SQLite, cached."""
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=30)
+        conn = read_connection()
         cursor = conn.cursor()
         offset = (page - 1) * logs_per_page
         
@@ -265,11 +588,11 @@ def get_logs_by_class_and_level(job_id: str, class_name: str, level: str, page:
         })
         raise
 
-@st.cache_data(hash_funcs={str: lambda x: x})
+@versioned_cache
 def get_logs_by_service_and_level(job_id: str, service_name: str, level: str, page: int, logs_per_page: int, search_query: str = None, use_regex: bool = False):
     """Retrieve logs by service and level from SQLite, cached."""
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=30)
+        conn = read_connection()
         cursor = conn.cursor()
         offset = (page - 1) * logs_per_page
         
@@ -363,29 +686,29 @@ def get_logs_by_service_and_level(job_id: str, service_name: str, level: str, pa
         })
         raise
 
-@st.cache_data(hash_funcs={str: lambda x: x})
+@versioned_cache
 def _fetch_analysis_data(job_id: str, query_type: str) -> pd.DataFrame:
     """Fetch analysis data for a specific query type from summary tables."""
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=30)
+        conn = read_connection()
         
         if query_type == 'class':
             df = pd.read_sql_query("""
-                SELECT class, level, count
+                SELECT class, level, count, est_count, est_variance
                 FROM class_level_counts
                 WHERE job_id = ?
             """, conn, params=[job_id])
         
         elif query_type == 'service':
             df = pd.read_sql_query("""
-                SELECT service, level, count
+                SELECT service, level, count, est_count, est_variance
                 FROM service_level_counts
                 WHERE job_id = ?
             """, conn, params=[job_id])
         
         elif query_type == 'timeline':
             df = pd.read_sql_query("""
-                SELECT hour, level, count
+                SELECT hour, level, count, est_count, est_variance
                 FROM timeline_counts
                 WHERE job_id = ?
                 ORDER BY hour
@@ -397,7 +720,7 @@ def _fetch_analysis_data(job_id: str, query_type: str) -> pd.DataFrame:
         
         elif query_type == 'class_service':
             df = pd.read_sql_query("""
-                SELECT class, service, count
+                SELECT class, service, count, est_count, est_variance
                 FROM class_service_counts
                 WHERE job_id = ?
             """, conn, params=[job_id])
@@ -409,27 +732,293 @@ def _fetch_analysis_data(job_id: str, query_type: str) -> pd.DataFrame:
         
         if df.empty:
             if query_type == 'class':
-                df = pd.DataFrame(columns=['class', 'level', 'count'])
+                df = pd.DataFrame(columns=['class', 'level', 'count', 'est_count', 'est_variance'])
             elif query_type == 'service':
-                df = pd.DataFrame(columns=['service', 'level', 'count'])
+                df = pd.DataFrame(columns=['service', 'level', 'count', 'est_count', 'est_variance'])
             elif query_type == 'timeline':
-                df = pd.DataFrame(columns=['hour', 'level', 'count'])
+                df = pd.DataFrame(columns=['hour', 'level', 'count', 'est_count', 'est_variance'])
             elif query_type == 'class_service':
-                df = pd.DataFrame(columns=['class', 'service', 'count'])
+                df = pd.DataFrame(columns=['class', 'service', 'count', 'est_count', 'est_variance'])
         
         logger.info(f"Retrieved {query_type} data for job_id: {job_id}, rows: {len(df)}")
         return df
     
     except sqlite3.OperationalError as e:
         logger.error(f"Database error retrieving {query_type} data for job_id {job_id}: {str(e)}")
-        return pd.DataFrame()
+        return _Uncached(pd.DataFrame())
     except Exception as e:
         logger.error(f"Error retrieving {query_type} data for job_id {job_id}: {str(e)}")
-        return pd.DataFrame()
+        return _Uncached(pd.DataFrame())
+
+def get_job_stats(job_id: str) -> dict:
+    """Fetch accumulated ingestion stage timings for a job, or an empty dict if none were recorded."""
+    try:
+        conn = read_connection()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("SELECT * FROM job_stats WHERE job_id = ?", (job_id,)).fetchone()
+        conn.close()
+        return dict(row) if row else {}
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error fetching stats for job_id {job_id}: {str(e)}")
+        return {}
+
+@versioned_cache
+def get_top_messages(job_id: str, class_name: str = None, level: str = None, limit: int = 20) -> pd.DataFrame:
+    """Fetch the most frequent normalized messages for a job, optionally for one class and/or level.
+
+    count over-estimates the true frequency by at most error (Space-Saving guarantee).
+    """
+    query = """
+        SELECT class, level, message, count, error, example
+        FROM message_topk
+        WHERE job_id = ?
+    """
+    params = [job_id]
+    if class_name:
+        query += " AND class = ?"
+        params.append(class_name)
+    if level:
+        query += " AND level = ?"
+        params.append(level)
+    query += " ORDER BY count DESC LIMIT ?"
+    params.append(limit)
+    try:
+        conn = read_connection()
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        return df
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error fetching top messages for job_id {job_id}: {str(e)}")
+        return _Uncached(pd.DataFrame(columns=['class', 'level', 'message', 'count', 'error', 'example']))
+
+def get_job_sampling(job_id: str) -> dict:
+    """Fetch the sampling settings a job was started with; mode is 'full' for exact jobs.
+
+    applied_rate is the share of lines the job actually ingested so far (sampled over
+    estimated count), which for file sampling differs from the requested rate when the
+    file count does not divide evenly; None before any line is committed.
+    """
+    try:
+        conn = read_connection()
+        conn.row_factory = sqlite3.Row
+        row = conn.execute("""
+            SELECT mode, sample_rate, sample_method, sample_unit, sample_size
+            FROM jobs
+            WHERE job_id = ?
+        """, (job_id,)).fetchone()
+        if row and row['mode'] == 'sample':
+            sampled, estimated = conn.execute(
+                'SELECT SUM(count), SUM(est_count) FROM log_facts WHERE job_id = ?', (job_id,)).fetchone()
+            conn.close()
+            return dict(row, applied_rate=sampled / estimated if sampled and estimated else None)
+        conn.close()
+        return {'mode': 'full'}
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error fetching sampling settings for job_id {job_id}: {str(e)}")
+        return {'mode': 'full'}
 
 def get_analysis_data(job_id: str, query_type: str) -> pd.DataFrame:
-    """Retrieve analysis data for a job."""
-    return _fetch_analysis_data(job_id, query_type)
+    """Retrieve analysis data for a job.
+
+    For sampled jobs 'count' holds the estimated count for the whole job and the
+    'variance' and 'ci' columns carry its variance and 95% confidence half-width.
+    """
+    return _apply_estimates(_fetch_analysis_data(job_id, query_type), job_id)
+
+def _apply_estimates(df: pd.DataFrame, job_id: str) -> pd.DataFrame:
+    """Replace sampled counts with job-wide estimates and confidence intervals for sampled jobs."""
+    if df.empty or 'est_count' not in df.columns:
+        return df
+    df = df.copy()
+    if get_job_sampling(job_id)['mode'] == 'sample':
+        df['count'] = df['est_count'].fillna(df['count']).round().astype('int64')
+        df['variance'] = df['est_variance'].fillna(0.0)
+        df['ci'] = df['variance'].map(confidence_interval).round().astype('int64')
+    return df.drop(columns=['est_count', 'est_variance'])
+
+# Timeline resolutions from finest to coarsest, with their bucket width in seconds
+TIMELINE_RESOLUTIONS = (('minute', 60), ('hour', 3600), ('day', 86400))
+
+def pick_resolution(start: datetime, end: datetime, max_points: int) -> str:
+    """Finest resolution whose bucket count over [start, end] stays within max_points per level."""
+    span = max((end - start).total_seconds(), 0)
+    for resolution, seconds in TIMELINE_RESOLUTIONS:
+        if span / seconds <= max_points:
+            return resolution
+    return TIMELINE_RESOLUTIONS[-1][0]
+
+def get_time_range(job_id: str):
+    """First and last hour bucket of a job as datetimes, or (None, None) if it has no timeline."""
+    try:
+        conn = read_connection()
+        first, last = conn.execute(
+            "SELECT MIN(hour), MAX(hour) FROM timeline_counts WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        conn.close()
+        if not first:
+            return None, None
+        return datetime.strptime(first, '%Y-%m-%d %H:%M:%S'), datetime.strptime(last, '%Y-%m-%d %H:%M:%S')
+    except (sqlite3.OperationalError, ValueError) as e:
+        logger.error(f"Error fetching time range for job_id {job_id}: {str(e)}")
+        return None, None
+
+@versioned_cache
+def get_timeline(job_id: str, start: datetime = None, end: datetime = None, max_points: int = 1500):
+    """Fetch level counts over [start, end] at the finest resolution that keeps the point count bounded.
+
+    Returns (DataFrame with time, level, count columns, resolution). Day buckets are rolled up
+    from the hour table in SQL; jobs ingested before minute buckets existed fall back to hours.
+    """
+    if start is None or end is None:
+        first, last = get_time_range(job_id)
+        start = start or first
+        # The last hour bucket covers the full hour after its label
+        end = end or (last + timedelta(hours=1) - timedelta(seconds=1) if last else None)
+    if start is None or end is None:
+        return pd.DataFrame(columns=['time', 'level', 'count']), 'hour'
+    resolution = pick_resolution(start, end, max_points)
+    queries = {
+        'minute': """
+            SELECT minute AS time, level, count, est_count, est_variance
+            FROM timeline_minute_counts
+            WHERE job_id = ? AND minute >= ? AND minute <= ?
+            ORDER BY minute
+        """,
+        'hour': """
+            SELECT hour AS time, level, count, est_count, est_variance
+            FROM timeline_counts
+            WHERE job_id = ? AND hour >= ? AND hour <= ?
+            ORDER BY hour
+        """,
+        'day': """
+            SELECT substr(hour, 1, 10) || ' 00:00:00' AS time, level, SUM(count) AS count,
+                   SUM(COALESCE(est_count, count)) AS est_count, SUM(est_variance) AS est_variance
+            FROM timeline_counts
+            WHERE job_id = ? AND hour >= ? AND hour <= ?
+            GROUP BY time, level
+            ORDER BY time
+        """
+    }
+    # Hour and day buckets are labeled by their start, so widen the lower bound to the enclosing bucket
+    lower = {
+        'minute': start.strftime('%Y-%m-%d %H:%M:00'),
+        'hour': start.strftime('%Y-%m-%d %H:00:00'),
+        'day': start.strftime('%Y-%m-%d 00:00:00')
+    }
+    upper = end.strftime('%Y-%m-%d %H:%M:%S')
+    try:
+        conn = read_connection()
+        df = pd.read_sql_query(queries[resolution], conn, params=[job_id, lower[resolution], upper])
+        if df.empty and resolution == 'minute':
+            resolution = 'hour'
+            df = pd.read_sql_query(queries[resolution], conn, params=[job_id, lower[resolution], upper])
+        conn.close()
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error fetching {resolution} timeline for job_id {job_id}: {str(e)}")
+        return _Uncached((pd.DataFrame(columns=['time', 'level', 'count']), resolution))
+    df['time'] = pd.to_datetime(df['time'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    df = df.dropna(subset=['time'])
+    logger.debug(f"Fetched {len(df)} {resolution} timeline rows for job_id: {job_id}")
+    return _apply_estimates(df, job_id), resolution
+
+@versioned_cache
+def get_fact_slice(job_id: str, group_by: list, services: list = None, classes: list = None,
+                   levels: list = None, start: datetime = None, end: datetime = None) -> pd.DataFrame:
+    """Slice log_facts by service, class, level and hour window, and aggregate by any dimensions.
+
+    e.g. ERRORs for one service between 02:00 and 04:00 by class:
+    get_fact_slice(job_id, ['class'], services=['ecm'], levels=['ERROR'], start=..., end=...)
+    """
+    group_by = [dimension for dimension in group_by if dimension in FACT_DIMENSIONS]
+    where = ["job_id = ?"]
+    params = [job_id]
+    for column, values in (('service', services), ('class', classes), ('level', levels)):
+        if values:
+            where.append(f"{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+    if start or end or 'hour' in group_by:
+        where.append(f"hour != '{UNKNOWN_HOUR}'")
+    if start:
+        where.append("hour >= ?")
+        params.append(start.strftime('%Y-%m-%d %H:00:00'))
+    if end:
+        where.append("hour <= ?")
+        params.append(end.strftime('%Y-%m-%d %H:%M:%S'))
+    columns = ', '.join(group_by + ['SUM(count) AS count', 'SUM(est_count) AS est_count',
+                                    'SUM(est_variance) AS est_variance'])
+    query = f"SELECT {columns} FROM log_facts WHERE {' AND '.join(where)}"
+    if group_by:
+        query += f" GROUP BY {', '.join(group_by)} ORDER BY {'hour' if 'hour' in group_by else 'count DESC'}"
+    try:
+        conn = read_connection()
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error slicing log_facts for job_id {job_id}: {str(e)}")
+        return _Uncached(pd.DataFrame(columns=group_by + ['count']))
+    df = df.dropna(subset=['count'])
+    if 'hour' in df.columns:
+        df['hour'] = pd.to_datetime(df['hour'], format='%Y-%m-%d %H:%M:%S', errors='coerce')
+    logger.debug(f"Sliced {len(df)} fact rows for job_id: {job_id}, group_by={group_by}")
+    return _apply_estimates(df, job_id)
+
+# Per-level views the top-N queries rank classes, services, pods, hosts, containers and threads in
+TOP_N_VIEWS = {'class': 'class_level_counts', 'service': 'service_level_counts'}
+TOP_N_VIEWS.update({dimension: f'{dimension}_level_counts' for dimension in LOG_DIMENSIONS})
+
+@versioned_cache
+def get_top_n(job_id: str, dimension: str, n: int = 20, offset: int = 0, level: str = None) -> pd.DataFrame:
+    """Per-level counts of the classes, services or pods (any TOP_N_VIEWS key) ranked offset+1 .. offset+n by total count.
+
+    Everything ranked below that is folded into one OTHER_LABEL row per level, so the result
+    has at most (n + 1) x levels rows however many classes a job has; those rows all rank
+    offset+n+1, after every named row of any level. Ranks up to offset are
+    left out, which lets the dashboard drill into "Other" a page at a time. With a level,
+    only that level is ranked and returned, e.g. the pods logging the most ERRORs. Columns:
+    the dimension, level, count, rank and members (names folded into the row).
+    """
+    if dimension not in TOP_N_VIEWS:
+        raise ValueError(f"Invalid dimension: {dimension}")
+    view = TOP_N_VIEWS[dimension]
+    level_params = [level] if level else []
+    query = f"""
+        WITH ranked AS (
+            SELECT {dimension} AS name, ROW_NUMBER() OVER (ORDER BY SUM(est_count) DESC, {dimension}) AS rank
+            FROM {view}
+            WHERE job_id = ? {'AND level = ?' if level else ''}
+            GROUP BY {dimension}
+        )
+        SELECT CASE WHEN r.rank <= ? THEN v.{dimension} ELSE ? END AS {dimension},
+               v.level,
+               MIN(CASE WHEN r.rank <= ? THEN r.rank ELSE ? END) AS rank,
+               COUNT(DISTINCT v.{dimension}) AS members,
+               SUM(v.count) AS count,
+               SUM(v.est_count) AS est_count,
+               SUM(v.est_variance) AS est_variance
+        FROM {view} v
+        JOIN ranked r ON r.name = v.{dimension}
+        WHERE v.job_id = ? AND r.rank > ? {'AND v.level = ?' if level else ''}
+        GROUP BY 1, v.level
+        ORDER BY rank, v.level
+    """
+    try:
+        conn = read_connection()
+        df = pd.read_sql_query(query, conn, params=[job_id, *level_params, offset + n, OTHER_LABEL,
+                                                       offset + n, offset + n + 1, job_id, offset, *level_params])
+        conn.close()
+    except sqlite3.OperationalError as e:
+        logger.error(f"Database error ranking {dimension} for job_id {job_id}: {str(e)}")
+        return _Uncached(pd.DataFrame(columns=[dimension, 'level', 'rank', 'members', 'count']))
+    logger.debug(f"Top {n} {dimension} rows from rank {offset + 1} for job_id: {job_id}: {len(df)}")
+    return _apply_estimates(df, job_id)
+
+def get_totals(df: pd.DataFrame, key: str) -> pd.DataFrame:
+    """Total counts per class or service, with confidence intervals when the counts are estimates."""
+    if 'variance' not in df.columns:
+        return df.groupby(key)['count'].sum().reset_index()
+    totals = df.groupby(key)[['count', 'variance']].sum().reset_index()
+    totals['ci'] = totals['variance'].map(confidence_interval).round().astype('int64')
+    return totals.drop(columns=['variance'])
 
 def export_to_excel(job_id: str) -> str:
     """Export analysis data to Excel file."""
@@ -453,8 +1042,8 @@ def export_to_excel(job_id: str) -> str:
             service_pivot = pd.DataFrame(columns=['service'])
         
         # Calculate total counts for class and service
-        class_totals = level_counts_by_class.groupby('class')['count'].sum().reset_index()
-        service_totals = level_counts_by_service.groupby('service')['count'].sum().reset_index()
+        class_totals = get_totals(level_counts_by_class, 'class')
+        service_totals = get_totals(level_counts_by_service, 'service')
         
         # Create folder with job_id and timestamp
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -503,21 +1092,25 @@ def export_to_excel(job_id: str) -> str:
             
             # Class Totals
             worksheet4 = workbook.add_worksheet('Class Totals')
-            headers4 = ['Class', 'Count']
+            headers4 = ['Class', 'Count'] + (['95% CI (+/-)'] if 'ci' in class_totals.columns else [])
             for col, header in enumerate(headers4):
                 worksheet4.write(0, col, header, header_format)
             for row, data in enumerate(class_totals.to_dict('records'), 1):
                 worksheet4.write(row, 0, data['class'], cell_format)
                 worksheet4.write(row, 1, data['count'], cell_format)
+                if 'ci' in data:
+                    worksheet4.write(row, 2, data['ci'], cell_format)
             
             # Service Totals
             worksheet5 = workbook.add_worksheet('Service Totals')
-            headers5 = ['Service', 'Count']
+            headers5 = ['Service', 'Count'] + (['95% CI (+/-)'] if 'ci' in service_totals.columns else [])
             for col, header in enumerate(headers5):
                 worksheet5.write(0, col, header, header_format)
             for row, data in enumerate(service_totals.to_dict('records'), 1):
                 worksheet5.write(row, 0, data['service'], cell_format)
                 worksheet5.write(row, 1, data['count'], cell_format)
+                if 'ci' in data:
+                    worksheet5.write(row, 2, data['ci'], cell_format)
         
         logger.info(f"Exported analysis data to {output_file} for job_id: {job_id}")
         return output_file
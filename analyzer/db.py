@@ -0,0 +1,153 @@
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+DB_PATH = 'data/logs.db'
+
+@lru_cache(maxsize=256)
+def _compile(pattern: str):
+    return re.compile(pattern)
+
+def _regexp(pattern: str, value: str) -> bool:
+    """SQLite REGEXP operator: `value REGEXP pattern` matches anywhere in value."""
+    if pattern is None or value is None:
+        return False
+    return _compile(pattern).search(value) is not None
+
+def connect(path: str = DB_PATH, timeout: float = 30, **kwargs) -> sqlite3.Connection:
+    """Open a connection to the log database with the REGEXP function registered."""
+    conn = sqlite3.connect(path, timeout=timeout, **kwargs)
+    conn.create_function('REGEXP', 2, _regexp, deterministic=True)
+    return conn
+
+def wal_size_bytes(path: str = DB_PATH) -> int:
+    """Current size of the database's write-ahead log, 0 if there is none."""
+    try:
+        return os.path.getsize(path + '-wal')
+    except OSError:
+        return 0
+
+def checkpoint_wal(conn: sqlite3.Connection, max_wal_bytes: int, path: str = DB_PATH):
+    """Copy committed WAL frames into the database and keep the WAL file bounded.
+
+    A PASSIVE checkpoint never waits for readers, but cannot reset the WAL while a reader
+    still uses an older snapshot, so the file keeps growing under a busy UI. Once it exceeds
+    max_wal_bytes, a TRUNCATE checkpoint waits (up to the busy timeout) for readers to finish
+    their short snapshot transactions and then empties it. Returns (busy, wal_frames, checkpointed).
+    """
+    mode = 'TRUNCATE' if wal_size_bytes(path) > max_wal_bytes else 'PASSIVE'
+    busy, frames, checkpointed = conn.execute(f'PRAGMA wal_checkpoint({mode})').fetchone()
+    if mode == 'TRUNCATE':
+        logger.info(f"WAL truncate checkpoint: busy={busy}, frames={frames}, checkpointed={checkpointed}")
+    return busy, frames, checkpointed
+
+class PooledConnection(sqlite3.Connection):
+    """Read-only connection whose close() hands it back to its pool instead of closing it.
+
+    Readers keep the usual open/query/close shape; a connection dropped on an exception
+    path is simply garbage-collected and the pool opens a fresh one when needed. Each borrow
+    reads from a single snapshot, so a reader issuing several queries sees one committed batch.
+    """
+
+    pool = None
+
+    def close(self):
+        if self.pool is not None and self.pool.release(self):
+            return
+        super().close()
+
+class ReadPool:
+    """Process-wide pool of read-only connections with read-tuned PRAGMAs applied once per connection.
+
+    query_only guards against accidental writes, mmap_size lets pages be read straight from the
+    OS page cache, and cache_size/temp_store keep sorts and GROUP BYs for the dashboards in memory.
+    At most `size` idle connections are kept; extra concurrent readers get a connection that is
+    closed on release.
+
+    Every borrowed connection holds a read transaction until it is released, so the backend's
+    per-batch commits are either fully visible to it or not at all. Inside snapshot(), all
+    borrows on the thread share one connection and therefore one snapshot.
+    """
+
+    def __init__(self, path: str = DB_PATH, size: int = 4, mmap_mb: int = 256, cache_mb: int = 64,
+                 timeout: float = 30):
+        self.path = path
+        self.timeout = timeout
+        self.mmap_bytes = int(mmap_mb * 1024 * 1024)
+        self.cache_kib = int(cache_mb * 1024)
+        self._idle = queue.LifoQueue(maxsize=max(1, int(size)))
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.opened = 0
+
+    def _open(self) -> PooledConnection:
+        conn = connect(self.path, self.timeout, factory=PooledConnection, check_same_thread=False)
+        conn.execute('PRAGMA query_only = ON')
+        conn.execute(f'PRAGMA mmap_size = {self.mmap_bytes}')
+        conn.execute(f'PRAGMA cache_size = -{self.cache_kib}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        conn.pool = self
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        """The thread's snapshot connection, else an idle pooled connection or a new one."""
+        pinned = getattr(self._local, 'conn', None)
+        if pinned is not None:
+            return pinned
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        # The snapshot is taken at the first read and held until release
+        conn.execute('BEGIN')
+        return conn
+
+    @contextmanager
+    def snapshot(self):
+        """Read every query on this thread from one snapshot until the block exits.
+
+        Keep the block short: an open snapshot stops checkpoints from resetting the WAL.
+        """
+        if getattr(self._local, 'conn', None) is not None:
+            yield self._local.conn
+            return
+        conn = self.acquire()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            conn.close()
+
+    def release(self, conn: PooledConnection) -> bool:
+        """Return a connection to the pool; False if the pool is full and it should be closed."""
+        if conn is getattr(self._local, 'conn', None):
+            # Readers inside snapshot() close the shared connection; it is released on exit
+            return True
+        if conn.in_transaction:
+            conn.rollback()
+        # Readers may switch to sqlite3.Row; the next borrower expects plain tuples
+        conn.row_factory = None
+        try:
+            self._idle.put_nowait(conn)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self):
+        """Close all idle connections."""
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            sqlite3.Connection.close(conn)
@@ -0,0 +1,57 @@
+import sqlite3
+from typing import Dict, List
+
+# Kubernetes and thread dimensions stored with every log row, keyed by their LogProcessor column
+LOG_DIMENSIONS = {'pod': 'pods', 'host': 'hosts', 'container': 'containers', 'thread': 'threads'}
+
+# Stored for lines that do not carry a dimension, like the class of a line without one
+UNKNOWN_VALUE = 'Unknown'
+
+def dimension_value(value) -> str:
+    """Text stored for a raw field value: UNKNOWN_VALUE when missing or empty, str() for non-strings."""
+    if value is None or value == '':
+        return UNKNOWN_VALUE
+    return value if isinstance(value, str) else str(value)
+
+class DimensionEncoder:
+    """Dictionary encoder mapping dimension values to their dimension_values ids for one writer connection.
+
+    Ids are looked up (and new values inserted) once per distinct value of a batch and cached
+    after that. Values first seen in the open transaction stay pending until commit() is
+    called after that transaction commits; rollback() forgets them, since their ids were
+    rolled back with it.
+    """
+
+    def __init__(self):
+        self.ids: Dict[tuple, int] = {}
+        self._pending: Dict[tuple, int] = {}
+
+    def encode(self, conn: sqlite3.Connection, dimension: str, values: list) -> List[int]:
+        """dimension_values ids for a column of raw values, inserting values not stored yet."""
+        try:
+            distinct = set(values)
+        except TypeError:
+            # A JSON object or array logged in place of the field
+            values = [dimension_value(value) for value in values]
+            distinct = set(values)
+        lookup = {value: self._value_id(conn, dimension, dimension_value(value)) for value in distinct}
+        return [lookup[value] for value in values]
+
+    def _value_id(self, conn: sqlite3.Connection, dimension: str, value: str) -> int:
+        key = (dimension, value)
+        value_id = self.ids.get(key) or self._pending.get(key)
+        if value_id is None:
+            conn.execute('INSERT OR IGNORE INTO dimension_values (dimension, value) VALUES (?, ?)', key)
+            value_id = conn.execute('SELECT id FROM dimension_values WHERE dimension = ? AND value = ?',
+                                    key).fetchone()[0]
+            self._pending[key] = value_id
+        return value_id
+
+    def commit(self):
+        """Keep the ids of values inserted by the transaction that was just committed."""
+        self.ids.update(self._pending)
+        self._pending.clear()
+
+    def rollback(self):
+        """Forget the ids of values inserted by the transaction that was just rolled back."""
+        self._pending.clear()
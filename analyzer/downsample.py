@@ -0,0 +1,50 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of (x, y).
+
+    The first and last points are always kept; every bucket in between contributes the
+    point forming the largest triangle with the previously kept point and the next
+    bucket's average, so spikes survive while flat stretches are thinned out.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype='int64')
+    kept[0] = a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(areas.argmax())
+        kept[i + 1] = a
+    kept[-1] = n - 1
+    return kept
+
+def downsample_series(df: pd.DataFrame, x: str, y: str, max_points: int,
+                      group: Optional[str] = None) -> pd.DataFrame:
+    """Reduce each series of df (one per `group` value) to at most max_points rows with LTTB.
+
+    Rows are selected, not averaged, so other columns such as 'ci' stay aligned with their points.
+    """
+    if df.empty or max_points <= 0:
+        return df
+    groups = df.groupby(group, sort=False) if group else [(None, df)]
+    parts = []
+    for _, series in groups:
+        series = series.sort_values(x)
+        if len(series) > max_points:
+            xs = series[x]
+            xs = xs.astype('int64') if pd.api.types.is_datetime64_any_dtype(xs) else xs
+            series = series.iloc[lttb_indices(xs.to_numpy(), series[y].to_numpy(), max_points)]
+        parts.append(series)
+    return pd.concat(parts, ignore_index=True)
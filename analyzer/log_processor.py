@@ -1,55 +1,293 @@
 import json
-import logging
-from datetime import datetime
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
 
-# Configure logging
-logging.basicConfig(
-    filename='log_analyzer.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
-logger = logging.getLogger(__name__)
+# pyarrow is optional; without it every batch is decoded line by line
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.json as pa_json
+except ImportError:
+    pa = pc = pa_json = None
+
+def parse_log_timestamp(timestamp: str) -> Optional[datetime]:
+    """Parse a logtime value in any of the supported formats, or return None."""
+    try:
+        # Try parsing with milliseconds
+        return datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S,%f')
+    except ValueError:
+        pass
+    try:
+        # Try parsing without milliseconds
+        return datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        pass
+    try:
+        # Try parsing Apache-like format with timezone
+        return datetime.strptime(timestamp, '%d/%b/%Y:%H:%M:%S %z')
+    except ValueError:
+        return None
+
+# Distinct logtime keys remembered by LogProcessor before its cache is cleared
+TIME_CACHE_SIZE = 100000
+
+# Columns parse_batch fills for every valid line
+BASE_COLUMNS = ('positions', 'timestamps', 'times', 'minutes', 'hours', 'levels', 'classes', 'services', 'messages')
+
+# Raw fields qscript groups by, filled when LogProcessor is created with extra_fields=True
+EXTRA_COLUMNS = ('class_fields', 'threads', 'pods', 'containers', 'namespaces', 'hosts')
+
+PARSE_ENGINES = ('arrow', 'python')
+
+# Batches shorter than this are decoded line by line even with the arrow engine, whose
+# fixed cost per block outweighs its per-line savings on small batches
+ARROW_MIN_LINES = 256
+
+# Fields the arrow engine reads; any other field of a line is ignored
+KUBERNETES_FIELDS = ('pod_name', 'container_name', 'namespace_name', 'host')
+ARROW_SCHEMA = pa.schema([
+    ('logtime', pa.string()),
+    ('level', pa.string()),
+    ('class', pa.string()),
+    ('log', pa.string()),
+    ('thread', pa.string()),
+    ('kubernetes', pa.struct([(field, pa.string()) for field in KUBERNETES_FIELDS]))
+]) if pa else None
+
+# Millisecond logtimes the arrow engine truncates to their whole seconds before the time_keys lookup
+MILLISECOND_LOGTIME = r'^[0-9 :-]{19},[0-9]{1,6}$'
+
+# "service.class" split at the first dot, as str.split('.', 1)
+CLASS_PATTERN = r'(?s)^(?P<service>[^.]*)\.(?P<class_name>.*)$'
 
 class LogProcessor:
-    def parse_log_line(self, log_line: str) -> dict:
-        """Parse a JSON log line into a structured dictionary."""
-        try:
-            log_entry = json.loads(log_line.strip())
-            timestamp = log_entry.get('logtime', '')
-            level = log_entry.get('level', 'UNKNOWN')
-            class_field = log_entry.get('class', None)
-            log_message = log_entry.get('log', '')
-            
-            # Extract class and service
-            if class_field and '.' in class_field:
+    """Columnar parser for batches of JSON log lines, shared by the backend, qscript and the benchmarks.
+
+    parse_batch decodes a batch into one list per field instead of one dict per line, and
+    maps each logtime to its minute and hour keys through a cache. Millisecond timestamps
+    are cached by their whole seconds, so a busy file parses each second once rather than
+    every line.
+
+    With the arrow engine (the default when pyarrow is installed) a batch of at least
+    ARROW_MIN_LINES lines is joined into one block and decoded by pyarrow.json against
+    ARROW_SCHEMA; levels, classes and time keys are then derived per column rather than
+    per line. A block pyarrow rejects (an invalid line, a field of another type, blank
+    lines) is decoded again line by line, so both engines return the same columns.
+    """
+
+    def __init__(self, valid_levels: Optional[Iterable[str]] = None, extra_fields: bool = False,
+                 engine: Optional[str] = None):
+        """valid_levels maps any other level to UNKNOWN; without it levels are kept as logged.
+
+        engine is 'arrow' or 'python'; by default arrow is used when pyarrow is installed.
+        """
+        if engine is None:
+            engine = 'arrow' if pa is not None else 'python'
+        if engine not in PARSE_ENGINES:
+            raise ValueError(f"Invalid parse engine: {engine}")
+        if engine == 'arrow' and pa is None:
+            raise ValueError("The arrow parse engine requires pyarrow")
+        self.valid_levels = set(valid_levels) if valid_levels is not None else None
+        self.extra_fields = extra_fields
+        self.engine = engine
+        # Batches the arrow engine handed to the line-by-line decoder
+        self.fallback_batches = 0
+        self._times: Dict[str, tuple] = {}
+        if engine == 'arrow':
+            self._valid_level_set = pa.array(sorted(self.valid_levels), pa.string()) if valid_levels is not None else None
+            self._parse_options = pa_json.ParseOptions(explicit_schema=ARROW_SCHEMA, unexpected_field_behavior='ignore')
+
+    def time_keys(self, timestamp) -> tuple:
+        """(datetime, minute key, hour key) for a logtime value, or (None, None, None) if it does not parse.
+
+        The datetime is naive (converted to UTC when the logtime has an offset) and, for
+        millisecond timestamps, truncated to the second; the keys use the logged wall time.
+        """
+        if not isinstance(timestamp, str):
+            return None, None, None
+        key = timestamp
+        if len(timestamp) > 20 and timestamp[19] == ',':
+            if not timestamp[20:].isdigit() or len(timestamp) > 26:
+                return None, None, None
+            key = timestamp[:19]
+        cached = self._times.get(key)
+        if cached is None:
+            if len(self._times) >= TIME_CACHE_SIZE:
+                self._times.clear()
+            dt = parse_log_timestamp(key)
+            if dt is None:
+                cached = (None, None, None)
+            else:
+                minute = dt.strftime('%Y-%m-%d %H:%M:00')
+                if dt.tzinfo is not None:
+                    dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+                cached = (dt.replace(microsecond=0), minute, minute[:14] + '00:00')
+            self._times[key] = cached
+        return cached
+
+    def parse_batch(self, lines: Iterable, stage_times: Optional[Dict[str, float]] = None) -> Dict[str, list]:
+        """Decode a batch of raw JSON lines (bytes or str) into column lists.
+
+        Every list in BASE_COLUMNS (and EXTRA_COLUMNS with extra_fields) has one item per
+        line that decoded to a JSON object; 'positions' holds each such line's index in the
+        batch. Also returns 'invalid_json' (indexes of lines that did not decode to an
+        object), 'missing_class' and 'invalid_timestamps' counts. A null logtime, level or
+        log counts as missing. Empty logtimes have no time keys but are not counted as
+        invalid. Decoding and timestamp time are added to stage_times['decode'] and
+        stage_times['timestamp'] when given.
+        """
+        if self.engine == 'arrow':
+            lines = lines if isinstance(lines, list) else list(lines)
+            if len(lines) >= ARROW_MIN_LINES:
+                columns = self._parse_arrow(lines, stage_times)
+                if columns is not None:
+                    return columns
+                self.fallback_batches += 1
+        return self._parse_lines(lines, stage_times)
+
+    def _parse_lines(self, lines: Iterable, stage_times: Optional[Dict[str, float]]) -> Dict[str, list]:
+        """parse_batch with json.loads on every line."""
+        perf_counter = time.perf_counter
+        start = perf_counter()
+        columns = {name: [] for name in BASE_COLUMNS + (EXTRA_COLUMNS if self.extra_fields else ())}
+        columns['invalid_json'] = []
+        columns['missing_class'] = 0
+        positions = columns['positions']
+        timestamps = columns['timestamps']
+        levels = columns['levels']
+        classes = columns['classes']
+        services = columns['services']
+        messages = columns['messages']
+        valid_levels = self.valid_levels
+        extra = self.extra_fields
+        loads = json.loads
+
+        for position, line in enumerate(lines):
+            try:
+                entry = loads(line)
+            except (ValueError, TypeError):
+                columns['invalid_json'].append(position)
+                continue
+            if not isinstance(entry, dict):
+                columns['invalid_json'].append(position)
+                continue
+            positions.append(position)
+            timestamp = entry.get('logtime')
+            timestamps.append('' if timestamp is None else timestamp)
+            level = entry.get('level')
+            if level is None or (valid_levels is not None and (not isinstance(level, str) or level not in valid_levels)):
+                level = 'UNKNOWN'
+            levels.append(level)
+            class_field = entry.get('class')
+            if isinstance(class_field, str) and '.' in class_field:
                 service, class_name = class_field.split('.', 1)
             else:
-                class_name = 'Unknown'
-                service = 'Unknown'
-            
-            # Validate timestamp
+                service = class_name = 'Unknown'
+                columns['missing_class'] += 1
+            classes.append(class_name)
+            services.append(service)
+            message = entry.get('log')
+            messages.append('' if message is None else message)
+            if extra:
+                kubernetes = entry.get('kubernetes')
+                if not isinstance(kubernetes, dict):
+                    kubernetes = {}
+                columns['class_fields'].append(class_field)
+                columns['threads'].append(entry.get('thread'))
+                columns['pods'].append(kubernetes.get('pod_name'))
+                columns['containers'].append(kubernetes.get('container_name'))
+                columns['namespaces'].append(kubernetes.get('namespace_name'))
+                columns['hosts'].append(kubernetes.get('host'))
+
+        timestamp_start = perf_counter()
+        times = columns['times']
+        minutes = columns['minutes']
+        hours = columns['hours']
+        invalid_timestamps = 0
+        time_keys = self.time_keys
+        for timestamp in timestamps:
             if timestamp:
-                try:
-                    try:
-                        datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S,%f')
-                    except ValueError:
-                        try:
-                            datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-                        except ValueError:
-                            datetime.strptime(timestamp, '%d/%b/%Y:%H:%M:%S %z')
-                except ValueError:
-                    timestamp = ''
-            
-            return {
-                'logtime': timestamp,
-                'level': level,
-                'class': class_name,
-                'service': service,
-                'log': log_message
-            }
-        except json.JSONDecodeError:
-            logger.warning(f"Invalid JSON log line: {log_line}")
+                dt, minute, hour = time_keys(timestamp)
+                if dt is None:
+                    invalid_timestamps += 1
+            else:
+                dt = minute = hour = None
+            times.append(dt)
+            minutes.append(minute)
+            hours.append(hour)
+        columns['invalid_timestamps'] = invalid_timestamps
+
+        if stage_times is not None:
+            end = perf_counter()
+            stage_times['decode'] += timestamp_start - start
+            stage_times['timestamp'] += end - timestamp_start
+        return columns
+
+    def _parse_arrow(self, lines: List, stage_times: Optional[Dict[str, float]]) -> Optional[Dict[str, list]]:
+        """parse_batch with pyarrow.json on the whole batch, or None if pyarrow rejects the block."""
+        perf_counter = time.perf_counter
+        start = perf_counter()
+        newline = b'\n' if isinstance(lines[0], bytes) else '\n'
+        block = newline[:0].join(line if line.endswith(newline) else line + newline for line in lines)
+        if isinstance(block, str):
+            block = block.encode('utf-8')
+        try:
+            table = pa_json.read_json(
+                pa.BufferReader(block),
+                read_options=pa_json.ReadOptions(use_threads=False, block_size=len(block) + 1),
+                parse_options=self._parse_options)
+        except (pa.ArrowException, UnicodeEncodeError):
             return None
-        except Exception as e:
-            logger.error(f"Error parsing log line: {str(e)}")
-            return None
\ No newline at end of file
+        # Blank lines and lines holding several objects shift rows against lines
+        if table.num_rows != len(lines):
+            return None
+        table = table.combine_chunks()
+
+        def column(name):
+            return table.column(name).chunk(0)
+
+        levels = pc.fill_null(column('level'), 'UNKNOWN')
+        if self._valid_level_set is not None:
+            levels = pc.if_else(pc.is_in(levels, value_set=self._valid_level_set), levels, 'UNKNOWN')
+        class_field = column('class')
+        split = pc.extract_regex(class_field, CLASS_PATTERN)
+        timestamps = pc.fill_null(column('logtime'), '')
+        columns = {
+            'positions': list(range(len(lines))),
+            'timestamps': timestamps.to_pylist(),
+            'levels': levels.to_pylist(),
+            'classes': pc.fill_null(pc.struct_field(split, 'class_name'), 'Unknown').to_pylist(),
+            'services': pc.fill_null(pc.struct_field(split, 'service'), 'Unknown').to_pylist(),
+            'messages': pc.fill_null(column('log'), '').to_pylist(),
+            'invalid_json': [],
+            'missing_class': split.null_count
+        }
+        if self.extra_fields:
+            kubernetes = column('kubernetes')
+            columns['class_fields'] = class_field.to_pylist()
+            columns['threads'] = column('thread').to_pylist()
+            for name, field in zip(EXTRA_COLUMNS[2:], KUBERNETES_FIELDS):
+                columns[name] = pc.struct_field(kubernetes, field).to_pylist()
+
+        # Time keys are looked up once per distinct logtime (per second for millisecond logtimes)
+        timestamp_start = perf_counter()
+        keys = pc.if_else(pc.match_substring_regex(timestamps, MILLISECOND_LOGTIME),
+                          pc.utf8_slice_codeunits(timestamps, 0, 19), timestamps)
+        encoded = pc.dictionary_encode(keys)
+        distinct = encoded.dictionary.to_pylist()
+        time_keys = self.time_keys
+        distinct_keys = [time_keys(key) if key else (None, None, None) for key in distinct]
+        indices = encoded.indices.to_pylist()
+        columns['times'] = [distinct_keys[i][0] for i in indices]
+        columns['minutes'] = [distinct_keys[i][1] for i in indices]
+        columns['hours'] = [distinct_keys[i][2] for i in indices]
+        invalid = pa.array([i for i, (key, (dt, _, _)) in enumerate(zip(distinct, distinct_keys)) if key and dt is None],
+                           encoded.indices.type)
+        columns['invalid_timestamps'] = pc.sum(pc.is_in(encoded.indices, value_set=invalid)).as_py() if len(invalid) else 0
+
+        if stage_times is not None:
+            end = perf_counter()
+            stage_times['decode'] += timestamp_start - start
+            stage_times['timestamp'] += end - timestamp_start
+        return columns
@@ -0,0 +1,145 @@
+import bisect
+import threading
+from typing import Dict, List, Tuple
+
+# Prometheus text exposition format version served by /metrics
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+# Latency buckets in seconds, from a single batch commit up to a multi-GB file
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+def _escape_label_value(value: str) -> str:
+    """Escape a label value for the Prometheus text format."""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _format_labels(label_names: Tuple[str, ...], label_values: Tuple[str, ...], extra: str = '') -> str:
+    """Render a label set as {name="value",...}."""
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+def _format_value(value: float) -> str:
+    """Render a sample value, keeping integers free of a trailing .0."""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Monotonically increasing counter with one series per label set."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ('job_id',)):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        """Increase the series identified by labels by amount."""
+        if amount < 0:
+            raise ValueError("Counters can only be increased")
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def remove(self, **labels):
+        """Drop every series whose labels match the given values."""
+        with self._lock:
+            for key in [k for k in self._values if _matches(self.label_names, k, labels)]:
+                del self._values[key]
+
+    def collect(self) -> List[str]:
+        """Render the counter in Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}')
+        return lines
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds and one series per label set."""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ('job_id',),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Record a single observation for the series identified by labels."""
+        key = tuple(str(labels.get(name, '')) for name in self.label_names)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                self._series[key] = series
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def remove(self, **labels):
+        """Drop every series whose labels match the given values."""
+        with self._lock:
+            for key in [k for k in self._series if _matches(self.label_names, k, labels)]:
+                del self._series[key]
+
+    def collect(self) -> List[str]:
+        """Render the histogram in Prometheus text format."""
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), bucket_counts):
+                    cumulative += bucket_count
+                    le = '+Inf' if bound == float('inf') else _format_value(float(bound))
+                    bucket_labels = _format_labels(self.label_names, key, 'le="' + le + '"')
+                    lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+                lines.append(f'{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(total)}')
+                lines.append(f'{self.name}_count{_format_labels(self.label_names, key)} {count}')
+        return lines
+
+def _matches(label_names: Tuple[str, ...], key: Tuple[str, ...], labels: Dict) -> bool:
+    """Check whether a series key carries all of the given label values."""
+    values = dict(zip(label_names, key))
+    return all(values.get(name) == str(value) for name, value in labels.items())
+
+class MetricsRegistry:
+    """In-process registry rendering all metrics for a /metrics endpoint."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ('job_id',)) -> Counter:
+        """Create and register a counter."""
+        return self._register(Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = ('job_id',),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a histogram."""
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def remove(self, **labels):
+        """Drop matching series from every registered metric, e.g. when a job is deleted."""
+        for metric in list(self._metrics.values()):
+            metric.remove(**labels)
+
+    def render(self) -> str:
+        """Render every registered metric in Prometheus text format."""
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.collect())
+        return '\n'.join(lines) + '\n'
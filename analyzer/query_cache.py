@@ -0,0 +1,108 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+import pandas as pd
+
+# Returned by QueryCache.get when a key is not cached, since None is a valid cached result
+MISSING = object()
+
+def estimate_size(value: Any) -> int:
+    """Approximate memory footprint of a cached result in bytes."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=True).sum())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    return sys.getsizeof(value)
+
+def _copy(value: Any) -> Any:
+    """Copy of a cached result that callers can modify without touching the cached one."""
+    if isinstance(value, pd.DataFrame):
+        return value.copy()
+    if isinstance(value, (list, tuple)):
+        return type(value)(_copy(item) for item in value)
+    if isinstance(value, dict):
+        return {k: _copy(v) for k, v in value.items()}
+    return value
+
+class QueryCache:
+    """Thread-safe LRU cache of query results keyed by (job_id, data_version, query).
+
+    Entries are evicted least-recently-used first once their estimated size exceeds
+    max_bytes. When a job's data_version advances, all entries for its older versions
+    are dropped, so a running job never serves stale results.
+    """
+
+    def __init__(self, max_bytes: int, max_entry_fraction: float = 0.25):
+        self.max_bytes = max_bytes
+        # Results larger than this share of the budget are returned but never cached
+        self.max_entry_bytes = int(max_bytes * max_entry_fraction)
+        self.entries: 'OrderedDict[Hashable, tuple]' = OrderedDict()
+        self.current_bytes = 0
+        self.versions: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, key: Hashable):
+        _, size = self.entries.pop(key)
+        self.current_bytes -= size
+
+    def _advance(self, job_id: str, version: int):
+        """Record the newest version seen for a job and drop entries for older versions."""
+        if version > self.versions.get(job_id, version - 1):
+            stale = [key for key in self.entries if key[0] == job_id and key[1] != version]
+            for key in stale:
+                self._drop(key)
+        self.versions[job_id] = max(version, self.versions.get(job_id, version))
+
+    def get(self, key: tuple) -> Any:
+        """Cached value for (job_id, data_version, ...) or MISSING."""
+        with self._lock:
+            self._advance(key[0], key[1])
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.hits += 1
+            value = entry[0]
+        return _copy(value)
+
+    def put(self, key: tuple, value: Any):
+        size = estimate_size(value)
+        if size > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._advance(key[0], key[1])
+            if key[1] < self.versions.get(key[0], key[1]):
+                # A newer version was seen while this result was being computed
+                return
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (value, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self.entries:
+                self._drop(next(iter(self.entries)))
+
+    def invalidate(self, job_id: Optional[str] = None, query: Optional[str] = None):
+        """Drop entries for one job and/or one query name; with no arguments, drop everything."""
+        with self._lock:
+            for key in [k for k in self.entries
+                        if (job_id is None or k[0] == job_id) and (query is None or k[2] == query)]:
+                self._drop(key)
+            if job_id is None and query is None:
+                self.versions.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self.entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
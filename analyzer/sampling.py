@@ -0,0 +1,96 @@
+import math
+import random
+from typing import List, Optional, Tuple
+
+SAMPLE_METHODS = ('systematic', 'reservoir')
+SAMPLE_UNITS = ('lines', 'files')
+
+# z-score of the two-sided 95% confidence interval shown on the dashboard
+CONFIDENCE_Z = 1.96
+
+def _rng(seed, *parts) -> random.Random:
+    """Deterministic RNG per job/file so a resumed job samples the same lines and files."""
+    return random.Random(':'.join(str(p) for p in (seed,) + parts))
+
+class SystematicSampler:
+    """Keeps a `rate` share of lines at a fractional stride of 1 / rate from a random start.
+
+    Line i is kept when floor(i * rate + start) moves past floor((i - 1) * rate + start),
+    so a rate that is not 1/k (0.4, 0.7) keeps that share of lines instead of rounding
+    the stride to a whole number of lines.
+    """
+
+    def __init__(self, rate: float, seed=None, key: str = ''):
+        self.rate = rate
+        self.start = _rng(seed, key).random()
+
+    def keep(self, line_idx: int) -> bool:
+        return math.floor(line_idx * self.rate + self.start) != math.floor((line_idx - 1) * self.rate + self.start)
+
+    @property
+    def weight(self) -> float:
+        """Lines represented by each kept line."""
+        return 1.0 / self.rate
+
+class ReservoirSampler:
+    """Algorithm R: a uniform sample of at most `size` items from a stream of unknown length."""
+
+    def __init__(self, size: int, seed=None, key: str = ''):
+        self.size = max(1, int(size))
+        self.items: List = []
+        self.seen = 0
+        self._rng = _rng(seed, key)
+
+    def offer(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            slot = self._rng.randrange(self.seen)
+            if slot < self.size:
+                self.items[slot] = item
+
+    @property
+    def weight(self) -> float:
+        """Lines represented by each kept line once the stream is exhausted."""
+        return self.seen / len(self.items) if self.items else 1.0
+
+def select_files(files: List[str], rate: float, method: str, seed=None, key: str = '') -> Tuple[List[str], float]:
+    """Pick a fraction of files systematically or at random; returns the selection and its weight."""
+    if not files:
+        return [], 1.0
+    files = sorted(files)
+    count = max(1, int(round(len(files) * rate)))
+    if method == 'reservoir':
+        selected = sorted(_rng(seed, key).sample(files, min(count, len(files))))
+    else:
+        step = len(files) / count
+        offset = _rng(seed, key).random() * step
+        selected = [files[min(len(files) - 1, int(offset + i * step))] for i in range(count)]
+    return selected, len(files) / len(selected)
+
+def validate_sampling(mode: str, rate: float, method: str, unit: str) -> Optional[str]:
+    """Return an error message for an invalid sampling configuration, or None."""
+    if mode not in ('full', 'sample'):
+        return f"Invalid mode: {mode}"
+    if mode == 'full':
+        return None
+    if not 0 < rate <= 1:
+        return f"Sample rate must be in (0, 1], got {rate}"
+    if method not in SAMPLE_METHODS:
+        return f"Invalid sample method: {method}"
+    if unit not in SAMPLE_UNITS:
+        return f"Invalid sample unit: {unit}"
+    return None
+
+def estimate_variance(count: float, weight: float) -> float:
+    """Variance contribution of `count` sampled lines each standing for `weight` lines.
+
+    Treats every sampled line as an independent draw with inclusion probability
+    1 / weight (Horvitz-Thompson under Poisson sampling).
+    """
+    return count * weight * (weight - 1.0)
+
+def confidence_interval(variance: float) -> float:
+    """Half-width of the 95% confidence interval for an estimate with the given variance."""
+    return CONFIDENCE_Z * math.sqrt(max(variance or 0.0, 0.0))
@@ -0,0 +1,111 @@
+import heapq
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Only the head of a message is normalized; long stack traces share their first lines anyway
+MAX_MESSAGE_LENGTH = 300
+
+# Variable parts of log messages, tried in order at each position so UUIDs and IPs are not split into numbers
+_VARIABLE_PATTERNS = [
+    ('uuid', r'\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b', '<uuid>'),
+    ('ip', r'\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b', '<ip>'),
+    ('email', r'[\w.+-]+@[\w-]+\.[\w.-]+', '<email>'),
+    ('hex', r'\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{16,}\b', '<hex>'),
+    ('num', r'\d+', '<num>'),
+]
+_REPLACEMENTS = {name: replacement for name, _, replacement in _VARIABLE_PATTERNS}
+
+def _alternation(names) -> re.Pattern:
+    """All masks in one pattern, so a message is scanned once rather than once per mask."""
+    return re.compile('|'.join(f'(?P<{name}>{pattern})' for name, pattern, _ in _VARIABLE_PATTERNS if name in names))
+
+# The email mask is the costliest to try at every position and cannot match without an '@'
+_VARIABLE_RE = _alternation(_REPLACEMENTS)
+_VARIABLE_RE_NO_EMAIL = _alternation(set(_REPLACEMENTS) - {'email'})
+
+def _mask(match) -> str:
+    return _REPLACEMENTS[match.lastgroup]
+
+def normalize_message(message: str) -> str:
+    """Reduce a log message to its template by masking ids, addresses and numbers."""
+    template = message[:MAX_MESSAGE_LENGTH]
+    pattern = _VARIABLE_RE if '@' in template else _VARIABLE_RE_NO_EMAIL
+    # Whitespace runs are collapsed by str.split, which is cheaper than another mask
+    return ' '.join(pattern.sub(_mask, template).split())
+
+class SpaceSaving:
+    """Space-Saving heavy-hitter sketch (Metwally et al.) holding at most `capacity` items.
+
+    Each tracked item keeps [count, error, example]: count over-estimates the true
+    frequency by at most error, and example is a raw message the item was first seen with.
+
+    Evictions find the least frequent item through a lazy min-heap of (count, item): counts
+    only grow, so an entry is refreshed when it reaches the top with an outdated count
+    instead of on every increment. The heap is built on the first eviction.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self.items: Dict[str, list] = {}
+        self._heap: Optional[List[tuple]] = None
+
+    def offer(self, item: str, count: float = 1, example: Optional[str] = None):
+        entry = self.items.get(item)
+        if entry is not None:
+            entry[0] += count
+            return
+        if len(self.items) < self.capacity:
+            self.items[item] = [count, 0, example]
+            if self._heap is not None:
+                heapq.heappush(self._heap, (count, item))
+            return
+        # Replace the least frequent item; the newcomer inherits its count as error
+        heap = self._heap
+        if heap is None:
+            heap = self._heap = [(entry[0], key) for key, entry in self.items.items()]
+            heapq.heapify(heap)
+        while True:
+            floor, victim = heap[0]
+            current = self.items[victim][0]
+            if current == floor:
+                break
+            heapq.heapreplace(heap, (current, victim))
+        del self.items[victim]
+        self.items[item] = [floor + count, floor, example]
+        heapq.heapreplace(heap, (floor + count, item))
+
+    def min_count(self) -> float:
+        """Upper bound on the count of any item that is not tracked."""
+        if len(self.items) < self.capacity:
+            return 0
+        return min(entry[0] for entry in self.items.values())
+
+    def merge(self, other: 'SpaceSaving') -> 'SpaceSaving':
+        """Combine two sketches into a new one with this sketch's capacity (mergeable summaries)."""
+        own_floor = self.min_count()
+        other_floor = other.min_count()
+        combined = {}
+        for item in set(self.items) | set(other.items):
+            own = self.items.get(item)
+            theirs = other.items.get(item)
+            count = (own[0] if own else own_floor) + (theirs[0] if theirs else other_floor)
+            error = (own[1] if own else own_floor) + (theirs[1] if theirs else other_floor)
+            example = own[2] if own and own[2] else (theirs[2] if theirs else None)
+            combined[item] = [count, error, example]
+        merged = SpaceSaving(self.capacity)
+        for item, entry in sorted(combined.items(), key=lambda kv: kv[1][0], reverse=True)[:self.capacity]:
+            merged.items[item] = entry
+        return merged
+
+    def top(self, n: Optional[int] = None) -> List[Tuple[str, float, float, Optional[str]]]:
+        """(item, count, error, example) for the most frequent items, highest count first."""
+        ranked = sorted(self.items.items(), key=lambda kv: kv[1][0], reverse=True)
+        return [(item, count, error, example) for item, (count, error, example) in ranked[:n]]
+
+    @classmethod
+    def from_rows(cls, capacity: int, rows: Iterable[Tuple[str, float, float, Optional[str]]]) -> 'SpaceSaving':
+        """Rebuild a sketch from persisted (item, count, error, example) rows."""
+        sketch = cls(capacity)
+        for item, count, error, example in rows:
+            sketch.items[item] = [count, error, example]
+        return sketch
@@ -1,8 +1,13 @@
 import streamlit as st
 import plotly.express as px
+import plotly.graph_objects as go
 import pandas as pd
 import logging
-from typing import Dict
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+from analyzer.dashboard import OTHER_LABEL
+from analyzer.downsample import downsample_series
 
 # Configure logging
 logging.basicConfig(
@@ -19,14 +24,32 @@ class Visualizer:
         """Initialize Visualizer with configuration."""
         self.config = config
         self.log_levels = config.get('app', {}).get('log_levels', [])
+        timeline_config = config.get('timeline', {}) or {}
+        # Points drawn per level; longer series are downsampled with LTTB before plotting
+        self.render_points = timeline_config.get('render_points', 2000)
+        # Total points above which line charts switch to WebGL (scattergl) traces
+        self.webgl_threshold = timeline_config.get('webgl_threshold', 5000)
         logger.info("Visualizer initialized with config")
 
     def display_dashboard(self, timeline_data: pd.DataFrame, class_pivot: pd.DataFrame,
                          service_pivot: pd.DataFrame, class_totals: pd.DataFrame,
-                         service_totals: pd.DataFrame):
-        """Display the main dashboard with analysis visualizations."""
+                         service_totals: pd.DataFrame, estimate_note: Optional[str] = None,
+                         timeline_loader: Optional[Callable] = None,
+                         drilldown_loader: Optional[Callable] = None):
+        """Display the main dashboard with analysis visualizations.
+
+        estimate_note is set for sampled jobs: counts are then estimates and the
+        'ci' columns hold their 95% confidence half-widths. timeline_loader(start, end)
+        returns (timeline DataFrame, resolution) for a zoom window; without it the
+        hourly timeline_data is plotted as is. Class and service data may hold only the
+        top N names plus an OTHER_LABEL row; drilldown_loader(dimension, offset) then
+        returns per-level counts for the next names so "Other" can be expanded.
+        """
         try:
             st.subheader("Analysis Dashboard")
+            if estimate_note:
+                st.info(f"Estimated counts from a {estimate_note}. "
+                        "Error bars and ± values are 95% confidence intervals.")
             
             # Timeline Data
             if not timeline_data.empty:
@@ -42,36 +65,12 @@ class Visualizer:
                     })
                     timeline_data = timeline_data.dropna(subset=['hour'])
                 
-                if not timeline_data.empty:
-                    fig_timeline = px.line(
-                        timeline_data,
-                        x='hour',
-                        y='count',
-                        color='level',
-                        title="Log Counts by Hour",
-                        labels={'hour': 'Time', 'count': 'Count', 'level': 'Log Level'},
-                        color_discrete_sequence=px.colors.qualitative.Plotly
-                    )
-                    fig_timeline.update_layout(
-                        xaxis_title="Time",
-                        yaxis_title="Count",
-                        legend_title="Log Level",
-                        xaxis_tickformat="%Y-%m-%d %H:%M",
-                        xaxis=dict(
-                            tickmode='auto',
-                            nticks=20,
-                            rangeslider_visible=True,
-                            showgrid=True,
-                            gridcolor='rgba(200, 200, 200, 0.5)'
-                        ),
-                        yaxis=dict(
-                            showgrid=True,
-                            gridcolor='rgba(200, 200, 200, 0.5)'
-                        ),
-                        height=600,
-                        margin=dict(b=150)
-                    )
-                    st.plotly_chart(fig_timeline, use_container_width=True)
+                if not timeline_data.empty and timeline_loader is not None:
+                    self.display_zoomable_timeline(timeline_data, timeline_loader, estimate_note)
+                elif not timeline_data.empty:
+                    title = "Estimated Log Counts by Hour" if estimate_note else "Log Counts by Hour"
+                    st.plotly_chart(self._timeline_figure(timeline_data, 'hour', title, rangeslider=True),
+                                    use_container_width=True)
                 else:
                     st.info("No valid timeline data available for plotting")
                     logger.info("No valid timeline data after filtering")
@@ -89,6 +88,17 @@ class Visualizer:
                 st.markdown("### Log Level Counts by Service")
                 st.dataframe(service_pivot, use_container_width=True)
             
+            # Estimated totals with their confidence intervals
+            if estimate_note:
+                for totals, key in ((class_totals, 'class'), (service_totals, 'service')):
+                    if not totals.empty and 'ci' in totals.columns:
+                        st.markdown(f"### Estimated {key.title()} Totals")
+                        st.dataframe(
+                            totals.sort_values('count', ascending=False).rename(
+                                columns={key: key.title(), 'count': 'Estimated Count', 'ci': '± 95% CI'}),
+                            use_container_width=True
+                        )
+            
             # Class Distribution Bar Plot (Stacked by Log Level)
             if not class_pivot.empty:
                 st.markdown("### Class Distribution by Log Level")
@@ -103,6 +113,7 @@ class Visualizer:
                     barmode='stack',
                     title="Log Counts by Class and Level",
                     labels={'class': 'Class', 'count': 'Count', 'level': 'Log Level'},
+                    category_orders={'class': self._ranked_names(class_totals, 'class')},
                     color_discrete_sequence=px.colors.qualitative.Plotly
                 )
                 fig_class_bar.update_layout(
@@ -130,6 +141,8 @@ class Visualizer:
                     color_discrete_sequence=px.colors.qualitative.Plotly
                 )
                 st.plotly_chart(fig_class_pie, use_container_width=True)
+                if drilldown_loader is not None:
+                    self.display_other_drilldown(class_totals, 'class', drilldown_loader)
             
             # Service Distribution Bar Plot (Stacked by Log Level)
             if not service_pivot.empty:
@@ -145,6 +158,7 @@ class Visualizer:
                     barmode='stack',
                     title="Log Counts by Service and Level",
                     labels={'service': 'Service', 'count': 'Count', 'level': 'Log Level'},
+                    category_orders={'service': self._ranked_names(service_totals, 'service')},
                     color_discrete_sequence=px.colors.qualitative.Plotly
                 )
                 fig_service_bar.update_layout(
@@ -172,6 +186,8 @@ class Visualizer:
                     color_discrete_sequence=px.colors.qualitative.Plotly
                 )
                 st.plotly_chart(fig_service_pie, use_container_width=True)
+                if drilldown_loader is not None:
+                    self.display_other_drilldown(service_totals, 'service', drilldown_loader)
             
             logger.info("Dashboard displayed successfully")
         except Exception as e:
@@ -182,112 +198,341 @@ class Visualizer:
                 'timestamp': time.time()
             })
 
-    def display_csv_dashboard(self, csv_data: Dict[str, pd.DataFrame]):
-        """Display dashboard for uploaded CSV files."""
+    @staticmethod
+    def _ranked_names(totals: pd.DataFrame, key: str) -> list:
+        """Names ordered by total count, with the OTHER_LABEL row last."""
+        if totals.empty:
+            return []
+        names = totals.sort_values('count', ascending=False)[key].tolist()
+        return [name for name in names if name != OTHER_LABEL] + ([OTHER_LABEL] if OTHER_LABEL in names else [])
+
+    def display_other_drilldown(self, totals: pd.DataFrame, key: str, drilldown_loader: Callable):
+        """Expander that pages through the names folded into the OTHER_LABEL row."""
+        if totals.empty or OTHER_LABEL not in totals[key].values:
+            return
+        shown = len(totals) - 1
+        with st.expander(f"Expand \"{OTHER_LABEL}\" {key} values"):
+            page = st.number_input("Page", min_value=1, value=1, step=1, key=f"{key}_other_page",
+                                   help=f"Each page shows the next {shown} {key} values by count")
+            detail = drilldown_loader(key, shown * page)
+            if detail.empty:
+                st.info(f"No more {key} values")
+                return
+            named = detail[detail[key] != OTHER_LABEL]
+            first_rank = int(detail['rank'].min())
+            last_rank = int(named['rank'].max()) if not named.empty else first_rank
+            fig = px.bar(
+                detail,
+                x=key,
+                y='count',
+                color='level',
+                barmode='stack',
+                title=f"{key.title()} Ranks {first_rank}-{last_rank}",
+                labels={key: key.title(), 'count': 'Count', 'level': 'Log Level'},
+                category_orders={key: self._ranked_names(detail.groupby(key, as_index=False)['count'].sum(), key)},
+                color_discrete_sequence=px.colors.qualitative.Plotly
+            )
+            fig.update_layout(xaxis_tickangle=45, height=500, margin=dict(b=150))
+            st.plotly_chart(fig, use_container_width=True)
+
+    def _timeline_figure(self, timeline_data: pd.DataFrame, x: str, title: str, rangeslider: bool = False):
+        """Line chart of counts per level over time, with error bars when counts are estimates.
+
+        Each level is downsampled to render_points with LTTB, and the chart is drawn with
+        WebGL traces when the remaining points exceed webgl_threshold.
+        """
+        points = len(timeline_data)
+        timeline_data = downsample_series(timeline_data, x, 'count', self.render_points, group='level')
+        if len(timeline_data) < points:
+            logger.debug(f"Downsampled timeline from {points} to {len(timeline_data)} points")
+            title = f"{title} ({len(timeline_data):,d} of {points:,d} points)"
+        fig_timeline = px.line(
+            timeline_data,
+            x=x,
+            y='count',
+            color='level',
+            error_y='ci' if 'ci' in timeline_data.columns else None,
+            title=title,
+            labels={x: 'Time', 'count': 'Count', 'level': 'Log Level'},
+            color_discrete_sequence=px.colors.qualitative.Plotly,
+            render_mode='webgl' if len(timeline_data) > self.webgl_threshold else 'svg'
+        )
+        fig_timeline.update_layout(
+            xaxis_title="Time",
+            yaxis_title="Count",
+            legend_title="Log Level",
+            xaxis_tickformat="%Y-%m-%d %H:%M",
+            xaxis=dict(
+                tickmode='auto',
+                nticks=20,
+                rangeslider_visible=rangeslider,
+                showgrid=True,
+                gridcolor='rgba(200, 200, 200, 0.5)'
+            ),
+            yaxis=dict(
+                showgrid=True,
+                gridcolor='rgba(200, 200, 200, 0.5)'
+            ),
+            height=600,
+            margin=dict(b=150)
+        )
+        return fig_timeline
+
+    def display_zoomable_timeline(self, timeline_data: pd.DataFrame, timeline_loader: Callable,
+                                  estimate_note: Optional[str] = None, key_prefix: str = 'timeline'):
+        """Timeline with a zoom-window slider; the loader picks minute, hour or day buckets for the window.
+
+        Only the points inside the window are loaded and downsampled, so zooming in shows full detail.
+        """
+        first = timeline_data['hour'].min().to_pydatetime()
+        last = timeline_data['hour'].max().to_pydatetime() + timedelta(hours=1)
+        window = st.slider(
+            "Zoom Window",
+            min_value=first,
+            max_value=last,
+            value=(first, last),
+            step=timedelta(minutes=1),
+            format="YYYY-MM-DD HH:mm",
+            # Keyed by the job's span so switching jobs does not reuse an out-of-range window
+            key=f"{key_prefix}_window_{first:%Y%m%d%H}_{last:%Y%m%d%H}",
+            help="Narrow the window to zoom in; the chart switches to minute buckets when they fit"
+        )
+        zoomed, resolution = timeline_loader(window[0], window[1])
+        if zoomed.empty:
+            st.info("No log entries in the selected window")
+            return
+        title = f"{'Estimated ' if estimate_note else ''}Log Counts per {resolution.title()}"
+        st.plotly_chart(self._timeline_figure(zoomed, 'time', title), use_container_width=True)
+
+    def display_fact_slice(self, fact_slice: pd.DataFrame, group_by: list, estimate_note: Optional[str] = None):
+        """Chart and table for one slice of the fact cube grouped by the chosen dimensions."""
+        try:
+            if fact_slice.empty:
+                st.info("No log entries match this slice")
+                return
+            count_label = 'Estimated Count' if estimate_note else 'Count'
+            labels = {'count': count_label, 'hour': 'Time', 'service': 'Service', 'class': 'Class', 'level': 'Log Level'}
+            others = [dimension for dimension in group_by if dimension != 'hour']
+            color = others[0] if others else None
+            if 'hour' in group_by:
+                fig = px.line(fact_slice, x='hour', y='count', color=color,
+                              error_y='ci' if 'ci' in fact_slice.columns else None,
+                              title=f"{count_label} by Hour", labels=labels)
+                st.plotly_chart(fig, use_container_width=True)
+            elif group_by:
+                fig = px.bar(fact_slice, x=group_by[0], y='count',
+                             color=group_by[1] if len(group_by) > 1 else None,
+                             error_y='ci' if 'ci' in fact_slice.columns and len(group_by) == 1 else None,
+                             title=f"{count_label} by {' and '.join(d.title() for d in group_by)}", labels=labels)
+                fig.update_layout(xaxis_tickangle=45)
+                st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(fact_slice.drop(columns=['variance'], errors='ignore'), use_container_width=True)
+        except Exception as e:
+            logger.error(f"Error displaying fact slice: {str(e)}")
+            st.session_state.notifications.append({
+                'type': 'error',
+                'message': f"Error displaying slice: {str(e)}",
+                'timestamp': time.time()
+            })
+
+    def display_dimension_levels(self, top_values: pd.DataFrame, dimension: str, estimate_note: Optional[str] = None):
+        """Stacked per-level counts of the top pods, hosts, containers or threads, with the rest in "Other"."""
+        try:
+            if top_values.empty:
+                st.info(f"No {dimension} counts recorded for this selection")
+                return
+            count_label = 'Estimated Count' if estimate_note else 'Count'
+            names = top_values.sort_values('rank')[dimension].drop_duplicates().tolist()
+            fig = px.bar(
+                top_values,
+                x='count',
+                y=dimension,
+                color='level',
+                orientation='h',
+                barmode='stack',
+                category_orders={dimension: names},
+                title=f"Log Levels by {dimension.title()}",
+                labels={dimension: dimension.title(), 'count': count_label, 'level': 'Log Level'},
+                color_discrete_sequence=px.colors.qualitative.Plotly
+            )
+            fig.update_layout(height=max(400, 28 * len(names)), yaxis=dict(automargin=True))
+            st.plotly_chart(fig, use_container_width=True)
+            pivot = top_values.pivot_table(index=dimension, columns='level', values='count', aggfunc='sum', fill_value=0)
+            pivot = pivot.reindex(names).round().astype('int64')
+            pivot['Total'] = pivot.sum(axis=1)
+            st.dataframe(pivot, use_container_width=True)
+        except Exception as e:
+            logger.error(f"Error displaying {dimension} levels: {str(e)}")
+            st.session_state.notifications.append({
+                'type': 'error',
+                'message': f"Error displaying {dimension} levels: {str(e)}",
+                'timestamp': time.time()
+            })
+
+    def display_top_messages(self, top_messages: pd.DataFrame, estimate_note: Optional[str] = None):
+        """Display the noisiest normalized messages with their counts and an example line."""
+        try:
+            if top_messages.empty:
+                st.info("No message statistics recorded for this selection")
+                return
+            display = top_messages.copy()
+            display['count'] = display['count'].round().astype('int64')
+            display['error'] = display['error'].round().astype('int64')
+            count_label = 'Estimated Count' if estimate_note else 'Count'
+            fig = px.bar(
+                display.iloc[::-1],
+                x='count',
+                y='message',
+                color='level',
+                orientation='h',
+                hover_data=['class', 'error'],
+                title="Top Messages",
+                labels={'message': 'Message', 'count': count_label, 'level': 'Log Level'},
+                color_discrete_sequence=px.colors.qualitative.Plotly
+            )
+            fig.update_layout(height=max(400, 28 * len(display)), yaxis=dict(automargin=True))
+            st.plotly_chart(fig, use_container_width=True)
+            st.dataframe(
+                display.rename(columns={'class': 'Class', 'level': 'Level', 'message': 'Message',
+                                        'count': count_label, 'error': 'Max Overcount', 'example': 'Example'}),
+                use_container_width=True
+            )
+        except Exception as e:
+            logger.error(f"Error displaying top messages: {str(e)}")
+            st.session_state.notifications.append({
+                'type': 'error',
+                'message': f"Error displaying top messages: {str(e)}",
+                'timestamp': time.time()
+            })
+
+    @staticmethod
+    def csv_figure(file_name: str, df: pd.DataFrame, webgl_threshold: int = 5000):
+        """Figure for one uploaded qscript CSV, or None if the file has no chart."""
+        if file_name == 'class_level_counts':
+            return px.bar(
+                df,
+                x='class',
+                y='count',
+                color='level',
+                barmode='stack',
+                title="Class Level Counts",
+                labels={'class': 'Class', 'count': 'Count', 'level': 'Log Level'}
+            )
+        if file_name == 'level_summary':
+            return px.pie(
+                df,
+                names='level',
+                values='count',
+                title="Log Level Distribution"
+            )
+        if file_name in ['class_summary', 'pod_summary', 'container_summary', 'host_summary']:
+            return px.bar(
+                df,
+                x=file_name.split('_')[0],
+                y='count',
+                title=f"{file_name.split('_')[0].title()} Summary",
+                labels={file_name.split('_')[0]: file_name.split('_')[0].title(), 'count': 'Count'}
+            )
+        if file_name == 'class_level_pod':
+            return px.scatter(
+                df,
+                x='class',
+                y='pod',
+                size='count',
+                color='level',
+                title="Class vs Pod by Level",
+                labels={'class': 'Class', 'pod': 'Pod', 'count': 'Count', 'level': 'Log Level'},
+                render_mode='webgl' if len(df) > webgl_threshold else 'auto'
+            )
+        if file_name == 'thread_summary':
+            return px.bar(
+                df,
+                x='thread',
+                y='count',
+                title="Thread Summary",
+                labels={'thread': 'Thread', 'count': 'Count'}
+            )
+        if file_name == 'error_analysis':
+            if 'error_type' not in df.columns:
+                # qscript bundles count errors per class and pod
+                return px.bar(
+                    df,
+                    x='class',
+                    y='count',
+                    color='pod' if 'pod' in df.columns else None,
+                    title="Errors by Class",
+                    labels={'class': 'Class', 'count': 'Count', 'pod': 'Pod'}
+                )
+            return px.bar(
+                df,
+                x='error_type',
+                y='count',
+                title="Error Type Analysis",
+                labels={'error_type': 'Error Type', 'count': 'Count'}
+            )
+        if file_name == 'hourly_level_counts':
+            # qscript bundles count by hour of day rather than by timestamp
+            return px.bar(
+                df,
+                x='hour',
+                y='count',
+                color='level',
+                title="Log Levels by Hour of Day",
+                labels={'hour': 'Hour of Day', 'count': 'Count', 'level': 'Log Level'}
+            )
+        if file_name == 'time_range':
+            start_time = pd.to_datetime(df['start_time'])
+            end_time = pd.to_datetime(df['end_time'])
+            fig = go.Figure(data=[
+                go.Scatter(
+                    x=start_time,
+                    y=df['event'],
+                    mode='markers+lines',
+                    name='Start Time'
+                ),
+                go.Scatter(
+                    x=end_time,
+                    y=df['event'],
+                    mode='markers+lines',
+                    name='End Time'
+                )
+            ])
+            fig.update_layout(
+                title="Event Time Range",
+                xaxis_title="Time",
+                yaxis_title="Event"
+            )
+            return fig
+        return None
+
+    def display_csv_dashboard(self, csv_data: Dict[str, pd.DataFrame], digests: Optional[Dict[str, str]] = None):
+        """Display dashboard for uploaded CSV files or a qscript bundle.
+
+        digests maps file names to the content hash of their upload; figures of hashed
+        files are built once and reused on every rerun until the upload changes. The
+        DataFrames may be cached and shared between reruns, so they are never modified.
+        """
         try:
             st.subheader("CSV Analysis Dashboard")
+            digests = digests or {}
             
             for file_name, df in csv_data.items():
                 st.markdown(f"### {file_name.replace('_', ' ').title()}")
                 
-                if file_name == 'class_level_counts':
-                    fig = px.bar(
-                        df,
-                        x='class',
-                        y='count',
-                        color='level',
-                        barmode='stack',
-                        title="Class Level Counts",
-                        labels={'class': 'Class', 'count': 'Count', 'level': 'Log Level'}
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                elif file_name == 'level_summary':
-                    fig = px.pie(
-                        df,
-                        names='level',
-                        values='count',
-                        title="Log Level Distribution"
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                elif file_name == 'hourly_level_counts':
-                    df['hour'] = pd.to_datetime(df['hour'])
-                    fig = px.line(
-                        df,
-                        x='hour',
-                        y='count',
-                        color='level',
-                        title="Hourly Log Counts",
-                        labels={'hour': 'Time', 'count': 'Count', 'level': 'Log Level'}
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                elif file_name in ['class_summary', 'pod_summary', 'container_summary', 'host_summary']:
-                    fig = px.bar(
-                        df,
-                        x=file_name.split('_')[0],
-                        y='count',
-                        title=f"{file_name.split('_')[0].title()} Summary",
-                        labels={file_name.split('_')[0]: file_name.split('_')[0].title(), 'count': 'Count'}
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                elif file_name == 'class_level_pod':
-                    fig = px.scatter(
-                        df,
-                        x='class',
-                        y='pod',
-                        size='count',
-                        color='level',
-                        title="Class vs Pod by Level",
-                        labels={'class': 'Class', 'pod': 'Pod', 'count': 'Count', 'level': 'Log Level'}
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                elif file_name == 'thread_summary':
-                    fig = px.bar(
-                        df,
-                        x='thread',
-                        y='count',
-                        title="Thread Summary",
-                        labels={'thread': 'Thread', 'count': 'Count'}
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                elif file_name == 'error_analysis':
-                    fig = px.bar(
-                        df,
-                        x='error_type',
-                        y='count',
-                        title="Error Type Analysis",
-                        labels={'error_type': 'Error Type', 'count': 'Count'}
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
-                
-                elif file_name == 'time_range':
-                    df['start_time'] = pd.to_datetime(df['start_time'])
-                    df['end_time'] = pd.to_datetime(df['end_time'])
-                    fig = go.Figure(data=[
-                        go.Scatter(
-                            x=df['start_time'],
-                            y=df['event'],
-                            mode='markers+lines',
-                            name='Start Time'
-                        ),
-                        go.Scatter(
-                            x=df['end_time'],
-                            y=df['event'],
-                            mode='markers+lines',
-                            name='End Time'
-                        )
-                    ])
-                    fig.update_layout(
-                        title="Event Time Range",
-                        xaxis_title="Time",
-                        yaxis_title="Event"
-                    )
-                    st.plotly_chart(fig, use_container_width=True)
+                if file_name == 'hourly_level_counts' and not pd.api.types.is_numeric_dtype(df['hour']):
+                    hourly = df.assign(hour=pd.to_datetime(df['hour'])).dropna(subset=['hour'])
+                    if not hourly.empty:
+                        def load_window(start, end, hourly=hourly):
+                            window = hourly[(hourly['hour'] >= start) & (hourly['hour'] <= end)]
+                            return window.rename(columns={'hour': 'time'}), 'hour'
+                        self.display_zoomable_timeline(hourly, load_window, key_prefix='csv_hourly')
+                else:
+                    if file_name in digests:
+                        fig = _cached_csv_figure(digests[file_name], file_name, df, self.webgl_threshold)
+                    else:
+                        fig = self.csv_figure(file_name, df, self.webgl_threshold)
+                    if fig is not None:
+                        st.plotly_chart(fig, use_container_width=True)
                 
                 st.dataframe(df, use_container_width=True)
             
@@ -303,4 +548,9 @@ class Visualizer:
                 'type': 'error',
                 'message': f"Error displaying CSV dashboard: {str(e)}",
                 'timestamp': time.time()
-            })
\ No newline at end of file
+            })
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def _cached_csv_figure(digest: str, file_name: str, _df: pd.DataFrame, webgl_threshold: int):
+    """Visualizer.csv_figure cached by upload content hash; _df is excluded from the cache key."""
+    return Visualizer.csv_figure(file_name, _df, webgl_threshold)
@@ -6,9 +6,12 @@ import logging
 import time
 import json
 import sqlite3
-from datetime import datetime
+import hashlib
+import io
+from datetime import datetime, timedelta
 from analyzer.visualizer import Visualizer
-from analyzer.data_manager import export_to_excel, get_analysis_data, init_db, get_job_metadata, get_logs_by_class_and_level, get_logs_by_service_and_level
+from analyzer.bundle import BUNDLE_SUFFIX, read_bundle_frames
+from analyzer.data_manager import export_to_excel, get_analysis_data, init_db, get_job_metadata, get_logs_by_class_and_level, get_logs_by_service_and_level, get_job_stats, get_job_sampling, get_totals, get_top_messages, get_timeline, get_fact_slice, get_top_n, get_time_range, clear_query_cache, read_connection, read_snapshot
 from retrying import retry
 import os
 
@@ -69,6 +72,8 @@ def initialize_session_state():
         st.session_state.log_viewer_total_logs = 0
     if 'log_viewer_last_job_id' not in st.session_state:
         st.session_state.log_viewer_last_job_id = None
+    if 'dashboard_payloads' not in st.session_state:
+        st.session_state.dashboard_payloads = {}
 
 @retry(stop_max_attempt_number=3, wait_exponential_multiplier=1000, wait_exponential_max=10000)
 def check_backend_health():
@@ -83,7 +88,7 @@ def check_backend_health():
         if st.session_state.selected_job_id:
             # Verify job_id exists in jobs table
             try:
-                conn = sqlite3.connect('data/logs.db', timeout=30)
+                conn = read_connection()
                 cursor = conn.cursor()
                 cursor.execute("SELECT job_id FROM jobs WHERE job_id = ?", (st.session_state.selected_job_id,))
                 job_exists = cursor.fetchone()
@@ -334,7 +339,7 @@ def apply_custom_css():
 def get_job_status():
     """Fetch all job statuses from SQLite database."""
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=30)
+        conn = read_connection()
         query = """
             SELECT job_id, folder_path, status, files_processed, total_files, start_time, last_updated
             FROM jobs
@@ -360,8 +365,8 @@ def get_job_status():
         return pd.DataFrame()
 
 @retry(stop_max_attempt_number=3, wait_exponential_multiplier=1000, wait_exponential_max=10000)
-def start_analysis(folder_path):
-    """Start a new analysis job via backend API."""
+def start_analysis(folder_path, sampling=None):
+    """Start a new analysis job via backend API, in sample mode when sampling options are given."""
     if not st.session_state.backend_available:
         st.session_state.notifications.append({
             'type': 'error',
@@ -370,7 +375,10 @@ def start_analysis(folder_path):
         })
         return
     try:
-        response = requests.post(f"{BACKEND_URL}/jobs/start", json={"folder_path": folder_path}, timeout=10)
+        payload = {"folder_path": folder_path}
+        if sampling:
+            payload.update({"mode": "sample", **sampling})
+        response = requests.post(f"{BACKEND_URL}/jobs/start", json=payload, timeout=10)
         response.raise_for_status()
         job = response.json()
         st.session_state.selected_job_id = job['job_id']
@@ -472,6 +480,88 @@ def delete_analysis(job_id):
             'timestamp': time.time()
         })
 
+def fetch_dashboard_payload(job_id):
+    """Fetch the precomputed dashboard payload from the backend, revalidating the cached copy by ETag."""
+    cached = st.session_state.dashboard_payloads.get(job_id)
+    headers = {'If-None-Match': cached['etag']} if cached and cached.get('etag') else {}
+    response = requests.get(f"{BACKEND_URL}/jobs/{job_id}/dashboard", headers=headers, timeout=30)
+    if response.status_code == 304 and cached:
+        logger.debug(f"Dashboard payload for job {job_id} not modified")
+        return cached['payload']
+    response.raise_for_status()
+    payload = response.json()
+    st.session_state.dashboard_payloads[job_id] = {'etag': response.headers.get('ETag'), 'payload': payload}
+    logger.info(f"Fetched dashboard payload for job {job_id} at version {payload.get('data_version')}")
+    return payload
+
+def dashboard_data_from_payload(payload):
+    """Turn the backend's columnar dashboard payload into the DataFrames the Visualizer expects."""
+    timeline_data = pd.DataFrame(payload['timeline'])
+    if not timeline_data.empty:
+        timeline_data['hour'] = pd.to_datetime(timeline_data['hour'])
+    return {
+        'timeline_data': timeline_data,
+        'class_pivot': pd.DataFrame(payload['class_pivot']),
+        'service_pivot': pd.DataFrame(payload['service_pivot']),
+        'class_totals': pd.DataFrame(payload['class_totals']),
+        'service_totals': pd.DataFrame(payload['service_totals'])
+    }
+
+def load_dashboard_data(job_id, progress_bar, status_text):
+    """Query and pivot the summary views locally; used when the backend is not reachable."""
+    status_text.text("Fetching summary data...")
+    config = load_config()
+    top_n = config.get('dashboard', {}).get('top_n', 20)
+    # Read all three views from one snapshot so they reflect the same committed batch
+    with read_snapshot():
+        timeline_data = get_analysis_data(job_id=job_id, query_type='timeline')
+        level_counts_by_class = get_top_n(job_id, 'class', top_n)
+        level_counts_by_service = get_top_n(job_id, 'service', top_n)
+    # Sort timeline data by hour
+    if not timeline_data.empty:
+        timeline_data['hour'] = pd.to_datetime(timeline_data['hour'])
+        timeline_data = timeline_data.sort_values('hour')
+    progress_bar.progress(0.25)
+    
+    log_levels = config['app']['log_levels']
+    status_text.text("Pivoting class-level counts...")
+    # Pivot class data: class as index, levels as columns
+    if not level_counts_by_class.empty:
+        class_pivot = level_counts_by_class.pivot(index='class', columns='level', values='count').fillna(0)
+        # Ensure all log levels are present as columns
+        for level in log_levels:
+            if level not in class_pivot.columns:
+                class_pivot[level] = 0
+        class_pivot = class_pivot.reset_index()
+    else:
+        class_pivot = pd.DataFrame(columns=['class'] + log_levels)
+    progress_bar.progress(0.50)
+    
+    status_text.text("Pivoting service-level counts...")
+    # Pivot service data: service as index, levels as columns
+    if not level_counts_by_service.empty:
+        service_pivot = level_counts_by_service.pivot(index='service', columns='level', values='count').fillna(0)
+        # Ensure all log levels are present as columns
+        for level in log_levels:
+            if level not in service_pivot.columns:
+                service_pivot[level] = 0
+        service_pivot = service_pivot.reset_index()
+    else:
+        service_pivot = pd.DataFrame(columns=['service'] + log_levels)
+    progress_bar.progress(0.75)
+    
+    status_text.text("Fetching class and service totals...")
+    # Calculate total counts for class and service bar/pie charts
+    class_totals = get_totals(level_counts_by_class, 'class')
+    service_totals = get_totals(level_counts_by_service, 'service')
+    return {
+        'timeline_data': timeline_data,
+        'class_pivot': class_pivot,
+        'service_pivot': service_pivot,
+        'class_totals': class_totals,
+        'service_totals': service_totals
+    }
+
 def view_analysis(visualizer):
     """View analysis results for the selected job with progress feedback in main page."""
     try:
@@ -483,59 +573,25 @@ def view_analysis(visualizer):
             })
             return
         
+        job_id = st.session_state.selected_job_id
         with st.container():
             st.markdown('<div class="card">', unsafe_allow_html=True)
             with st.spinner("Loading analysis data..."):
                 progress_bar = st.progress(0)
                 status_text = st.empty()
-                steps = 4
-                step_increment = 1.0 / steps
-                
-                status_text.text("Fetching timeline data...")
-                timeline_data = get_analysis_data(job_id=st.session_state.selected_job_id, query_type='timeline')
-                # Sort timeline data by hour
-                if not timeline_data.empty:
-                    timeline_data['hour'] = pd.to_datetime(timeline_data['hour'])
-                    timeline_data = timeline_data.sort_values('hour')
-                progress_bar.progress(0.25)
-                
-                status_text.text("Fetching class-level counts...")
-                level_counts_by_class = get_analysis_data(job_id=st.session_state.selected_job_id, query_type='class')
-                # Pivot class data: class as index, levels as columns
-                if not level_counts_by_class.empty:
-                    class_pivot = level_counts_by_class.pivot(index='class', columns='level', values='count').fillna(0)
-                    # Ensure all log levels are present as columns
-                    config = load_config()
-                    log_levels = config['app']['log_levels']
-                    for level in log_levels:
-                        if level not in class_pivot.columns:
-                            class_pivot[level] = 0
-                    class_pivot = class_pivot.reset_index()
-                else:
-                    class_pivot = pd.DataFrame(columns=['class'] + log_levels)
-                progress_bar.progress(0.50)
-                
-                status_text.text("Fetching service-level counts...")
-                level_counts_by_service = get_analysis_data(job_id=st.session_state.selected_job_id, query_type='service')
-                # Pivot service data: service as index, levels as columns
-                if not level_counts_by_service.empty:
-                    service_pivot = level_counts_by_service.pivot(index='service', columns='level', values='count').fillna(0)
-                    # Ensure all log levels are present as columns
-                    for level in log_levels:
-                        if level not in service_pivot.columns:
-                            service_pivot[level] = 0
-                    service_pivot = service_pivot.reset_index()
-                else:
-                    service_pivot = pd.DataFrame(columns=['service'] + log_levels)
-                progress_bar.progress(0.75)
                 
-                status_text.text("Fetching class and service totals...")
-                # Calculate total counts for class and service bar/pie charts
-                class_totals = level_counts_by_class.groupby('class')['count'].sum().reset_index()
-                service_totals = level_counts_by_service.groupby('service')['count'].sum().reset_index()
+                dashboard_data = None
+                if st.session_state.backend_available:
+                    try:
+                        status_text.text("Fetching dashboard payload...")
+                        dashboard_data = dashboard_data_from_payload(fetch_dashboard_payload(job_id))
+                    except (requests.RequestException, KeyError, ValueError) as e:
+                        logger.warning(f"Dashboard payload unavailable for job {job_id}, querying locally: {str(e)}")
+                if dashboard_data is None:
+                    dashboard_data = load_dashboard_data(job_id, progress_bar, status_text)
                 progress_bar.progress(1.0)
                 
-                if all(df.empty for df in [timeline_data, level_counts_by_class, level_counts_by_service, class_totals, service_totals]):
+                if all(df.empty for df in dashboard_data.values()):
                     st.session_state.notifications.append({
                         'type': 'warning',
                         'message': "No analysis data available for this job",
@@ -546,13 +602,8 @@ def view_analysis(visualizer):
                     st.markdown('</div>', unsafe_allow_html=True)
                     return
                 
-                st.session_state.dashboard_data = {
-                    'timeline_data': timeline_data,
-                    'class_pivot': class_pivot,
-                    'service_pivot': service_pivot,
-                    'class_totals': class_totals,
-                    'service_totals': service_totals
-                }
+                dashboard_data['estimate_note'] = describe_sampling(get_job_sampling(job_id))
+                st.session_state.dashboard_data = dashboard_data
                 
                 st.session_state.show_dashboard = True
                 
@@ -606,19 +657,74 @@ def download_results(job_id):
             'timestamp': time.time()
         })
 
+# CSV outputs the CSV Visualization tab can chart
+SUPPORTED_CSV_FILES = [
+    'class_level_counts', 'level_summary', 'class_summary', 'pod_summary',
+    'container_summary', 'host_summary', 'class_level_pod', 'hourly_level_counts',
+    'thread_summary', 'error_analysis', 'time_range'
+]
+
+# Explicit column types for the CSV tab; repeated labels are stored once as categories
+CSV_DTYPES = {
+    'class': 'category', 'level': 'category', 'pod': 'category', 'container': 'category',
+    'host': 'category', 'thread': 'category', 'error_type': 'category', 'event': 'category',
+    'count': 'int64'
+}
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def parse_csv(digest: str, file_name: str, _data: bytes) -> pd.DataFrame:
+    """Parse an uploaded CSV once per content hash; _data is excluded from the cache key."""
+    try:
+        df = pd.read_csv(io.BytesIO(_data), engine='pyarrow', dtype=CSV_DTYPES)
+    except (ImportError, ValueError) as e:
+        # No pyarrow, or a column that does not fit its declared type
+        logger.warning(f"pyarrow CSV parse failed for {file_name}, using the default parser: {str(e)}")
+        df = pd.read_csv(io.BytesIO(_data))
+    logger.info(f"Parsed CSV {file_name} ({len(_data)} bytes, {len(df)} rows)")
+    return df
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def load_bundle(digest: str, _data: bytes):
+    """Analyses of an uploaded qscript bundle, read in place once per content hash."""
+    frames, index = read_bundle_frames(_data)
+    logger.info(f"Loaded bundle {digest} ({len(_data)} bytes, {len(frames)} analyses)")
+    return frames, index
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def load_bundle_file(path: str, size: int, mtime_ns: int):
+    """Analyses of a qscript bundle on disk, memory-mapped; size and mtime_ns key out rewritten files."""
+    frames, index = read_bundle_frames(path)
+    logger.info(f"Memory-mapped bundle {path} ({size} bytes, {len(frames)} analyses)")
+    return frames, index
+
+def add_bundle_frames(csv_data, digests, frames, bundle_key):
+    """Add a bundle's supported analyses to the CSV tab's data, keyed for figure caching."""
+    for name, df in frames.items():
+        if name in SUPPORTED_CSV_FILES:
+            csv_data[name] = df
+            digests[name] = f"{bundle_key}/{name}"
+
 def process_csv_files(uploaded_files):
-    """Process uploaded CSV files."""
+    """Process uploaded CSV files and qscript bundles.
+
+    Returns (csv_data, digests): parsed DataFrames and the content hash of each upload,
+    so unchanged uploads are neither re-parsed nor re-plotted on reruns.
+    """
     csv_data = {}
+    digests = {}
     for file in uploaded_files:
         try:
-            df = pd.read_csv(file)
+            if file.name.lower().endswith(BUNDLE_SUFFIX):
+                data = file.getvalue()
+                digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+                frames, _ = load_bundle(digest, data)
+                add_bundle_frames(csv_data, digests, frames, digest)
+                continue
             file_name = file.name.lower().replace('.csv', '')
-            if file_name in [
-                'class_level_counts', 'level_summary', 'class_summary', 'pod_summary',
-                'container_summary', 'host_summary', 'class_level_pod', 'hourly_level_counts',
-                'thread_summary', 'error_analysis', 'time_range'
-            ]:
-                csv_data[file_name] = df
+            if file_name in SUPPORTED_CSV_FILES:
+                data = file.getvalue()
+                digests[file_name] = hashlib.blake2b(data, digest_size=16).hexdigest()
+                csv_data[file_name] = parse_csv(digests[file_name], file_name, data)
             else:
                 st.session_state.csv_notifications.append({
                     'type': 'warning',
@@ -632,7 +738,7 @@ def process_csv_files(uploaded_files):
                 'message': f"Error processing CSV {file.name}: {str(e)}",
                 'timestamp': time.time()
             })
-    return csv_data
+    return csv_data, digests
 
 def display_notifications():
     """Display notifications with 5-second auto-expiry."""
@@ -706,6 +812,99 @@ def display_csv_notifications():
         logger.debug("Cleared CSV notification container")
         st.experimental_rerun()
 
+# Ingestion stages recorded in job_stats, in hot-path order
+STAGE_LABELS = [
+    ('decompress', 'Decompress'),
+    ('decode', 'Decode'),
+    ('timestamp', 'Timestamp Parse'),
+    ('raw_insert', 'Raw Insert'),
+    ('summary', 'Summary Upsert'),
+    ('sketch', 'Message Sketch'),
+    ('metadata', 'Metadata Insert'),
+    ('commit', 'Commit')
+]
+
+def format_job_stats(stats):
+    """Render ingestion throughput and per-stage timings as HTML for the Job Details card."""
+    if not stats or not stats.get('total_seconds'):
+        return ''
+    total_seconds = stats['total_seconds']
+    lines = stats.get('lines') or 0
+    megabytes = (stats.get('bytes_decompressed') or 0) / 1024**2
+    stage_parts = []
+    for stage, label in STAGE_LABELS:
+        seconds = stats.get(f'{stage}_seconds') or 0.0
+        stage_parts.append(f"{label}: {seconds:.2f}s ({seconds / total_seconds * 100:.0f}%)")
+    return (
+        f"<p><strong>Lines Ingested:</strong> {lines:,} ({lines / total_seconds:,.0f} lines/s, "
+        f"{megabytes / total_seconds:.1f} MB/s over {total_seconds:.1f}s)</p>"
+        f"<p><strong>Stage Timings:</strong> {' | '.join(stage_parts)}</p>"
+    )
+
+def describe_sampling(sampling):
+    """One-line description of a sampled job, or None for a fully ingested job."""
+    if not sampling or sampling.get('mode') != 'sample':
+        return None
+    if sampling.get('sample_method') == 'reservoir' and sampling.get('sample_unit') == 'lines':
+        size = sampling.get('sample_size') or load_config().get('sampling', {}).get('reservoir_size', 10000)
+        return f"Reservoir sample of up to {size:,} lines per file"
+    requested = sampling.get('sample_rate') or 0
+    applied = sampling.get('applied_rate') or requested
+    note = f"{applied * 100:.3g}% {sampling.get('sample_method')} sample of {sampling.get('sample_unit')}"
+    if abs(applied - requested) >= 0.0005:
+        note += f" (requested {requested * 100:g}%)"
+    return note
+
+def display_slice_and_dice(visualizer, job_id, config):
+    """Filter the job's fact cube by service, class, level and hours and group by any dimensions."""
+    st.markdown("### Slice & Dice")
+    # Every class and service of the job, not just the ones left after top-N folding
+    class_options, service_options = get_job_metadata(job_id)
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        services = st.multiselect("Services", options=sorted(service_options), key="slice_services")
+    with col2:
+        classes = st.multiselect("Classes", options=sorted(class_options), key="slice_classes")
+    with col3:
+        levels = st.multiselect("Levels", options=config['app']['log_levels'], key="slice_levels")
+    group_by = st.multiselect("Group By", options=['class', 'service', 'level', 'hour'], default=['class'],
+                              key="slice_group_by", help="Dimensions to aggregate the matching log entries by")
+    first, last = get_time_range(job_id)
+    start, end = None, None
+    if first and last and last > first:
+        window = st.slider(
+            "Hours",
+            min_value=first,
+            max_value=last,
+            value=(first, last),
+            step=timedelta(hours=1),
+            format="YYYY-MM-DD HH:mm",
+            key=f"slice_hours_{first:%Y%m%d%H}_{last:%Y%m%d%H}"
+        )
+        # Only a narrowed window filters by hour, so lines without timestamps count otherwise
+        if window != (first, last):
+            start, end = window
+    fact_slice = get_fact_slice(job_id, group_by, services=services, classes=classes, levels=levels,
+                                start=start, end=end)
+    visualizer.display_fact_slice(fact_slice, group_by, dashboard_data.get('estimate_note'))
+
+def display_dimension_breakdown(visualizer, job_id, config):
+    """Per-level counts by pod, host, container or thread, read from the rollups kept during ingestion."""
+    st.markdown("### Pods & Hosts")
+    col1, col2 = st.columns(2)
+    with col1:
+        dimension = st.selectbox("Breakdown", options=['pod', 'host', 'container', 'thread'],
+                                 format_func=str.title, key="dimension_breakdown")
+    with col2:
+        levels = config['app']['log_levels']
+        level = st.selectbox("Rank By", options=['ALL'] + levels,
+                             index=levels.index('ERROR') + 1 if 'ERROR' in levels else 0,
+                             key="dimension_breakdown_level",
+                             help="Rank by the count of one level, e.g. the pods logging the most ERRORs")
+    top_values = get_top_n(job_id, dimension, config.get('dashboard', {}).get('top_n', 20),
+                           level=None if level == 'ALL' else level)
+    visualizer.display_dimension_levels(top_values, dimension, st.session_state.dashboard_data.get('estimate_note'))
+
 def update_selected_job_id():
     """Update selected job ID in session state for Log Analysis tab."""
     selected_job = st.session_state.job_select
@@ -723,12 +922,9 @@ def update_log_viewer_job_id():
         if st.session_state.log_viewer_job_id != selected_job:
             st.session_state.log_viewer_job_id = selected_job
             if st.session_state.log_viewer_last_job_id != selected_job:
-                get_job_metadata.clear()
-                get_logs_by_class_and_level.clear()
-                get_logs_by_service_and_level.clear()
+                # Cached reads are keyed by job and data version, so other jobs' entries stay valid
                 st.session_state.cached_job_id = selected_job
                 st.session_state.log_viewer_last_job_id = selected_job
-                logger.info(f"Cleared cache for new job_id: {selected_job}")
             # Reset pagination
             st.session_state.log_viewer_current_page = 1
             st.session_state.log_viewer_total_pages = 1
@@ -736,9 +932,6 @@ def update_log_viewer_job_id():
             st.session_state.log_viewer_total_logs = 0
     else:
         st.session_state.log_viewer_job_id = None
-        get_job_metadata.clear()
-        get_logs_by_class_and_level.clear()
-        get_logs_by_service_and_level.clear()
         st.session_state.cached_job_id = None
         st.session_state.log_viewer_last_job_id = None
         st.session_state.log_viewer_current_page = 1
@@ -802,6 +995,7 @@ def main():
         with col2:
             st.markdown('<div class="tooltip">', unsafe_allow_html=True)
             if st.button("Clear Cache", key="clear_cache"):
+                clear_query_cache()
                 st.cache_data.clear()
                 st.cache_resource.clear()
                 st.session_state.notifications.append({
@@ -814,6 +1008,9 @@ def main():
         with st.container():
             if st.session_state.selected_job_id and not job_status_df.empty:
                 job_info = job_status_df[job_status_df['job_id'] == st.session_state.selected_job_id].iloc[0]
+                job_stats_html = format_job_stats(get_job_stats(st.session_state.selected_job_id))
+                sampling_note = describe_sampling(get_job_sampling(st.session_state.selected_job_id))
+                mode_html = f"Sample ({sampling_note}) - counts are estimates" if sampling_note else "Full"
                 st.markdown(
                     f"""
                     <div class="card">
@@ -821,9 +1018,11 @@ def main():
                         <p><strong>Job ID:</strong> {st.session_state.selected_job_id}</p>
                         <p><strong>Folder Path:</strong> {job_info.get('folder_path', 'N/A')}</p>
                         <p><strong>Status:</strong> {job_info.get('status', 'N/A')}</p>
+                        <p><strong>Mode:</strong> {mode_html}</p>
                         <p><strong>Files Processed:</strong> {job_info.get('files_processed', 0)} / {job_info.get('total_files', 0)}</p>
                         <p><strong>Start Time:</strong> {job_info.get('start_time', 'N/A')}</p>
                         <p><strong>Last Updated:</strong> {job_info.get('last_updated', 'N/A')}</p>
+                        {job_stats_html}
                     </div>
                     """,
                     unsafe_allow_html=True
@@ -836,8 +1035,39 @@ def main():
                     st.session_state.dashboard_data['class_pivot'],
                     st.session_state.dashboard_data['service_pivot'],
                     st.session_state.dashboard_data['class_totals'],
-                    st.session_state.dashboard_data['service_totals']
+                    st.session_state.dashboard_data['service_totals'],
+                    st.session_state.dashboard_data.get('estimate_note'),
+                    timeline_loader=lambda start, end: get_timeline(
+                        st.session_state.selected_job_id, start, end,
+                        config.get('timeline', {}).get('max_points', 1500)
+                    ),
+                    drilldown_loader=lambda dimension, offset: get_top_n(
+                        st.session_state.selected_job_id, dimension,
+                        config.get('dashboard', {}).get('top_n', 20), offset
+                    )
+                )
+                
+                st.markdown("### Top Noisy Messages")
+                top_col1, top_col2 = st.columns(2)
+                with top_col1:
+                    top_class = st.selectbox(
+                        "Class",
+                        options=['ALL'] + sorted(get_job_metadata(st.session_state.selected_job_id)[0]),
+                        key="top_messages_class"
+                    )
+                with top_col2:
+                    top_level = st.selectbox("Level", options=['ALL'] + config['app']['log_levels'], key="top_messages_level")
+                top_messages = get_top_messages(
+                    st.session_state.selected_job_id,
+                    class_name=None if top_class == 'ALL' else top_class,
+                    level=None if top_level == 'ALL' else top_level,
+                    limit=config.get('topk', {}).get('display', 20)
                 )
+                visualizer.display_top_messages(top_messages, st.session_state.dashboard_data.get('estimate_note'))
+                
+                display_dimension_breakdown(visualizer, st.session_state.selected_job_id, config)
+                
+                display_slice_and_dice(visualizer, st.session_state.selected_job_id, config)
                 st.markdown('</div>', unsafe_allow_html=True)
 
         with st.sidebar:
@@ -849,11 +1079,31 @@ def main():
                 key="folder_path",
                 help="Enter the path to the folder containing .gz log files"
             )
+            sample_mode = st.checkbox(
+                "Sample Mode (approximate)",
+                key="sample_mode",
+                help="Ingest only a fraction of lines or files for a fast first-pass triage; counts become estimates"
+            )
+            sampling = None
+            if sample_mode:
+                sample_unit = st.selectbox("Sample Unit", options=['lines', 'files'], key="sample_unit")
+                sample_method = st.selectbox("Sample Method", options=['systematic', 'reservoir'], key="sample_method",
+                                             help="Systematic keeps every k-th line or file; reservoir keeps a uniform random sample")
+                sampling = {'sample_method': sample_method, 'sample_unit': sample_unit}
+                if sample_method == 'reservoir' and sample_unit == 'lines':
+                    # Reservoirs keep a fixed number of lines per file since file lengths are unknown up front
+                    sampling['sample_size'] = st.number_input(
+                        "Lines Per File", min_value=100, value=int(config.get('sampling', {}).get('reservoir_size', 10000)),
+                        step=1000, key="sample_size", help="Reservoir capacity: lines kept from each file"
+                    )
+                else:
+                    sampling['sample_rate'] = st.slider("Sample Rate", min_value=0.01, max_value=1.0, value=0.1,
+                                                        step=0.01, key="sample_rate")
             st.markdown('<div class="tooltip">', unsafe_allow_html=True)
             if st.button("Start Analysis", key="start_analysis"):
                 if folder_path:
                     if st.session_state.backend_available:
-                        start_analysis(folder_path)
+                        start_analysis(folder_path, sampling)
                     else:
                         st.session_state.notifications.append({
                             'type': 'error',
@@ -1086,16 +1336,33 @@ def main():
         st.markdown('<div class="tab-content">', unsafe_allow_html=True)
         st.header("CSV Visualization")
         uploaded_files = st.file_uploader(
-            "Upload CSV Files",
+            "Upload CSV Files or a qscript Bundle",
             accept_multiple_files=True,
-            type=['csv'],
-            help="Upload CSV files for visualization"
+            type=['csv', BUNDLE_SUFFIX.lstrip('.')],
+            help=f"Upload qscript CSV files, or the analyses_*{BUNDLE_SUFFIX} file that holds all of them"
         )
-        if uploaded_files:
+        bundle_path = st.text_input(
+            "Or open a qscript bundle on this machine",
+            help=f"Path to an analyses_*{BUNDLE_SUFFIX} file; it is memory-mapped instead of uploaded"
+        ).strip()
+        if uploaded_files or bundle_path:
             with st.spinner("Processing CSV files..."):
-                csv_data = process_csv_files(uploaded_files)
+                csv_data, digests = process_csv_files(uploaded_files or [])
+                if bundle_path:
+                    try:
+                        stat = os.stat(bundle_path)
+                        frames, _ = load_bundle_file(bundle_path, stat.st_size, stat.st_mtime_ns)
+                        add_bundle_frames(csv_data, digests, frames,
+                                          f"{bundle_path}:{stat.st_size}:{stat.st_mtime_ns}")
+                    except (OSError, ValueError) as e:
+                        logger.error(f"Error opening bundle {bundle_path}: {str(e)}")
+                        st.session_state.csv_notifications.append({
+                            'type': 'error',
+                            'message': f"Error opening bundle {bundle_path}: {str(e)}",
+                            'timestamp': time.time()
+                        })
                 visualizer = Visualizer(load_config())
-                visualizer.display_csv_dashboard(csv_data)
+                visualizer.display_csv_dashboard(csv_data, digests)
                 display_csv_notifications()
         st.markdown('</div>', unsafe_allow_html=True)
 
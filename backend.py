@@ -1,16 +1,27 @@
 import asyncio
 import gzip
-import json
 import os
 import sqlite3
 import logging
 import pandas as pd
+import time
 import uuid
-from fastapi import FastAPI, HTTPException
+from collections import Counter
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response
 from pydantic import BaseModel
 from datetime import datetime
+from itertools import islice, repeat
 from typing import Dict, Optional
-from analyzer.data_manager import init_db
+from analyzer.dashboard import DashboardAggregate
+from analyzer.db import DB_PATH, checkpoint_wal, connect
+from analyzer.data_manager import UNKNOWN_HOUR, init_db
+from analyzer.dimensions import LOG_DIMENSIONS, DimensionEncoder
+from analyzer.log_processor import LogProcessor
+from analyzer.metrics import MetricsRegistry, CONTENT_TYPE
+from analyzer.sketches import SpaceSaving, normalize_message
+from analyzer.sampling import (ReservoirSampler, SystematicSampler, estimate_variance, select_files,
+                               validate_sampling)
 from yaml import safe_load
 from retrying import retry
 
@@ -28,8 +39,24 @@ app = FastAPI(title="Saviynt Log Analyzer Backend")
 job_states: Dict[str, Dict] = {}
 db_initialized = False
 
+# Ingestion metrics exposed on /metrics, labeled per job
+metrics = MetricsRegistry()
+lines_parsed_total = metrics.counter('log_analyzer_lines_parsed_total', 'Log lines successfully decoded from JSON')
+bytes_decompressed_total = metrics.counter('log_analyzer_bytes_decompressed_total', 'Bytes read from decompressed .gz log files')
+invalid_json_lines_total = metrics.counter('log_analyzer_invalid_json_lines_total', 'Log lines that were not valid JSON')
+invalid_timestamps_total = metrics.counter('log_analyzer_invalid_timestamps_total', 'Log lines with an unparseable logtime')
+rows_inserted_total = metrics.counter('log_analyzer_rows_inserted_total', 'Rows inserted into the logs table')
+batch_commit_seconds = metrics.histogram('log_analyzer_batch_commit_seconds', 'Time to write and commit one batch of log rows')
+summary_upsert_seconds = metrics.histogram('log_analyzer_summary_upsert_seconds', 'Time to upsert the summary tables for one batch')
+file_duration_seconds = metrics.histogram('log_analyzer_file_duration_seconds', 'Time to process one .gz log file')
+
 class StartJobRequest(BaseModel):
     folder_path: str
+    mode: str = 'full'
+    sample_rate: float = 0.1
+    sample_method: str = 'systematic'
+    sample_unit: str = 'lines'
+    sample_size: Optional[int] = None
 
 class JobResponse(BaseModel):
     job_id: str
@@ -39,6 +66,11 @@ class JobResponse(BaseModel):
     total_files: int
     start_time: str
     last_updated: str
+    mode: str = 'full'
+    sample_rate: Optional[float] = None
+    sample_method: Optional[str] = None
+    sample_unit: Optional[str] = None
+    sample_size: Optional[int] = None
 
 def load_config():
     """Load configuration from YAML file."""
@@ -54,214 +86,442 @@ def load_config():
 
 config = load_config()
 
-def update_summary_tables(conn: sqlite3.Connection, job_id: str, batch: list):
-    """Update summary tables with batched log entries."""
+# Dashboard totals per job, built on first request and updated incrementally as batches commit
+dashboard_aggregates: Dict[str, DashboardAggregate] = {}
+
+# Stages of the ingestion hot path timed per file and per job
+STAGE_NAMES = ('decompress', 'decode', 'timestamp', 'raw_insert', 'summary', 'sketch', 'metadata', 'commit')
+
+# Size of the decompressed blocks read from each .gz file
+READ_BLOCK_SIZE = 1 << 20
+
+# Longest raw example message stored with each top message
+MAX_EXAMPLE_LENGTH = 2000
+
+# Log rows inserted and committed per transaction
+DEFAULT_BATCH_SIZE = 500
+
+# WAL size past which ingestion forces a truncating checkpoint between files
+WAL_MAX_BYTES = int((config.get('database') or {}).get('wal_max_mb', 64) * 1024 * 1024)
+
+def update_summary_tables(conn: sqlite3.Connection, job_id: str, columns: Dict[str, list], weight: float = 1.0,
+                          dimension_ids: Optional[Dict[str, list]] = None):
+    """Aggregate a batch of parsed log columns into the log_facts cube, the minute timeline and the dimension rollups.
+
+    columns is the output of LogProcessor.parse_batch and dimension_ids the dimension_values
+    ids of each line's pod, host, container and thread, keyed by LOG_DIMENSIONS. Returns the
+    (hour, service, class, level, count, est_count, est_variance) deltas that were written.
+    Does not commit: the caller commits the raw rows, summaries and metadata of a batch as
+    one transaction, and errors are re-raised so it can roll the whole batch back instead.
+
+    Each entry stands for `weight` lines of the full job (1 outside sampling mode); the
+    estimated count and its variance are accumulated next to the sampled count. The
+    class/service/timeline summary views are all derived from log_facts.
+    """
     try:
         cursor = conn.cursor()
-        class_level_batch = {}
-        service_level_batch = {}
-        timeline_batch = {}
-        class_service_batch = {}
-        invalid_timestamp_count = 0
+        fact_batch = {}
+        minute_batch = {}
         
-        for log_entry in batch:
-            level = log_entry.get('level', 'UNKNOWN')
-            class_name = log_entry.get('class', 'Unknown')
-            service = log_entry.get('service', class_name)
-            timestamp = log_entry.get('logtime', '')
-            
-            if class_name and level:
-                key = (job_id, class_name, level)
-                class_level_batch[key] = class_level_batch.get(key, 0) + 1
-            
-            if service and level:
-                key = (job_id, service, level)
-                service_level_batch[key] = service_level_batch.get(key, 0) + 1
-            
-            if timestamp and level:
-                try:
-                    # Try parsing with milliseconds
-                    try:
-                        dt = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S,%f')
-                    except ValueError:
-                        # Try parsing without milliseconds
-                        try:
-                            dt = datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-                        except ValueError:
-                            # Try parsing Apache-like format with timezone
-                            dt = datetime.strptime(timestamp, '%d/%b/%Y:%H:%M:%S %z')
-                    hour = dt.strftime('%Y-%m-%d %H:00:00')
-                    key = (job_id, hour, level)
-                    timeline_batch[key] = timeline_batch.get(key, 0) + 1
-                except ValueError:
-                    invalid_timestamp_count += 1
-            
-            if class_name and service:
-                key = (job_id, class_name, service)
-                class_service_batch[key] = class_service_batch.get(key, 0) + 1
-        
-        for (job_id, class_name, level), count in class_level_batch.items():
-            cursor.execute('''
-                INSERT INTO class_level_counts (job_id, class, level, count)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(job_id, class, level) DO UPDATE SET count = count + ?
-            ''', (job_id, class_name, level, count, count))
+        for hour, minute, service, class_name, level in zip(columns['hours'], columns['minutes'], columns['services'],
+                                                            columns['classes'], columns['levels']):
+            # Lines without a usable timestamp are kept under UNKNOWN_HOUR so class and service counts stay complete
+            key = (hour or UNKNOWN_HOUR, service, class_name, level)
+            fact_batch[key] = fact_batch.get(key, 0) + 1
+            if minute:
+                key = (minute, level)
+                minute_batch[key] = minute_batch.get(key, 0) + 1
         
-        for (job_id, service, level), count in service_level_batch.items():
-            cursor.execute('''
-                INSERT INTO service_level_counts (job_id, service, level, count)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(job_id, service, level) DO UPDATE SET count = count + ?
-            ''', (job_id, service, level, count, count))
+        fact_rows = [(hour, service, class_name, level, count, count * weight, estimate_variance(count, weight))
+                     for (hour, service, class_name, level), count in fact_batch.items()]
+        cursor.executemany('''
+            INSERT INTO log_facts (job_id, hour, service, class, level, count, est_count, est_variance)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(job_id, hour, service, class, level) DO UPDATE SET count = count + excluded.count,
+                est_count = est_count + excluded.est_count,
+                est_variance = est_variance + excluded.est_variance
+        ''', [(job_id,) + row for row in fact_rows])
         
-        for (job_id, hour, level), count in timeline_batch.items():
-            cursor.execute('''
-                INSERT INTO timeline_counts (job_id, hour, level, count)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(job_id, hour, level) DO UPDATE SET count = count + ?
-            ''', (job_id, hour, level, count, count))
+        cursor.executemany('''
+            INSERT INTO timeline_minute_counts (job_id, minute, level, count, est_count, est_variance)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(job_id, minute, level) DO UPDATE SET count = count + excluded.count,
+                est_count = est_count + excluded.est_count,
+                est_variance = est_variance + excluded.est_variance
+        ''', [(job_id, minute, level, count, count * weight, estimate_variance(count, weight))
+              for (minute, level), count in minute_batch.items()])
         
-        for (job_id, class_name, service), count in class_service_batch.items():
-            cursor.execute('''
-                INSERT INTO class_service_counts (job_id, class, service, count)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(job_id, class, service) DO UPDATE SET count = count + ?
-            ''', (job_id, class_name, service, count, count))
+        # Pod x level, host x level, ... rollups; value ids are unique across dimensions
+        rollup_batch = Counter()
+        for ids in (dimension_ids or {}).values():
+            rollup_batch.update(zip(ids, columns['levels']))
+        cursor.executemany('''
+            INSERT INTO dimension_level_counts (job_id, value_id, level, count, est_count, est_variance)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(job_id, value_id, level) DO UPDATE SET count = count + excluded.count,
+                est_count = est_count + excluded.est_count,
+                est_variance = est_variance + excluded.est_variance
+        ''', [(job_id, value_id, level, count, count * weight, estimate_variance(count, weight))
+              for (value_id, level), count in rollup_batch.items()])
         
-        conn.commit()
-        if invalid_timestamp_count > 0:
-            logger.debug(f"Skipped {invalid_timestamp_count} log entries with invalid timestamps in job_id: {job_id}")
+        if columns['invalid_timestamps'] > 0:
+            logger.debug(f"Skipped {columns['invalid_timestamps']} log entries with invalid timestamps in job_id: {job_id}")
+        return fact_rows
     except sqlite3.OperationalError as e:
         logger.error(f"Error updating summary tables for job_id {job_id}: {str(e)}")
+        raise
     except Exception as e:
         logger.error(f"Unexpected error updating summary tables for job_id {job_id}: {str(e)}")
+        raise
+
+def bump_data_version(conn: sqlite3.Connection, job_id: str):
+    """Start a new data version for a job; takes effect with the caller's next commit.
+
+    Readers key their caches and the dashboard ETag by data_version, so every commit
+    that changes what a job's queries return must bump it.
+    """
+    conn.execute('UPDATE jobs SET data_version = data_version + 1 WHERE job_id = ?', (job_id,))
+
+def advance_dashboard(job_id: str, fact_rows: list):
+    """Apply committed fact deltas to the job's in-memory dashboard aggregate, if one is built."""
+    aggregate = dashboard_aggregates.get(job_id)
+    if aggregate is not None:
+        aggregate.add_facts(fact_rows, UNKNOWN_HOUR)
+        aggregate.version += 1
+
+def insert_log_batch(conn: sqlite3.Connection, job_id: str, log_batch: list, columns: Dict[str, list],
+                     stage_times: Optional[Dict[str, float]] = None, weight: float = 1.0,
+                     dimension_ids: Optional[Dict[str, list]] = None):
+    """Insert a batch of raw log rows, update summaries and metadata, and commit them as one transaction.
+
+    columns is the LogProcessor.parse_batch output the rows were built from, and
+    dimension_ids the ids stored in the rows' dimension columns. Readers never see raw rows
+    whose summary rows are not yet committed, or the reverse.
+    """
+    if stage_times is None:
+        stage_times = dict.fromkeys(STAGE_NAMES, 0.0)
+    batch_start = time.perf_counter()
+    conn.executemany('''
+        INSERT INTO logs (job_id, timestamp, level, class, service, log_message, folder, file_name, line_idx,
+                          pod_id, host_id, container_id, thread_id)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', log_batch)
+    
+    summary_start = time.perf_counter()
+    stage_times['raw_insert'] += summary_start - batch_start
+    fact_rows = update_summary_tables(conn, job_id, columns, weight, dimension_ids)
+    metadata_start = time.perf_counter()
+    stage_times['summary'] += metadata_start - summary_start
+    summary_upsert_seconds.observe(metadata_start - summary_start, job_id=job_id)
+    
+    for class_name in set(columns['classes']):
+        conn.execute('''
+            INSERT OR IGNORE INTO job_metadata (job_id, type, value)
+            VALUES (?, ?, ?)
+        ''', (job_id, 'class', class_name))
+    for service in set(columns['services']):
+        conn.execute('''
+            INSERT OR IGNORE INTO job_metadata (job_id, type, value)
+            VALUES (?, ?, ?)
+        ''', (job_id, 'service', service))
+    
+    bump_data_version(conn, job_id)
+    commit_start = time.perf_counter()
+    stage_times['metadata'] += commit_start - metadata_start
+    conn.commit()
+    advance_dashboard(job_id, fact_rows)
+    batch_end = time.perf_counter()
+    stage_times['commit'] += batch_end - commit_start
+    batch_commit_seconds.observe(batch_end - batch_start, job_id=job_id)
+    rows_inserted_total.inc(len(log_batch), job_id=job_id)
+
+def merge_message_topk(conn: sqlite3.Connection, job_id: str, sketches: Dict[tuple, SpaceSaving]):
+    """Merge one file's heavy-hitter sketches into the persisted top messages per (class, level).
+
+    Takes the write lock before reading, so writers in other processes (the ingest CLI's
+    workers) cannot merge into the same rows between the read and the write.
+    """
+    if not conn.in_transaction:
+        conn.execute('BEGIN IMMEDIATE')
+    for (class_name, level), sketch in sketches.items():
+        rows = conn.execute('''
+            SELECT message, count, error, example FROM message_topk
+            WHERE job_id = ? AND class = ? AND level = ?
+        ''', (job_id, class_name, level)).fetchall()
+        if rows:
+            sketch = SpaceSaving.from_rows(sketch.capacity, rows).merge(sketch)
+            conn.execute('''
+                DELETE FROM message_topk WHERE job_id = ? AND class = ? AND level = ?
+            ''', (job_id, class_name, level))
+        conn.executemany('''
+            INSERT INTO message_topk (job_id, class, level, message, count, error, example)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', [(job_id, class_name, level, message, count, error, example[:MAX_EXAMPLE_LENGTH] if example else None)
+              for message, count, error, example in sketch.top()])
+
+def flush_message_topk(conn: sqlite3.Connection, job_id: str, sketches: Dict[tuple, SpaceSaving]):
+    """Merge and commit the sketches of a file's committed batches after a later batch failed.
+
+    Processing the file again skips those batches, so their messages would otherwise never
+    reach message_topk. Best effort: a failure is logged, not raised over the original error.
+    """
+    try:
+        merge_message_topk(conn, job_id, sketches)
+        bump_data_version(conn, job_id)
+        conn.commit()
+    except Exception as e:
+        logger.error(f"Error saving top messages for job_id {job_id}: {str(e)}")
+        conn.rollback()
+
+def record_file_stats(conn: sqlite3.Connection, job_id: str, file_path: str, lines: int,
+                      bytes_read: int, stage_times: Dict[str, float], total_seconds: float):
+    """Persist stage timings for one file and recompute the job totals from the file rows.
+
+    A file processed again (a retry, or a resume after a crash that followed its commit)
+    replaces its file_stats row, so the totals are summed from file_stats rather than
+    accumulated, and never count a file twice.
+    """
+    stage_values = [stage_times[stage] for stage in STAGE_NAMES]
+    stage_columns = ', '.join(f'{stage}_seconds' for stage in STAGE_NAMES)
+    stage_sums = ', '.join(f'SUM({stage}_seconds)' for stage in STAGE_NAMES)
+    placeholders = ', '.join('?' * (len(STAGE_NAMES) + 4))
+    conn.execute(f'''
+        INSERT OR REPLACE INTO file_stats (job_id, file_path, lines, bytes_decompressed, {stage_columns}, total_seconds)
+        VALUES (?, {placeholders})
+    ''', [job_id, file_path, lines, bytes_read] + stage_values + [total_seconds])
+    conn.execute(f'''
+        INSERT OR REPLACE INTO job_stats (job_id, files, lines, bytes_decompressed, {stage_columns}, total_seconds)
+        SELECT job_id, COUNT(*), SUM(lines), SUM(bytes_decompressed), {stage_sums}, SUM(total_seconds)
+        FROM file_stats
+        WHERE job_id = ?
+        GROUP BY job_id
+    ''', (job_id,))
+
+def read_log_lines(file_path: str, stage_times: Dict[str, float], totals: Dict[str, int]):
+    """Yield (line_idx, raw line) pairs from a .gz log file.
+
+    Reads large decompressed blocks so decompression can be timed apart from decoding;
+    decompressed bytes are added to totals['bytes'] as blocks are read.
+    """
+    perf_counter = time.perf_counter
+    line_idx = 0
+    pending = b''
+    with gzip.open(file_path, 'rb') as f:
+        while True:
+            stage_start = perf_counter()
+            block = f.read(READ_BLOCK_SIZE)
+            stage_times['decompress'] += perf_counter() - stage_start
+            if block:
+                totals['bytes'] += len(block)
+                lines = (pending + block).split(b'\n')
+                pending = lines.pop()
+            else:
+                lines = [pending] if pending else []
+            for line in lines:
+                yield line_idx, line
+                line_idx += 1
+            if not block:
+                break
+
+def sampling_options(job_state: dict) -> Optional[dict]:
+    """Sampling settings for a job, or None when the job ingests every line."""
+    if job_state.get('mode', 'full') != 'sample':
+        return None
+    sampling_config = config.get('sampling', {})
+    return {
+        'rate': job_state.get('sample_rate') or sampling_config.get('default_rate', 0.1),
+        'method': job_state.get('sample_method') or 'systematic',
+        'unit': job_state.get('sample_unit') or 'lines',
+        'size': job_state.get('sample_size') or sampling_config.get('reservoir_size', 10000),
+        'seed': sampling_config.get('seed', 42),
+        'weight': 1.0
+    }
 
 @retry(stop_max_attempt_number=3, wait_exponential_multiplier=1000, wait_exponential_max=10000)
-async def process_log_file(file_path: str, job_id: str, conn: sqlite3.Connection):
-    """Process a single .gz log file and insert logs into SQLite with retries."""
+async def process_log_file(file_path: str, job_id: str, conn: sqlite3.Connection, sampling: Optional[dict] = None,
+                           batch_size: int = DEFAULT_BATCH_SIZE):
+    """Process a single .gz log file and insert logs into SQLite with retries.
+
+    With line sampling only the sampled lines are decoded and stored; with file sampling
+    the whole file is stored and weighted by the share of files that were skipped.
+    Rows are committed batch_size at a time.
+
+    A batch that fails to insert is rolled back and the error re-raised, so the file is not
+    recorded as processed. Each batch records the file's last committed line in file_progress,
+    and processing the file again (on resume) skips those lines, so they are neither lost nor
+    stored twice.
+    """
     try:
-        valid_levels = set(config['app']['log_levels'])
-        batch_size = 500
-        log_batch = []
-        log_entries = []
-        classes = set()
-        services = set()
+        file_start = time.perf_counter()
+        perf_counter = time.perf_counter
+        processor = LogProcessor(config['app']['log_levels'], extra_fields=True)
+        encoder = DimensionEncoder()
+        topk_capacity = config.get('topk', {}).get('capacity', 100)
+        message_sketches = {}
         missing_class_count = 0
         invalid_timestamp_count = 0
+        invalid_json_count = 0
+        stage_times = dict.fromkeys(STAGE_NAMES, 0.0)
+        folder = os.path.dirname(file_path)
+        file_name = os.path.basename(file_path)
+        totals = {'bytes': 0}
+        bytes_reported = 0
+        weight = 1.0
+        
+        # json.loads decodes the UTF-8 bytes itself
+        lines = read_log_lines(file_path, stage_times, totals)
+        if sampling and sampling['unit'] == 'lines':
+            sample_key = f"{job_id}:{file_path}"
+            if sampling['method'] == 'reservoir':
+                reservoir = ReservoirSampler(sampling['size'], sampling['seed'], sample_key)
+                for item in lines:
+                    reservoir.offer(item)
+                lines = sorted(reservoir.items)
+                weight = reservoir.weight
+            else:
+                sampler = SystematicSampler(sampling['rate'], sampling['seed'], sample_key)
+                # Skipped lines are split out of the block but never decoded
+                lines = (item for item in lines if sampler.keep(item[0]))
+                weight = sampler.weight
+        elif sampling:
+            weight = sampling['weight']
         
-        with gzip.open(file_path, 'rt', encoding='utf-8') as f:
-            for line_idx, line in enumerate(f):
-                try:
-                    log_entry = json.loads(line.strip())
-                    timestamp = log_entry.get('logtime', '')
-                    level = log_entry.get('level', 'UNKNOWN')
-                    if level not in valid_levels:
-                        level = 'UNKNOWN'
-                    class_field = log_entry.get('class', None)
-                    log_message = log_entry.get('log', '')
-                    folder = os.path.dirname(file_path)
-                    file_name = os.path.basename(file_path)
-                    
-                    # Extract class and service
-                    if class_field and '.' in class_field:
-                        service, class_name = class_field.split('.', 1)
-                    else:
-                        class_name = 'Unknown'
-                        service = 'Unknown'
-                        missing_class_count += 1
-                    
-                    # Validate timestamp
-                    if timestamp:
-                        try:
-                            try:
-                                datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S,%f')
-                            except ValueError:
-                                try:
-                                    datetime.strptime(timestamp, '%Y-%m-%d %H:%M:%S')
-                                except ValueError:
-                                    datetime.strptime(timestamp, '%d/%b/%Y:%H:%M:%S %z')
-                        except ValueError:
-                            invalid_timestamp_count += 1
-                    
-                    log_batch.append((job_id, timestamp, level, class_name, service, log_message, folder, file_name, line_idx))
-                    log_entries.append({
-                        'logtime': timestamp,
-                        'level': level,
-                        'class': class_name,
-                        'service': service,
-                        'log': log_message
-                    })
-                    classes.add(class_name)
-                    services.add(service)
-                    
-                    if len(log_batch) >= batch_size:
-                        conn.executemany('''
-                            INSERT INTO logs (job_id, timestamp, level, class, service, log_message, folder, file_name, line_idx)
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', log_batch)
-                        update_summary_tables(conn, job_id, log_entries)
-                        
-                        for class_name in classes:
-                            conn.execute('''
-                                INSERT OR IGNORE INTO job_metadata (job_id, type, value)
-                                VALUES (?, ?, ?)
-                            ''', (job_id, 'class', class_name))
-                        for service in services:
-                            conn.execute('''
-                                INSERT OR IGNORE INTO job_metadata (job_id, type, value)
-                                VALUES (?, ?, ?)
-                            ''', (job_id, 'service', service))
-                        
-                        conn.commit()
-                        log_batch = []
-                        log_entries = []
-                        classes.clear()
-                        services.clear()
-                        await asyncio.sleep(0)
-                except json.JSONDecodeError:
-                    logger.warning(f"Invalid JSON in {file_path} at line {line_idx}")
-                except Exception as e:
-                    logger.error(f"Error processing line {line_idx} in {file_path}: {str(e)}")
+        committed_line, file_lines_parsed = conn.execute('''
+            SELECT line_idx, lines FROM file_progress WHERE job_id = ? AND file_path = ?
+        ''', (job_id, file_path)).fetchone() or (-1, 0)
+        if committed_line >= 0:
+            logger.info(f"Resuming {file_path} after committed line {committed_line}")
+            lines = (item for item in lines if item[0] > committed_line)
         
-        if log_batch:
-            conn.executemany('''
-                INSERT INTO logs (job_id, timestamp, level, class, service, log_message, folder, file_name, line_idx)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', log_batch)
-            update_summary_tables(conn, job_id, log_entries)
+        lines = iter(lines)
+        while True:
+            chunk = list(islice(lines, batch_size))
+            if not chunk:
+                break
+            columns = processor.parse_batch([line for _, line in chunk], stage_times)
+            for position in columns['invalid_json']:
+                invalid_json_count += 1
+                invalid_json_lines_total.inc(job_id=job_id)
+                logger.warning(f"Invalid JSON in {file_path} at line {chunk[position][0]}")
+            missing_class_count += columns['missing_class']
+            invalid_timestamp_count += columns['invalid_timestamps']
+            lines_parsed_total.inc(len(columns['positions']), job_id=job_id)
+            if not columns['positions']:
+                continue
             
-            for class_name in classes:
-                conn.execute('''
-                    INSERT OR IGNORE INTO job_metadata (job_id, type, value)
-                    VALUES (?, ?, ?)
-                ''', (job_id, 'class', class_name))
-            for service in services:
+            line_indexes = [chunk[position][0] for position in columns['positions']]
+            
+            try:
+                # Dimension values are dictionary-encoded in the batch's transaction
+                encode_start = perf_counter()
+                dimension_ids = {dimension: encoder.encode(conn, dimension, columns[column])
+                                 for dimension, column in LOG_DIMENSIONS.items()}
+                stage_times['metadata'] += perf_counter() - encode_start
+                log_batch = list(zip(repeat(job_id), columns['timestamps'], columns['levels'], columns['classes'],
+                                     columns['services'], columns['messages'], repeat(folder), repeat(file_name),
+                                     line_indexes, *dimension_ids.values()))
                 conn.execute('''
-                    INSERT OR IGNORE INTO job_metadata (job_id, type, value)
-                    VALUES (?, ?, ?)
-                ''', (job_id, 'service', service))
+                    INSERT INTO file_progress (job_id, file_path, line_idx, lines) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(job_id, file_path) DO UPDATE SET line_idx = excluded.line_idx,
+                        lines = lines + excluded.lines
+                ''', (job_id, file_path, chunk[-1][0], len(columns['positions'])))
+                insert_log_batch(conn, job_id, log_batch, columns, stage_times, weight, dimension_ids)
+            except Exception as e:
+                logger.error(f"Error inserting lines {chunk[0][0]}-{chunk[-1][0]} of {file_path}: {str(e)}")
+                conn.rollback()
+                encoder.rollback()
+                flush_message_topk(conn, job_id, message_sketches)
+                raise
+            encoder.commit()
+            file_lines_parsed += len(columns['positions'])
             
-            conn.commit()
+            # Heavy-hitter message templates per (class, level), counted with the sample weight once committed
+            sketch_start = perf_counter()
+            for class_name, level, log_message in zip(columns['classes'], columns['levels'], columns['messages']):
+                if isinstance(log_message, str):
+                    sketch = message_sketches.get((class_name, level))
+                    if sketch is None:
+                        sketch = message_sketches[(class_name, level)] = SpaceSaving(topk_capacity)
+                    sketch.offer(normalize_message(log_message), weight, log_message)
+            stage_times['sketch'] += perf_counter() - sketch_start
+            
+            bytes_decompressed_total.inc(totals['bytes'] - bytes_reported, job_id=job_id)
+            bytes_reported = totals['bytes']
+            await asyncio.sleep(0)
         
-        # Log the processed file in the database
+        bytes_decompressed_total.inc(totals['bytes'] - bytes_reported, job_id=job_id)
+        invalid_timestamps_total.inc(invalid_timestamp_count, job_id=job_id)
+        
+        sketch_start = perf_counter()
+        merge_message_topk(conn, job_id, message_sketches)
+        stage_times['sketch'] += perf_counter() - sketch_start
+        
+        # Log the processed file and its stage timings in the database
+        metadata_start = perf_counter()
         conn.execute('''
             INSERT INTO job_metadata (job_id, type, value)
             VALUES (?, ?, ?)
         ''', (job_id, 'processed_file', file_path))
+        stage_times['metadata'] += perf_counter() - metadata_start
+        file_seconds = perf_counter() - file_start
+        record_file_stats(conn, job_id, file_path, file_lines_parsed, totals['bytes'], stage_times, file_seconds)
+        conn.execute('DELETE FROM file_progress WHERE job_id = ? AND file_path = ?', (job_id, file_path))
+        bump_data_version(conn, job_id)
         conn.commit()
+        advance_dashboard(job_id, [])
+        file_duration_seconds.observe(file_seconds, job_id=job_id)
         
         logger.info(f"Processed log file: {file_path} for job_id: {job_id}, "
                    f"missing or invalid class formats: {missing_class_count}, "
-                   f"invalid timestamps: {invalid_timestamp_count}")
+                   f"invalid timestamps: {invalid_timestamp_count}, "
+                   f"invalid JSON lines: {invalid_json_count}, "
+                   f"sample weight: {weight:.2f}, "
+                   f"stage seconds: " + ', '.join(f"{stage}={stage_times[stage]:.3f}" for stage in STAGE_NAMES))
     except Exception as e:
         logger.error(f"Error processing log file {file_path}: {str(e)}")
+        conn.rollback()
         raise
 
+def find_log_files(folder_path: str) -> list:
+    """All .gz files below folder_path, sorted so file sampling picks the same files when a job is resumed."""
+    log_files = []
+    for root, _, files in os.walk(folder_path):
+        for file in files:
+            if file.endswith('.gz'):
+                full_path = os.path.join(root, file)
+                log_files.append(full_path)
+                logger.debug(f"Found log file: {full_path}")
+    log_files.sort()
+    return log_files
+
+def insert_job(conn: sqlite3.Connection, job_state: dict):
+    """Insert the jobs row for a new job state and commit it."""
+    conn.execute('''
+        INSERT INTO jobs (job_id, folder_path, status, files_processed, total_files, start_time, last_updated,
+                          mode, sample_rate, sample_method, sample_unit, sample_size)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (
+        job_state['job_id'],
+        job_state['folder_path'],
+        job_state['status'],
+        job_state['files_processed'],
+        job_state['total_files'],
+        job_state['start_time'],
+        job_state['last_updated'],
+        job_state['mode'],
+        job_state['sample_rate'],
+        job_state['sample_method'],
+        job_state['sample_unit'],
+        job_state['sample_size']
+    ))
+    conn.commit()
+
 async def process_job(job_id: str, folder_path: str):
     """Process all log files in the specified folder, resuming from last processed file."""
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        conn = connect(DB_PATH, timeout=60)
         conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute(f'PRAGMA journal_size_limit = {WAL_MAX_BYTES}')
         
         # Validate folder path
         if not os.path.isdir(folder_path):
@@ -278,13 +538,12 @@ async def process_job(job_id: str, folder_path: str):
             raise HTTPException(status_code=400, detail=f"Invalid folder path: {folder_path}")
         
         # Recursively find .gz files
-        log_files = []
-        for root, _, files in os.walk(folder_path):
-            for file in files:
-                if file.endswith('.gz'):
-                    full_path = os.path.join(root, file)
-                    log_files.append(full_path)
-                    logger.debug(f"Found log file: {full_path}")
+        log_files = find_log_files(folder_path)
+        sampling = sampling_options(job_states[job_id])
+        if sampling and sampling['unit'] == 'files':
+            log_files, sampling['weight'] = select_files(log_files, sampling['rate'], sampling['method'],
+                                                         sampling['seed'], job_id)
+            logger.info(f"Job {job_id} sampling {len(log_files)} files, weight {sampling['weight']:.2f}")
         
         total_files = len(log_files)
         if total_files == 0:
@@ -335,7 +594,7 @@ async def process_job(job_id: str, folder_path: str):
                 return
             
             logger.info(f"Processing file {file_path} for job {job_id}")
-            await process_log_file(file_path, job_id, conn)
+            await process_log_file(file_path, job_id, conn, sampling)
             job_states[job_id]['files_processed'] += 1
             job_states[job_id]['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             
@@ -344,6 +603,7 @@ async def process_job(job_id: str, folder_path: str):
                 WHERE job_id = ?
             ''', (job_states[job_id]['files_processed'], os.path.basename(file_path), job_states[job_id]['last_updated'], job_id))
             conn.commit()
+            checkpoint_wal(conn, WAL_MAX_BYTES)
         
         # Mark job as completed
         job_states[job_id]['status'] = 'COMPLETED'
@@ -380,17 +640,19 @@ async def startup_event():
             
             # Load job states from jobs table
             try:
-                conn = sqlite3.connect('data/logs.db', timeout=60)
+                conn = connect(DB_PATH, timeout=60)
                 cursor = conn.cursor()
                 cursor.execute('''
-                    SELECT job_id, folder_path, status, files_processed, total_files, start_time, last_updated
+                    SELECT job_id, folder_path, status, files_processed, total_files, start_time, last_updated,
+                           mode, sample_rate, sample_method, sample_unit, sample_size
                     FROM jobs
                 ''')
                 jobs = cursor.fetchall()
                 conn.close()
                 
                 for job in jobs:
-                    job_id, folder_path, status, files_processed, total_files, start_time, last_updated = job
+                    (job_id, folder_path, status, files_processed, total_files, start_time, last_updated,
+                     mode, sample_rate, sample_method, sample_unit, sample_size) = job
                     job_states[job_id] = {
                         'job_id': job_id,
                         'folder_path': folder_path,
@@ -399,7 +661,12 @@ async def startup_event():
                         'total_files': total_files,
                         'current_file': '',
                         'start_time': start_time,
-                        'last_updated': last_updated
+                        'last_updated': last_updated,
+                        'mode': mode or 'full',
+                        'sample_rate': sample_rate,
+                        'sample_method': sample_method,
+                        'sample_unit': sample_unit,
+                        'sample_size': sample_size
                     }
                 logger.info(f"Loaded {len(jobs)} job states from database")
             except sqlite3.OperationalError as e:
@@ -415,10 +682,54 @@ async def health_check():
     """Check backend health."""
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def get_metrics():
+    """Expose ingestion counters and latency histograms in Prometheus text format."""
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
+
+@app.get("/jobs/{job_id}/dashboard")
+async def get_dashboard(job_id: str, request: Request):
+    """Return the complete dashboard payload for a job, with an ETag tied to its data version."""
+    if job_id not in job_states:
+        logger.error(f"Job not found: {job_id}")
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        conn = connect(DB_PATH, timeout=60)
+        try:
+            # Read the version and the facts from one snapshot so the ETag matches the payload
+            conn.execute('BEGIN')
+            row = conn.execute('SELECT data_version FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+            version = (row[0] or 0) if row else 0
+            etag = f'"v{version}"'
+            if request.headers.get('if-none-match') == etag:
+                return Response(status_code=304, headers={'ETag': etag})
+            
+            aggregate = dashboard_aggregates.get(job_id)
+            if aggregate is None or aggregate.version != version:
+                # First request, or the job was written outside this process
+                aggregate = DashboardAggregate.load(conn, job_id, config['app']['log_levels'], version,
+                                                    estimates=job_states[job_id].get('mode') == 'sample',
+                                                    unknown_hour=UNKNOWN_HOUR,
+                                                    top_n=(config.get('dashboard') or {}).get('top_n', 20))
+                dashboard_aggregates[job_id] = aggregate
+                logger.debug(f"Built dashboard aggregate for job {job_id} at version {version}")
+        finally:
+            conn.close()
+        return Response(content=aggregate.render(), media_type='application/json',
+                        headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+    except sqlite3.OperationalError as e:
+        logger.error(f"Error building dashboard for job {job_id}: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error building dashboard: {str(e)}")
+
 @app.post("/jobs/start", response_model=JobResponse)
 async def start_job(request: StartJobRequest):
-    """Start a new log analysis job."""
+    """Start a new log analysis job, optionally ingesting only a sample of lines or files."""
     global job_states
+    error = validate_sampling(request.mode, request.sample_rate, request.sample_method, request.sample_unit)
+    if error:
+        logger.error(f"Invalid sampling options for {request.folder_path}: {error}")
+        raise HTTPException(status_code=400, detail=error)
+    sampled = request.mode == 'sample'
     start_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
     job_id = request.folder_path.split("/")[-1] + "_" + start_time
     
@@ -430,29 +741,22 @@ async def start_job(request: StartJobRequest):
         'total_files': 0,
         'current_file': '',
         'start_time': start_time,
-        'last_updated': start_time
+        'last_updated': start_time,
+        'mode': request.mode,
+        'sample_rate': request.sample_rate if sampled else None,
+        'sample_method': request.sample_method if sampled else None,
+        'sample_unit': request.sample_unit if sampled else None,
+        'sample_size': request.sample_size if sampled else None
     }
     
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        conn = connect(DB_PATH, timeout=60)
         conn.execute('PRAGMA journal_mode=WAL')
-        conn.execute('''
-            INSERT INTO jobs (job_id, folder_path, status, files_processed, total_files, start_time, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            job_id,
-            request.folder_path,
-            'RUNNING',
-            0,
-            0,
-            start_time,
-            start_time
-        ))
-        conn.commit()
+        insert_job(conn, job_states[job_id])
         conn.close()
         
         asyncio.create_task(process_job(job_id, request.folder_path))
-        logger.info(f"Started job: {job_id} for folder: {request.folder_path}")
+        logger.info(f"Started job: {job_id} for folder: {request.folder_path}, mode: {request.mode}")
         return job_states[job_id]
     except Exception as e:
         logger.error(f"Error starting job {job_id}: {str(e)}")
@@ -476,7 +780,7 @@ async def get_processed_files(job_id: str):
         logger.error(f"Job not found: {job_id}")
         raise HTTPException(status_code=404, detail="Job not found")
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        conn = connect(DB_PATH, timeout=60)
         cursor = conn.cursor()
         cursor.execute('''
             SELECT value FROM job_metadata WHERE job_id = ? AND type = 'processed_file'
@@ -503,7 +807,7 @@ async def pause_job(job_id: str):
         job_states[job_id]['status'] = 'PAUSED'
         job_states[job_id]['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        conn = connect(DB_PATH, timeout=60)
         conn.execute('''
             UPDATE jobs
             SET status = ?, last_updated = ?
@@ -532,7 +836,7 @@ async def resume_job(job_id: str):
         job_states[job_id]['status'] = 'RUNNING'
         job_states[job_id]['last_updated'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        conn = connect(DB_PATH, timeout=60)
         conn.execute('''
             UPDATE jobs
             SET status = ?, last_updated = ?
@@ -556,7 +860,7 @@ async def delete_job(job_id: str):
         raise HTTPException(status_code=404, detail="Job not found")
     
     try:
-        conn = sqlite3.connect('data/logs.db', timeout=60)
+        conn = connect(DB_PATH, timeout=60)
         conn.execute('PRAGMA journal_mode=WAL')
         cursor = conn.cursor()
         
@@ -567,16 +871,21 @@ async def delete_job(job_id: str):
         cursor.execute('DELETE FROM jobs WHERE job_id = ?', (job_id,))
         cursor.execute('DELETE FROM logs WHERE job_id = ?', (job_id,))
         cursor.execute('DELETE FROM job_metadata WHERE job_id = ?', (job_id,))
-        cursor.execute('DELETE FROM class_level_counts WHERE job_id = ?', (job_id,))
-        cursor.execute('DELETE FROM service_level_counts WHERE job_id = ?', (job_id,))
-        cursor.execute('DELETE FROM timeline_counts WHERE job_id = ?', (job_id,))
-        cursor.execute('DELETE FROM class_service_counts WHERE job_id = ?', (job_id,))
+        cursor.execute('DELETE FROM log_facts WHERE job_id = ?', (job_id,))
+        cursor.execute('DELETE FROM dimension_level_counts WHERE job_id = ?', (job_id,))
+        cursor.execute('DELETE FROM timeline_minute_counts WHERE job_id = ?', (job_id,))
+        cursor.execute('DELETE FROM message_topk WHERE job_id = ?', (job_id,))
+        cursor.execute('DELETE FROM job_stats WHERE job_id = ?', (job_id,))
+        cursor.execute('DELETE FROM file_stats WHERE job_id = ?', (job_id,))
+        cursor.execute('DELETE FROM file_progress WHERE job_id = ?', (job_id,))
         
         # Commit transaction
         conn.commit()
         
-        # Remove from job_states
+        # Remove from job_states and drop the job's metric series
         del job_states[job_id]
+        dashboard_aggregates.pop(job_id, None)
+        metrics.remove(job_id=job_id)
         
         conn.close()
         logger.info(f"Deleted job {job_id} and all associated data")
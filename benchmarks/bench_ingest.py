@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Ingestion Benchmark
+
+Generates (or reuses) a synthetic cluster-log tree, runs backend.process_job
+over it end to end in an isolated workspace and reports lines/s, MB/s, peak
+RSS, database size and the per-stage timings recorded in job_stats. Every run
+is appended to benchmarks/results/ingest.jsonl so changes to backend.py can
+be compared against earlier runs.
+
+Usage:
+    python -m benchmarks.bench_ingest --hours 2 --files-per-hour 2 --lines-per-file 50000 --label "baseline"
+    python -m benchmarks.bench_ingest --compare
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.common import (RESULTS_DIR, append_result, db_size_bytes, load_results, peak_rss_mb,
+                               prepare_workspace, quiet_streamlit, run_metadata)
+from benchmarks.synthetic_logs import DEFAULT_PROFILE, LogProfile, SyntheticLogGenerator
+
+DEFAULT_RESULTS = RESULTS_DIR / 'ingest.jsonl'
+
+def ensure_log_tree(cache_dir, hours, files_per_hour, lines_per_file, classes, seed):
+    """Generate the synthetic tree once per parameter set and reuse it on later runs."""
+    tree = Path(cache_dir) / f"logs_h{hours}_f{files_per_hour}_l{lines_per_file}_c{classes or 'profile'}_s{seed}"
+    marker = tree / 'generated.json'
+    if marker.exists():
+        return tree, json.loads(marker.read_text())
+    profile = LogProfile.from_csv(DEFAULT_PROFILE)
+    if classes:
+        profile = profile.with_class_cardinality(classes, random.Random(seed))
+    print(f"Generating synthetic logs in {tree} ...")
+    summary = SyntheticLogGenerator(profile, seed=seed).generate(tree, hours, files_per_hour, lines_per_file)
+    marker.write_text(json.dumps(summary))
+    return tree, summary
+
+def run_ingest(log_tree):
+    """Run backend.process_job over log_tree in the current workspace and return timing details."""
+    import backend
+
+    quiet_streamlit()
+    backend.init_db()
+    job_id = 'bench_' + time.strftime('%Y%m%d_%H%M%S')
+    now = time.strftime('%Y-%m-%d %H:%M:%S')
+    conn = sqlite3.connect('data/logs.db', timeout=60)
+    conn.execute('''
+        INSERT INTO jobs (job_id, folder_path, status, files_processed, total_files, start_time, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (job_id, str(log_tree), 'RUNNING', 0, 0, now, now))
+    conn.commit()
+    conn.close()
+    backend.job_states[job_id] = {
+        'job_id': job_id,
+        'folder_path': str(log_tree),
+        'status': 'RUNNING',
+        'files_processed': 0,
+        'total_files': 0,
+        'current_file': '',
+        'start_time': now,
+        'last_updated': now
+    }
+
+    start = time.perf_counter()
+    asyncio.run(backend.process_job(job_id, str(log_tree)))
+    elapsed = time.perf_counter() - start
+
+    conn = sqlite3.connect('data/logs.db', timeout=60)
+    conn.row_factory = sqlite3.Row
+    job_stats = conn.execute('SELECT * FROM job_stats WHERE job_id = ?', (job_id,)).fetchone()
+    file_seconds = [row[0] for row in conn.execute(
+        'SELECT total_seconds FROM file_stats WHERE job_id = ?', (job_id,))]
+    rows = conn.execute('SELECT COUNT(*) FROM logs WHERE job_id = ?', (job_id,)).fetchone()[0]
+    conn.close()
+    return {
+        'job_id': job_id,
+        'status': backend.job_states[job_id]['status'],
+        'elapsed_seconds': elapsed,
+        'rows_inserted': rows,
+        'job_stats': dict(job_stats) if job_stats else {},
+        'file_seconds': file_seconds
+    }
+
+def print_result(record):
+    print("\nIngestion Benchmark")
+    print("-" * 80)
+    print(f"Files: {record['files']}  Lines: {record['lines']:,d}  Rows inserted: {record['rows_inserted']:,d}")
+    print(f"Elapsed: {record['elapsed_seconds']:.2f}s")
+    print(f"Throughput: {record['lines_per_second']:,.0f} lines/s, "
+          f"{record['decompressed_mb_per_second']:.2f} MB/s decompressed, "
+          f"{record['compressed_mb_per_second']:.2f} MB/s compressed")
+    print(f"Per-file seconds: p50 {record['file_seconds_p50']:.3f}, max {record['file_seconds_max']:.3f}")
+    print(f"Peak RSS: {record['peak_rss_mb']:.1f} MB  DB size: {record['db_size_mb']:.1f} MB")
+    if record['stage_seconds']:
+        print("Stage seconds:")
+        for stage, seconds in record['stage_seconds'].items():
+            share = seconds / record['elapsed_seconds'] * 100 if record['elapsed_seconds'] else 0
+            print(f"  {stage:<12}: {seconds:>9.3f} ({share:5.1f}%)")
+
+def print_comparison(results):
+    """Print one row per recorded run, newest last."""
+    if not results:
+        print("No recorded ingestion results")
+        return
+    print(f"{'recorded_at':<20} {'revision':<14} {'label':<20} {'lines':>12} {'lines/s':>10} {'MB/s':>7} {'RSS MB':>8} {'DB MB':>8}")
+    for r in results:
+        print(f"{r['recorded_at']:<20} {r['git_revision']:<14} {r['label'][:20]:<20} {r['lines']:>12,d} "
+              f"{r['lines_per_second']:>10,.0f} {r['decompressed_mb_per_second']:>7.2f} "
+              f"{r['peak_rss_mb']:>8.1f} {r['db_size_mb']:>8.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark end-to-end ingestion through backend.process_job")
+    parser.add_argument('--hours', type=int, default=2, help="Number of hourly folders")
+    parser.add_argument('--files-per-hour', type=int, default=2, help="Files per hourly folder")
+    parser.add_argument('--lines-per-file', type=int, default=50000, help="Log lines per file")
+    parser.add_argument('--classes', type=int, default=None, help="Class-name cardinality (default: as in the profile)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the synthetic tree")
+    parser.add_argument('--workdir', default=None, help="Workspace for generated logs and the benchmark database")
+    parser.add_argument('--results', default=str(DEFAULT_RESULTS), help="JSON lines file results are appended to")
+    parser.add_argument('--label', default='', help="Free-form label stored with the result")
+    parser.add_argument('--compare', action='store_true', help="Print previously recorded results and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        print_comparison(load_results(args.results))
+        return
+
+    workdir = Path(args.workdir or Path(tempfile.gettempdir()) / 'log_analyzer_bench').resolve()
+    log_tree, tree_summary = ensure_log_tree(workdir / 'cache', args.hours, args.files_per_hour,
+                                             args.lines_per_file, args.classes, args.seed)
+    results_file = Path(args.results).resolve()
+    prepare_workspace(workdir / 'ingest')
+
+    outcome = run_ingest(log_tree)
+    if outcome['status'] != 'COMPLETED':
+        print(f"Ingestion finished with status {outcome['status']}; see log_analyzer.log in {workdir / 'ingest'}")
+        sys.exit(1)
+
+    stats = outcome['job_stats']
+    elapsed = outcome['elapsed_seconds']
+    decompressed = stats.get('bytes_decompressed', 0)
+    file_seconds = outcome['file_seconds'] or [0.0]
+    record = run_metadata(args.label)
+    record.update({
+        'benchmark': 'ingest',
+        'hours': args.hours,
+        'files_per_hour': args.files_per_hour,
+        'lines_per_file': args.lines_per_file,
+        'classes': args.classes,
+        'seed': args.seed,
+        'files': tree_summary['files'],
+        'lines': tree_summary['lines'],
+        'compressed_bytes': tree_summary['compressed_bytes'],
+        'decompressed_bytes': decompressed,
+        'rows_inserted': outcome['rows_inserted'],
+        'elapsed_seconds': elapsed,
+        'lines_per_second': tree_summary['lines'] / elapsed if elapsed else 0.0,
+        'decompressed_mb_per_second': decompressed / 1024**2 / elapsed if elapsed else 0.0,
+        'compressed_mb_per_second': tree_summary['compressed_bytes'] / 1024**2 / elapsed if elapsed else 0.0,
+        'file_seconds_p50': statistics.median(file_seconds),
+        'file_seconds_max': max(file_seconds),
+        'peak_rss_mb': peak_rss_mb(),
+        'db_size_mb': db_size_bytes() / 1024**2,
+        'stage_seconds': {key[:-len('_seconds')]: value for key, value in stats.items()
+                          if key.endswith('_seconds') and key != 'total_seconds'}
+    })
+    print_result(record)
+    append_result(results_file, record)
+    print(f"\nResult appended to {results_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Parser Benchmark
+
+Generates (or reuses) a synthetic cluster-log tree, decompresses it into memory
+and times analyzer.log_processor.LogProcessor.parse_batch alone, the hot path
+the backend and qscript share. Reports lines/s, the decode/timestamp split and
+the arrow engine's line-by-line fallbacks for each engine and batch size. Every
+run is appended to benchmarks/results/parse.jsonl.
+
+Usage:
+    python -m benchmarks.bench_parse --lines-per-file 50000 --batch-sizes 500,5000 --label "baseline"
+    python -m benchmarks.bench_parse --engines python --batch-sizes 500
+    python -m benchmarks.bench_parse --compare
+"""
+
+import argparse
+import gzip
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_ingest import ensure_log_tree
+from benchmarks.common import REPO_ROOT, RESULTS_DIR, append_result, load_results, run_metadata
+
+DEFAULT_RESULTS = RESULTS_DIR / 'parse.jsonl'
+
+def load_lines(log_tree):
+    """Every line of every .gz file under log_tree, as raw bytes."""
+    lines = []
+    for path in sorted(Path(log_tree).rglob('*.gz')):
+        with gzip.open(path, 'rb') as f:
+            lines.extend(f)
+    return lines
+
+def run_parse(lines, engine, batch_size, extra_fields):
+    """Parse all lines in batches of batch_size; returns elapsed and per-stage seconds."""
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    from analyzer.log_processor import LogProcessor
+
+    processor = LogProcessor(extra_fields=extra_fields, engine=engine)
+    stage_times = {'decode': 0.0, 'timestamp': 0.0}
+    records = 0
+    start = time.perf_counter()
+    for i in range(0, len(lines), batch_size):
+        records += len(processor.parse_batch(lines[i:i + batch_size], stage_times)['positions'])
+    return {'elapsed_seconds': time.perf_counter() - start, 'records': records, 'stage_seconds': stage_times,
+            'fallback_batches': processor.fallback_batches}
+
+def print_comparison(results):
+    """Print one row per recorded run, newest last."""
+    if not results:
+        print("No recorded parser results")
+        return
+    print(f"{'recorded_at':<20} {'revision':<14} {'label':<20} {'engine':<8} {'batch':>7} {'lines':>12} "
+          f"{'p50 s':>8} {'lines/s':>10}")
+    for r in results:
+        print(f"{r['recorded_at']:<20} {r['git_revision']:<14} {r['label'][:20]:<20} {r.get('engine', 'python'):<8} "
+              f"{r['batch_size']:>7,d} {r['lines']:>12,d} {r['elapsed_p50']:>8.2f} {r['lines_per_second']:>10,.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LogProcessor.parse_batch on in-memory lines")
+    parser.add_argument('--hours', type=int, default=2, help="Number of hourly folders")
+    parser.add_argument('--files-per-hour', type=int, default=2, help="Files per hourly folder")
+    parser.add_argument('--lines-per-file', type=int, default=50000, help="Log lines per file")
+    parser.add_argument('--classes', type=int, default=None, help="Class-name cardinality (default: as in the profile)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the synthetic tree")
+    parser.add_argument('--engines', default='arrow,python', help="Comma-separated parse engines to run")
+    parser.add_argument('--batch-sizes', default='500,5000', help="Comma-separated lines per parse_batch call")
+    parser.add_argument('--extra-fields', action='store_true', help="Also parse the fields qscript groups by")
+    parser.add_argument('--repeats', type=int, default=3, help="Runs per batch size")
+    parser.add_argument('--workdir', default=None, help="Workspace for generated logs")
+    parser.add_argument('--results', default=str(DEFAULT_RESULTS), help="JSON lines file results are appended to")
+    parser.add_argument('--label', default='', help="Free-form label stored with the result")
+    parser.add_argument('--compare', action='store_true', help="Print previously recorded results and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        print_comparison(load_results(args.results))
+        return
+
+    workdir = Path(args.workdir or Path(tempfile.gettempdir()) / 'log_analyzer_bench').resolve()
+    log_tree, tree_summary = ensure_log_tree(workdir / 'cache', args.hours, args.files_per_hour,
+                                             args.lines_per_file, args.classes, args.seed)
+    results_file = Path(args.results).resolve()
+    lines = load_lines(log_tree)
+
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',') if size.strip()]
+    engines = [engine.strip() for engine in args.engines.split(',') if engine.strip()]
+    for engine, batch_size in [(engine, size) for engine in engines for size in batch_sizes]:
+        runs = [run_parse(lines, engine, batch_size, args.extra_fields) for _ in range(max(1, args.repeats))]
+        elapsed = [run['elapsed_seconds'] for run in runs]
+        record = run_metadata(args.label)
+        record.update({
+            'benchmark': 'parse',
+            'engine': engine,
+            'batch_size': batch_size,
+            'extra_fields': args.extra_fields,
+            'hours': args.hours,
+            'files_per_hour': args.files_per_hour,
+            'lines_per_file': args.lines_per_file,
+            'classes': args.classes,
+            'seed': args.seed,
+            'lines': len(lines),
+            'records': runs[-1]['records'],
+            'elapsed_seconds': elapsed,
+            'elapsed_p50': statistics.median(elapsed),
+            'lines_per_second': len(lines) / statistics.median(elapsed) if any(elapsed) else 0.0,
+            'stage_seconds': runs[-1]['stage_seconds'],
+            'fallback_batches': runs[-1]['fallback_batches']
+        })
+        print(f"\nParser Benchmark ({engine}, batch size {batch_size:,d})")
+        print("-" * 80)
+        print(f"Lines: {len(lines):,d}  Records: {record['records']:,d}")
+        print(f"Elapsed: p50 {record['elapsed_p50']:.2f}s  Throughput: {record['lines_per_second']:,.0f} lines/s")
+        print(f"Decode: {record['stage_seconds']['decode']:.2f}s  Timestamp: {record['stage_seconds']['timestamp']:.2f}s  "
+              f"Fallback batches: {record['fallback_batches']}")
+        append_result(results_file, record)
+    print(f"\nResults appended to {results_file}")
+
+if __name__ == "__main__":
+    main()
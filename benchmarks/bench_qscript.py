@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+qscript Benchmark
+
+Generates (or reuses) a synthetic cluster-log tree and runs qscript's
+LogAnalyzer over it in each requested mode, reporting wall time, lines/s and
+peak RSS. Every run is appended to benchmarks/results/qscript.jsonl so changes
+to qscript.py can be compared against earlier runs.
+
+Usage:
+    python -m benchmarks.bench_qscript --hours 2 --files-per-hour 2 --lines-per-file 50000 --label "baseline"
+    python -m benchmarks.bench_qscript --modes dask --repeats 3
+    python -m benchmarks.bench_qscript --compare
+"""
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.bench_ingest import ensure_log_tree
+from benchmarks.common import REPO_ROOT, RESULTS_DIR, append_result, load_results, peak_rss_mb, run_metadata
+
+DEFAULT_RESULTS = RESULTS_DIR / 'qscript.jsonl'
+
+def run_analyzer(log_tree, output_dir, mode, max_memory_gb):
+    """Run LogAnalyzer over log_tree in the given mode and return its wall time and line counts."""
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    from qscript import LogAnalyzer
+
+    # Every run starts from scratch rather than reusing the previous run's partial outputs
+    analyzer = LogAnalyzer(str(log_tree), str(output_dir), max_memory_gb, mode=mode, resume=False)
+    start = time.perf_counter()
+    analyzer.analyze_logs()
+    elapsed = time.perf_counter() - start
+    return {
+        'elapsed_seconds': elapsed,
+        'total_lines': analyzer.total_lines,
+        'error_lines': analyzer.error_lines,
+        'analyses': len(analyzer.analyses)
+    }
+
+def print_result(record):
+    print(f"\nqscript Benchmark ({record['mode']})")
+    print("-" * 80)
+    print(f"Files: {record['files']}  Lines: {record['lines']:,d}  Parsed: {record['total_lines']:,d}")
+    print(f"Elapsed: p50 {record['elapsed_p50']:.2f}s, min {record['elapsed_min']:.2f}s "
+          f"over {len(record['elapsed_seconds'])} run(s)")
+    print(f"Throughput: {record['lines_per_second']:,.0f} lines/s")
+    print(f"Peak RSS (benchmark process): {record['peak_rss_mb']:.1f} MB")
+
+def print_comparison(results):
+    """Print one row per recorded run, newest last."""
+    if not results:
+        print("No recorded qscript results")
+        return
+    print(f"{'recorded_at':<20} {'revision':<14} {'label':<20} {'mode':<10} {'lines':>12} {'p50 s':>8} {'lines/s':>10}")
+    for r in results:
+        print(f"{r['recorded_at']:<20} {r['git_revision']:<14} {r['label'][:20]:<20} {r['mode']:<10} "
+              f"{r['lines']:>12,d} {r['elapsed_p50']:>8.2f} {r['lines_per_second']:>10,.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark qscript's LogAnalyzer in each analysis mode")
+    parser.add_argument('--hours', type=int, default=2, help="Number of hourly folders")
+    parser.add_argument('--files-per-hour', type=int, default=2, help="Files per hourly folder")
+    parser.add_argument('--lines-per-file', type=int, default=50000, help="Log lines per file")
+    parser.add_argument('--classes', type=int, default=None, help="Class-name cardinality (default: as in the profile)")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the synthetic tree")
+    parser.add_argument('--modes', default='mapreduce,dask', help="Comma-separated qscript modes to run")
+    parser.add_argument('--repeats', type=int, default=1, help="Runs per mode")
+    parser.add_argument('--max-memory-gb', type=float, default=None, help="Memory budget passed to LogAnalyzer")
+    parser.add_argument('--workdir', default=None, help="Workspace for generated logs and qscript output")
+    parser.add_argument('--results', default=str(DEFAULT_RESULTS), help="JSON lines file results are appended to")
+    parser.add_argument('--label', default='', help="Free-form label stored with the result")
+    parser.add_argument('--compare', action='store_true', help="Print previously recorded results and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        print_comparison(load_results(args.results))
+        return
+
+    workdir = Path(args.workdir or Path(tempfile.gettempdir()) / 'log_analyzer_bench').resolve()
+    log_tree, tree_summary = ensure_log_tree(workdir / 'cache', args.hours, args.files_per_hour,
+                                             args.lines_per_file, args.classes, args.seed)
+    results_file = Path(args.results).resolve()
+
+    for mode in [m.strip() for m in args.modes.split(',') if m.strip()]:
+        runs = [run_analyzer(log_tree, workdir / f'qscript_{mode}', mode, args.max_memory_gb)
+                for _ in range(max(1, args.repeats))]
+        elapsed = [run['elapsed_seconds'] for run in runs]
+        record = run_metadata(args.label)
+        record.update({
+            'benchmark': 'qscript',
+            'mode': mode,
+            'hours': args.hours,
+            'files_per_hour': args.files_per_hour,
+            'lines_per_file': args.lines_per_file,
+            'classes': args.classes,
+            'seed': args.seed,
+            'max_memory_gb': args.max_memory_gb,
+            'files': tree_summary['files'],
+            'lines': tree_summary['lines'],
+            'total_lines': runs[-1]['total_lines'],
+            'error_lines': runs[-1]['error_lines'],
+            'analyses': runs[-1]['analyses'],
+            'elapsed_seconds': elapsed,
+            'elapsed_p50': statistics.median(elapsed),
+            'elapsed_min': min(elapsed),
+            'lines_per_second': tree_summary['lines'] / statistics.median(elapsed) if any(elapsed) else 0.0,
+            'peak_rss_mb': peak_rss_mb()
+        })
+        print_result(record)
+        append_result(results_file, record)
+    print(f"\nResults appended to {results_file}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Query Latency Benchmark
+
+Loads synthetic jobs of increasing size straight into the logs, log_facts and
+job_metadata tables of an isolated database, then measures p50/p95 latency
+of the data_manager readers used by the Streamlit tabs for each query
+shape: level filter, ALL, LIKE search, deep page and summary counts. The
+EXPLAIN QUERY PLAN of every shape is recorded alongside the timings so
+index changes can be judged with numbers. Results are appended to
+benchmarks/results/queries.jsonl.
+
+Usage:
+    python -m benchmarks.bench_queries --sizes 10000000,50000000,100000000
+    python -m benchmarks.bench_queries --sizes 1000000 --repeats 5 --label "new index"
+"""
+
+import argparse
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from benchmarks.common import (RESULTS_DIR, append_result, db_size_bytes, prepare_workspace, quiet_streamlit,
+                               run_metadata)
+from benchmarks.synthetic_logs import DEFAULT_PROFILE, LogProfile
+
+DEFAULT_RESULTS = RESULTS_DIR / 'queries.jsonl'
+INSERT_BATCH = 50000
+LOGS_PER_PAGE = 1000
+
+def load_synthetic_job(conn, job_id, rows, profile, seed):
+    """Insert rows synthetic log rows for job_id along with its log_facts and metadata rows."""
+    rng = random.Random(f"{seed}:{job_id}")
+    start = datetime(2025, 4, 21)
+    step = max(86400.0 / max(rows, 1), 0.001)
+    facts, class_level, service_level = {}, {}, {}
+    classes, services = set(), set()
+    inserted = 0
+    while inserted < rows:
+        n = min(INSERT_BATCH, rows - inserted)
+        batch = []
+        for offset, (class_field, level) in enumerate(profile.sample(rng, n)):
+            service, class_name = class_field.split('.', 1)
+            ts = start + timedelta(seconds=(inserted + offset) * step)
+            hour = ts.strftime('%Y-%m-%d %H:00:00')
+            message = f"request {rng.randrange(10**6)} for user{rng.randrange(5000)} took {rng.randrange(2000)} ms"
+            batch.append((job_id, ts.strftime('%Y-%m-%d %H:%M:%S,%f')[:-3], level, class_name, service, message,
+                          ts.strftime('synthetic/%Y%m%d-%H'), f"cluster-log-{(inserted + offset) % 4}.gz", inserted + offset))
+            facts[(hour, service, class_name, level)] = facts.get((hour, service, class_name, level), 0) + 1
+            class_level[(class_name, level)] = class_level.get((class_name, level), 0) + 1
+            service_level[(service, level)] = service_level.get((service, level), 0) + 1
+            classes.add(class_name)
+            services.add(service)
+        conn.executemany('''
+            INSERT INTO logs (job_id, timestamp, level, class, service, log_message, folder, file_name, line_idx)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', batch)
+        conn.commit()
+        inserted += n
+        print(f"  {job_id}: {inserted:,d}/{rows:,d} rows", end='\r', flush=True)
+    print()
+
+    now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    conn.execute('''
+        INSERT INTO jobs (job_id, folder_path, status, files_processed, total_files, start_time, last_updated)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (job_id, 'synthetic', 'COMPLETED', 0, 0, now, now))
+    conn.executemany('''
+        INSERT INTO log_facts (job_id, hour, service, class, level, count, est_count, est_variance)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+    ''', [(job_id, h, s, c, l, n, n) for (h, s, c, l), n in facts.items()])
+    conn.executemany('INSERT OR IGNORE INTO job_metadata (job_id, type, value) VALUES (?, ?, ?)',
+                     [(job_id, 'class', c) for c in classes] + [(job_id, 'service', s) for s in services])
+    conn.commit()
+    # Query shapes target the busiest class/service so the latencies reflect the worst case
+    top_class = max(class_level, key=class_level.get)
+    top_service = max(service_level, key=service_level.get)
+    return {'class': top_class[0], 'class_level': top_class[1], 'service': top_service[0],
+            'service_level': top_service[1], 'class_rows': sum(n for (c, _), n in class_level.items() if c == top_class[0])}
+
+def query_shapes(dm, job_id, target):
+    """(name, callable, SQL, params) for every query shape the Streamlit tabs issue."""
+    deep_page = max(1, target['class_rows'] // LOGS_PER_PAGE)
+    class_sql = "SELECT timestamp, log_message, level, class FROM logs WHERE job_id = ? AND class = ?"
+    service_sql = "SELECT timestamp, log_message, level, service FROM logs WHERE job_id = ? AND service = ?"
+    page_sql = " ORDER BY timestamp LIMIT ? OFFSET ?"
+    return [
+        ('class_level_filter',
+         lambda: dm.get_logs_by_class_and_level(job_id, target['class'], target['class_level'], 1, LOGS_PER_PAGE),
+         class_sql + " AND level = ?" + page_sql, [job_id, target['class'], target['class_level'], LOGS_PER_PAGE, 0]),
+        ('class_all_levels',
+         lambda: dm.get_logs_by_class_and_level(job_id, target['class'], 'ALL', 1, LOGS_PER_PAGE),
+         class_sql + page_sql, [job_id, target['class'], LOGS_PER_PAGE, 0]),
+        ('class_like_search',
+         lambda: dm.get_logs_by_class_and_level(job_id, target['class'], 'ALL', 1, LOGS_PER_PAGE, 'user42'),
+         class_sql + " AND log_message LIKE ?" + page_sql, [job_id, target['class'], '%user42%', LOGS_PER_PAGE, 0]),
+        ('class_deep_page',
+         lambda: dm.get_logs_by_class_and_level(job_id, target['class'], 'ALL', deep_page, LOGS_PER_PAGE),
+         class_sql + page_sql, [job_id, target['class'], LOGS_PER_PAGE, (deep_page - 1) * LOGS_PER_PAGE]),
+        ('class_count',
+         None,
+         "SELECT COUNT(*) FROM logs WHERE job_id = ? AND class = ?", [job_id, target['class']]),
+        ('service_level_filter',
+         lambda: dm.get_logs_by_service_and_level(job_id, target['service'], target['service_level'], 1, LOGS_PER_PAGE),
+         service_sql + " AND level = ?" + page_sql, [job_id, target['service'], target['service_level'], LOGS_PER_PAGE, 0]),
+        ('service_all_levels',
+         lambda: dm.get_logs_by_service_and_level(job_id, target['service'], 'ALL', 1, LOGS_PER_PAGE),
+         service_sql + page_sql, [job_id, target['service'], LOGS_PER_PAGE, 0]),
+        ('analysis_class_counts',
+         lambda: dm._fetch_analysis_data(job_id, 'class'),
+         "SELECT class, level, count FROM class_level_counts WHERE job_id = ?", [job_id]),
+        ('analysis_timeline',
+         lambda: dm._fetch_analysis_data(job_id, 'timeline'),
+         "SELECT hour, level, count FROM timeline_counts WHERE job_id = ? ORDER BY hour", [job_id]),
+        ('facts_slice',
+         lambda: dm.get_fact_slice(job_id, ['class'], services=[target['service']], levels=[target['service_level']]),
+         "SELECT class, SUM(count) FROM log_facts WHERE job_id = ? AND service IN (?) AND level IN (?) GROUP BY class",
+         [job_id, target['service'], target['service_level']]),
+        ('job_metadata',
+         lambda: dm.get_job_metadata(job_id),
+         "SELECT value FROM job_metadata WHERE job_id = ? AND type = 'class'", [job_id]),
+    ]
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+def measure(conn, dm, name, func, sql, params, repeats):
+    """Time one query shape repeats times and capture its query plan."""
+    plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+    reader = getattr(dm, name_to_reader(name), None)
+    samples = []
+    for _ in range(repeats):
+        # Clear the reader's Streamlit cache first so every run hits the database
+        if func is not None and hasattr(reader, 'clear'):
+            reader.clear()
+        start = time.perf_counter()
+        if func is None:
+            conn.execute(sql, params).fetchall()
+        else:
+            func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return {
+        'p50_ms': statistics.median(samples),
+        'p95_ms': percentile(samples, 95),
+        'min_ms': min(samples),
+        'max_ms': max(samples),
+        'query_plan': plan
+    }
+
+def name_to_reader(name):
+    """Map a query shape to the cached data_manager function whose cache must be cleared."""
+    if name.startswith('class_'):
+        return 'get_logs_by_class_and_level'
+    if name.startswith('service_'):
+        return 'get_logs_by_service_and_level'
+    if name.startswith('analysis_'):
+        return '_fetch_analysis_data'
+    if name.startswith('facts_'):
+        return 'get_fact_slice'
+    return 'get_job_metadata'
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark data_manager query latency on large synthetic jobs")
+    parser.add_argument('--sizes', default='10000000,50000000,100000000',
+                        help="Comma-separated row counts, one synthetic job per size")
+    parser.add_argument('--repeats', type=int, default=20, help="Timed runs per query shape")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for the synthetic rows")
+    parser.add_argument('--workdir', default=None, help="Workspace holding the benchmark database")
+    parser.add_argument('--results', default=str(DEFAULT_RESULTS), help="JSON lines file results are appended to")
+    parser.add_argument('--label', default='', help="Free-form label stored with the result")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    results_file = Path(args.results).resolve()
+    workdir = Path(args.workdir or Path(tempfile.gettempdir()) / 'log_analyzer_bench').resolve()
+    prepare_workspace(workdir / 'queries')
+
+    from analyzer import data_manager as dm
+    quiet_streamlit()
+    dm.init_db()
+    profile = LogProfile.from_csv(DEFAULT_PROFILE)
+    conn = sqlite3.connect('data/logs.db', timeout=60)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=OFF')
+
+    for rows in sizes:
+        job_id = f"bench_{rows}"
+        print(f"Loading synthetic job {job_id} ...")
+        load_start = time.perf_counter()
+        target = load_synthetic_job(conn, job_id, rows, profile, args.seed)
+        load_seconds = time.perf_counter() - load_start
+        conn.execute('ANALYZE')
+
+        record = run_metadata(args.label)
+        record.update({
+            'benchmark': 'queries',
+            'job_rows': rows,
+            'total_rows': conn.execute('SELECT COUNT(*) FROM logs').fetchone()[0],
+            'load_seconds': load_seconds,
+            'db_size_mb': db_size_bytes() / 1024**2,
+            'repeats': args.repeats,
+            'target': target,
+            'queries': {}
+        })
+        print(f"\n{rows:,d} rows for {job_id} ({record['total_rows']:,d} in logs)")
+        print(f"{'query':<24} {'p50 ms':>10} {'p95 ms':>10}  plan")
+        for name, func, sql, params in query_shapes(dm, job_id, target):
+            result = measure(conn, dm, name, func, sql, params, args.repeats)
+            record['queries'][name] = result
+            print(f"{name:<24} {result['p50_ms']:>10.2f} {result['p95_ms']:>10.2f}  {' | '.join(result['query_plan'])}")
+        append_result(results_file, record)
+
+    conn.close()
+    print(f"\nResults appended to {results_file}")
+
+if __name__ == "__main__":
+    main()
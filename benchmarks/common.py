@@ -0,0 +1,84 @@
+"""Shared helpers for the benchmark suites: isolated workspaces, resource usage and result files."""
+
+import json
+import logging
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+RESULTS_DIR = REPO_ROOT / 'benchmarks' / 'results'
+
+def prepare_workspace(workdir):
+    """Create an isolated working directory with its own config/ and data/ and chdir into it.
+
+    The backend and data_manager resolve config/config.yaml and data/logs.db relative
+    to the working directory, so benchmarks never touch the real database.
+    """
+    workdir = Path(workdir).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    shutil.rmtree(workdir / 'data', ignore_errors=True)
+    shutil.copytree(REPO_ROOT / 'config', workdir / 'config', dirs_exist_ok=True)
+    (workdir / 'data').mkdir()
+    os.chdir(workdir)
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+    return workdir
+
+def quiet_streamlit():
+    """Silence Streamlit's bare-mode warnings when cached readers are called outside `streamlit run`."""
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith('streamlit'):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+def db_size_bytes(db_path='data/logs.db'):
+    """Size of the SQLite database including its WAL and shared-memory files."""
+    return sum(os.path.getsize(p) for p in (db_path, f'{db_path}-wal', f'{db_path}-shm') if os.path.exists(p))
+
+def git_revision():
+    """Short git revision of the repository, with a -dirty suffix for uncommitted changes."""
+    try:
+        revision = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return f'{revision}-dirty' if dirty else revision
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def run_metadata(label=None):
+    """Fields recorded with every benchmark result so runs can be compared."""
+    return {
+        'recorded_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'git_revision': git_revision(),
+        'label': label or '',
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+def append_result(results_file, record):
+    """Append one result as a JSON line."""
+    results_file = Path(results_file)
+    results_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(results_file, 'a') as f:
+        f.write(json.dumps(record, default=str) + '\n')
+
+def load_results(results_file):
+    """Load all previously recorded results from a JSON lines file."""
+    results_file = Path(results_file)
+    if not results_file.exists():
+        return []
+    with open(results_file) as f:
+        return [json.loads(line) for line in f if line.strip()]
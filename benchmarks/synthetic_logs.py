@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Synthetic Cluster Log Generator
+
+Generates reproducible YYYYMMDD-HH/cluster-log-N.gz trees that mimic the
+real Saviynt cluster logs: the (class, level) mix and class-name
+cardinality are modeled on processed/level_counts_by_class.csv and message
+lengths follow a log-normal distribution.
+
+Usage:
+    python -m benchmarks.synthetic_logs OUTPUT_DIR --hours 2 --files-per-hour 2 --lines-per-file 50000
+"""
+
+import argparse
+import csv
+import gzip
+import json
+import math
+import os
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_PROFILE = REPO_ROOT / 'processed' / 'level_counts_by_class.csv'
+
+# Words used to build message templates and padding
+WORDS = (
+    'request', 'user', 'account', 'entitlement', 'role', 'session', 'token', 'policy', 'job',
+    'import', 'export', 'connection', 'endpoint', 'response', 'query', 'cache', 'sync', 'task',
+    'identity', 'access', 'review', 'approval', 'workflow', 'attribute', 'mapping', 'schema'
+)
+VERBS = ('processing', 'completed', 'failed', 'started', 'skipping', 'updating', 'fetching', 'validating')
+
+class LogProfile:
+    """Joint (class, level) distribution used to draw synthetic log lines."""
+
+    def __init__(self, pairs, weights):
+        self.pairs = list(pairs)
+        self.weights = list(weights)
+        self.cum_weights = []
+        running = 0.0
+        for weight in self.weights:
+            running += weight
+            self.cum_weights.append(running)
+
+    @property
+    def classes(self):
+        """Class names ordered from most to least frequent."""
+        totals = {}
+        for (class_field, _), weight in zip(self.pairs, self.weights):
+            totals[class_field] = totals.get(class_field, 0) + weight
+        return sorted(totals, key=totals.get, reverse=True)
+
+    @classmethod
+    def from_csv(cls, csv_path=DEFAULT_PROFILE):
+        """Load the (class, level) mix from a class,level,count CSV."""
+        pairs, weights = [], []
+        with open(csv_path, newline='') as f:
+            for row in csv.DictReader(f):
+                count = int(float(row['count']))
+                if count > 0:
+                    pairs.append((row['class'], row['level']))
+                    weights.append(count)
+        if not pairs:
+            raise ValueError(f"No class/level counts found in {csv_path}")
+        return cls(pairs, weights)
+
+    def with_class_cardinality(self, num_classes, rng):
+        """Return a profile with num_classes classes, extending the real tail with Zipf-weighted synthetic classes."""
+        classes = self.classes
+        if num_classes <= len(classes):
+            keep = set(classes[:num_classes])
+            kept = [(pair, w) for pair, w in zip(self.pairs, self.weights) if pair[0] in keep]
+            return LogProfile([p for p, _ in kept], [w for _, w in kept])
+        pairs, weights = list(self.pairs), list(self.weights)
+        smallest = min(weights)
+        services = sorted({c.split('.', 1)[0] for c in classes})
+        levels = [level for _, level in self.pairs]
+        # Long tail of rarely-logging classes, each smaller than the previous
+        for rank in range(len(classes), num_classes):
+            service = rng.choice(services)
+            pairs.append((f"{service}.synthetic{rank}service", rng.choice(levels)))
+            weights.append(smallest * len(classes) / (rank + 1))
+        return LogProfile(pairs, weights)
+
+    def sample(self, rng, k):
+        """Draw k (class, level) pairs."""
+        return rng.choices(self.pairs, cum_weights=self.cum_weights, k=k)
+
+class SyntheticLogGenerator:
+    """Writes cluster-log-N.gz files with realistic line shapes."""
+
+    def __init__(self, profile=None, seed=42, message_median=120, message_sigma=0.9,
+                 invalid_json_rate=0.0001, invalid_timestamp_rate=0.001, missing_class_rate=0.002,
+                 templates_per_class=12, pods_per_service=3, hosts=8, threads=32):
+        self.profile = profile or LogProfile.from_csv()
+        self.seed = seed
+        self.message_mu = math.log(message_median)
+        self.message_sigma = message_sigma
+        self.invalid_json_rate = invalid_json_rate
+        self.invalid_timestamp_rate = invalid_timestamp_rate
+        self.missing_class_rate = missing_class_rate
+        self.templates_per_class = templates_per_class
+        self.pods_per_service = pods_per_service
+        self.hosts = hosts
+        self.threads = threads
+        self._templates = {}
+
+    def _templates_for(self, class_field, rng):
+        """Per-class pool of message templates so repeated messages look like real noisy loggers."""
+        templates = self._templates.get(class_field)
+        if templates is None:
+            template_rng = random.Random(f"{self.seed}:{class_field}")
+            templates = []
+            for _ in range(self.templates_per_class):
+                words = template_rng.sample(WORDS, 4)
+                templates.append(f"{template_rng.choice(VERBS).title()} {words[0]} {{id}} for {words[1]} {{user}}: "
+                                 f"{words[2]} {words[3]} took {{ms}} ms")
+            self._templates[class_field] = templates
+        return templates
+
+    def _message(self, rng, class_field, level):
+        template = rng.choice(self._templates_for(class_field, rng))
+        message = template.format(id=rng.randrange(10**6), user=f"user{rng.randrange(5000)}", ms=rng.randrange(2000))
+        target = int(min(8000, max(16, rng.lognormvariate(self.message_mu, self.message_sigma))))
+        if level in ('ERROR', 'FATAL'):
+            # Errors carry stack traces and run longer
+            target *= 3
+        if len(message) < target:
+            padding = []
+            length = len(message)
+            while length < target:
+                word = rng.choice(WORDS)
+                padding.append(word)
+                length += len(word) + 1
+            message = message + ' ' + ' '.join(padding)
+        return message[:target] if len(message) > target else message
+
+    def write_file(self, path, hour_start, lines, file_index):
+        """Write one gzip file of JSON log lines starting at hour_start; returns the number of lines written."""
+        rng = random.Random(f"{self.seed}:{path.parent.name}:{file_index}")
+        pairs = self.profile.sample(rng, lines)
+        step = 3600.0 / max(lines, 1)
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            for idx, (class_field, level) in enumerate(pairs):
+                ts = hour_start + timedelta(seconds=idx * step)
+                service = class_field.split('.', 1)[0]
+                record = {
+                    'logtime': ts.strftime('%Y-%m-%d %H:%M:%S,%f')[:-3],
+                    'thread': f"http-nio-8080-exec-{rng.randrange(self.threads)}",
+                    'level': level,
+                    'class': class_field,
+                    'log': self._message(rng, class_field, level),
+                    'kubernetes': {
+                        'pod_name': f"{service}-{rng.randrange(self.pods_per_service)}",
+                        'namespace_name': 'saviynt',
+                        'container_name': service,
+                        'host': f"ip-10-0-{rng.randrange(self.hosts)}-1.ec2.internal"
+                    }
+                }
+                roll = rng.random()
+                if roll < self.invalid_timestamp_rate:
+                    record['logtime'] = 'N/A'
+                elif roll < self.invalid_timestamp_rate + self.missing_class_rate:
+                    record.pop('class')
+                line = json.dumps(record)
+                if rng.random() < self.invalid_json_rate:
+                    line = line[:len(line) // 2]
+                f.write(line + '\n')
+        return lines
+
+    def generate(self, output_dir, hours=2, files_per_hour=2, lines_per_file=50000,
+                 start=datetime(2025, 4, 21, 0)):
+        """Generate the YYYYMMDD-HH/cluster-log-N.gz tree and return a summary dict."""
+        output_dir = Path(output_dir)
+        total_lines = 0
+        files = 0
+        for hour in range(hours):
+            hour_start = start + timedelta(hours=hour)
+            folder = output_dir / hour_start.strftime('%Y%m%d-%H')
+            folder.mkdir(parents=True, exist_ok=True)
+            for file_index in range(files_per_hour):
+                total_lines += self.write_file(folder / f"cluster-log-{file_index}.gz", hour_start,
+                                               lines_per_file, file_index)
+                files += 1
+        compressed = sum(p.stat().st_size for p in output_dir.rglob('*.gz'))
+        return {'files': files, 'lines': total_lines, 'compressed_bytes': compressed}
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic YYYYMMDD-HH/cluster-log-N.gz trees")
+    parser.add_argument('output_dir', help="Folder to write the hourly sub-folders into")
+    parser.add_argument('--hours', type=int, default=2, help="Number of hourly folders")
+    parser.add_argument('--files-per-hour', type=int, default=2, help="Number of cluster-log-N.gz files per hour")
+    parser.add_argument('--lines-per-file', type=int, default=50000, help="Log lines per file")
+    parser.add_argument('--classes', type=int, default=None, help="Class-name cardinality (default: as in the profile)")
+    parser.add_argument('--profile', default=str(DEFAULT_PROFILE), help="class,level,count CSV modeling the level mix")
+    parser.add_argument('--message-median', type=int, default=120, help="Median message length in characters")
+    parser.add_argument('--seed', type=int, default=42, help="Random seed for reproducible trees")
+    args = parser.parse_args()
+
+    profile = LogProfile.from_csv(args.profile)
+    if args.classes:
+        profile = profile.with_class_cardinality(args.classes, random.Random(args.seed))
+    generator = SyntheticLogGenerator(profile, seed=args.seed, message_median=args.message_median)
+    summary = generator.generate(args.output_dir, args.hours, args.files_per_hour, args.lines_per_file)
+    print(f"Wrote {summary['files']} files, {summary['lines']:,d} lines, "
+          f"{summary['compressed_bytes'] / 1024**2:.1f} MB compressed to {os.path.abspath(args.output_dir)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Headless Parallel Ingestion
+
+Ingests a folder of .gz log files into data/logs.db without the API server, using the
+backend's own per-file ingestion (backend.process_log_file). The result is an ordinary
+job in the jobs, logs and summary tables, so the Streamlit dashboard shows it like any
+job started from the UI.
+
+Each worker process decompresses, decodes and summarizes its own files and writes them
+through its own connection. SQLite admits one writer at a time, so workers only wait
+for each other while a batch is being committed. Ctrl-C marks the job PAUSED; running
+it again with --job-id (or resuming it from the UI) skips the files already ingested.
+
+Usage:
+    python ingest.py LOG_FOLDER [--workers N] [--batch-size ROWS] [--bulk-load]
+    python ingest.py LOG_FOLDER --mode sample --sample-rate 0.1 --sample-unit files
+    python ingest.py LOG_FOLDER --job-id JOB_ID
+
+--bulk-load drops the secondary indexes of the logs table for the duration of the run,
+rebuilds them at the end and writes with synchronous=OFF. It is meant for overnight
+backfills while nobody is using the dashboard: queries on other jobs are slow until
+the indexes are rebuilt.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from tqdm import tqdm
+
+import backend
+from analyzer.data_manager import init_db
+from analyzer.db import DB_PATH, checkpoint_wal, connect
+from analyzer.sampling import select_files, validate_sampling
+
+# Connection of a worker process, opened once by _init_worker
+_worker_conn = None
+
+def _init_worker(bulk_load: bool):
+    """Open the worker's own write connection."""
+    global _worker_conn
+    _worker_conn = connect(DB_PATH, timeout=600)
+    _worker_conn.execute('PRAGMA journal_mode=WAL')
+    if bulk_load:
+        _worker_conn.execute('PRAGMA synchronous = OFF')
+
+def ingest_file(job_id: str, file_path: str, sampling, batch_size: int):
+    """Ingest one file in a worker process; returns (file_path, seconds)."""
+    start = time.perf_counter()
+    asyncio.run(backend.process_log_file(file_path, job_id, _worker_conn, sampling, batch_size))
+    return file_path, time.perf_counter() - start
+
+def drop_log_indexes(conn) -> list:
+    """Drop the secondary indexes of the logs table; init_db() recreates them."""
+    names = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'logs' AND sql IS NOT NULL")]
+    for name in names:
+        conn.execute(f'DROP INDEX IF EXISTS "{name}"')
+    conn.commit()
+    return names
+
+def create_job(conn, args) -> dict:
+    """Insert a new RUNNING job for args.folder, named like jobs started from the UI."""
+    sampled = args.mode == 'sample'
+    start_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    job_state = {
+        'job_id': os.path.basename(os.path.normpath(args.folder)) + "_" + start_time,
+        'folder_path': args.folder,
+        'status': 'RUNNING',
+        'files_processed': 0,
+        'total_files': 0,
+        'current_file': '',
+        'start_time': start_time,
+        'last_updated': start_time,
+        'mode': args.mode,
+        'sample_rate': args.sample_rate if sampled else None,
+        'sample_method': args.sample_method if sampled else None,
+        'sample_unit': args.sample_unit if sampled else None,
+        'sample_size': args.sample_size if sampled else None
+    }
+    backend.insert_job(conn, job_state)
+    return job_state
+
+def load_job(conn, job_id: str) -> dict:
+    """Job state of an existing job, for resuming it."""
+    row = conn.execute('''
+        SELECT job_id, folder_path, status, files_processed, total_files, start_time, last_updated,
+               mode, sample_rate, sample_method, sample_unit, sample_size
+        FROM jobs WHERE job_id = ?
+    ''', (job_id,)).fetchone()
+    if row is None:
+        raise ValueError(f"Job not found: {job_id}")
+    keys = ('job_id', 'folder_path', 'status', 'files_processed', 'total_files', 'start_time', 'last_updated',
+            'mode', 'sample_rate', 'sample_method', 'sample_unit', 'sample_size')
+    job_state = dict(zip(keys, row))
+    job_state['mode'] = job_state['mode'] or 'full'
+    return job_state
+
+def update_job(conn, job_id: str, status: str, files_processed: int, total_files: int, current_file: str = ''):
+    conn.execute('''
+        UPDATE jobs SET status = ?, files_processed = ?, total_files = ?, current_file = ?, last_updated = ?
+        WHERE job_id = ?
+    ''', (status, files_processed, total_files, current_file, datetime.now().strftime('%Y-%m-%d %H:%M:%S'), job_id))
+    conn.commit()
+
+def run(args) -> int:
+    """Ingest args.folder into a new or resumed job; returns the process exit code."""
+    init_db()
+    conn = connect(DB_PATH, timeout=600)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute(f'PRAGMA journal_size_limit = {backend.WAL_MAX_BYTES}')
+
+    job_state = load_job(conn, args.job_id) if args.job_id else create_job(conn, args)
+    job_id = job_state['job_id']
+    folder = job_state['folder_path']
+    if not os.path.isdir(folder):
+        print(f"Invalid folder path: {folder}")
+        update_job(conn, job_id, 'ERROR', job_state['files_processed'], job_state['total_files'])
+        return 1
+
+    log_files = backend.find_log_files(folder)
+    sampling = backend.sampling_options(job_state)
+    if sampling and sampling['unit'] == 'files':
+        log_files, sampling['weight'] = select_files(log_files, sampling['rate'], sampling['method'],
+                                                     sampling['seed'], job_id)
+    processed_files = set(row[0] for row in conn.execute('''
+        SELECT value FROM job_metadata WHERE job_id = ? AND type = 'processed_file'
+    ''', (job_id,)))
+    pending = [f for f in log_files if f not in processed_files]
+    total_files = len(log_files)
+    files_processed = total_files - len(pending)
+    update_job(conn, job_id, 'RUNNING', files_processed, total_files)
+
+    print(f"Job {job_id}: {len(pending)} of {total_files} files to ingest with {args.workers} workers, "
+          f"batch size {args.batch_size}")
+    dropped = drop_log_indexes(conn) if args.bulk_load and pending else []
+    if dropped:
+        print(f"Bulk load: dropped {len(dropped)} logs indexes until the end of the run")
+
+    status = 'COMPLETED'
+    start = time.perf_counter()
+    files = iter(pending)
+    running = {}
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker,
+                                 initargs=(args.bulk_load,)) as executor, \
+                tqdm(total=len(pending), desc="Ingesting files") as pbar:
+            while True:
+                # Keep one file per worker in flight, so progress and pauses are per file
+                while len(running) < args.workers:
+                    file_path = next(files, None)
+                    if file_path is None:
+                        break
+                    running[executor.submit(ingest_file, job_id, file_path, sampling, args.batch_size)] = file_path
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = running.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"\nError ingesting {file_path}: {str(e)}")
+                        backend.logger.error(f"Error ingesting {file_path} for job {job_id}: {str(e)}")
+                        status = 'ERROR'
+                        continue
+                    files_processed += 1
+                    update_job(conn, job_id, 'RUNNING', files_processed, total_files, os.path.basename(file_path))
+                    checkpoint_wal(conn, backend.WAL_MAX_BYTES)
+                    pbar.update(1)
+    except KeyboardInterrupt:
+        status = 'PAUSED'
+        print("\nInterrupted; the job is paused and can be resumed with --job-id")
+    finally:
+        if dropped:
+            print("Rebuilding logs indexes...")
+            init_db()
+        update_job(conn, job_id, status, files_processed, total_files)
+        checkpoint_wal(conn, 0)
+        conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Job {job_id} {status.lower()}: {files_processed}/{total_files} files in {elapsed:.1f}s")
+    return 0 if status == 'COMPLETED' else 1
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest a folder of .gz log files into the dashboard database")
+    parser.add_argument('folder', nargs='?', help="Folder of .gz log files (not needed with --job-id)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=backend.DEFAULT_BATCH_SIZE,
+                        help="Log rows committed per transaction")
+    parser.add_argument('--bulk-load', action='store_true',
+                        help="Drop the logs indexes during the run and rebuild them at the end")
+    parser.add_argument('--job-id', default=None, help="Resume an existing job instead of starting a new one")
+    parser.add_argument('--mode', choices=('full', 'sample'), default='full', help="Ingest every line or a sample")
+    parser.add_argument('--sample-rate', type=float, default=0.1, help="Share of lines or files to ingest")
+    parser.add_argument('--sample-method', default='systematic', help="systematic or reservoir")
+    parser.add_argument('--sample-unit', default='lines', help="lines or files")
+    parser.add_argument('--sample-size', type=int, default=None, help="Reservoir size per file")
+    args = parser.parse_args()
+
+    if not args.folder and not args.job_id:
+        parser.error("a folder or --job-id is required")
+    if args.workers < 1 or args.batch_size < 1:
+        parser.error("--workers and --batch-size must be positive")
+    error = validate_sampling(args.mode, args.sample_rate, args.sample_method, args.sample_unit)
+    if error:
+        parser.error(error)
+    try:
+        sys.exit(run(args))
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,23 @@ Scalable Log Analysis Tool
 This script provides scalable analysis of gzipped JSON log files using streaming processing
 and out-of-core computations. It's designed to handle very large datasets efficiently.
 
+Two modes are available:
+    - mapreduce (default): each worker counts its files into partial counters that the
+      parent merges; Dask is not needed
+    - dask: workers write partial Parquet files that are aggregated with Dask
+
+Each file's partial output is kept in OUTPUT_FOLDER/partials and recorded in
+OUTPUT_FOLDER/manifest.jsonl, so an interrupted or repeated run only processes new or
+changed files. --fresh processes everything again.
+
+Usage:
+    python qscript.py LOG_FOLDER [MAX_MEMORY_GB] [--mode {mapreduce,dask}] [--output OUTPUT_FOLDER] [--fresh]
+
 Requirements:
     - Python 3.7+
     - pandas
-    - dask
-    - fastparquet
+    - dask (dask mode only)
+    - pyarrow (dask mode; in both modes it also decodes log lines in blocks)
     - psutil
     - tqdm
 
@@ -20,30 +32,236 @@ Date: 2024
 import os
 import gzip
 import json
+import pickle
 import sys
+import argparse
 import psutil
 import warnings
 import traceback
 import signal
 from pathlib import Path
 from datetime import datetime
-import dateutil.parser
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from contextlib import contextmanager
+from itertools import islice
 
 import pandas as pd
-import dask.dataframe as dd
 import numpy as np
 from tqdm import tqdm
 
+from analyzer.log_processor import LogProcessor
+
+# pyarrow is only needed for the temp Parquet files of dask mode
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 # Suppress specific warnings
 warnings.filterwarnings('ignore', category=pd.errors.PerformanceWarning)
 warnings.filterwarnings('ignore', category=FutureWarning)
 
+# Columns of the intermediate Parquet files and the LogProcessor column each one is filled from
+LOG_COLUMNS = {
+    'timestamp': 'timestamps',
+    'thread': 'threads',
+    'level': 'levels',
+    'class': 'class_fields',
+    'message': 'messages',
+    'container': 'containers',
+    'namespace': 'namespaces',
+    'pod': 'pods',
+    'host': 'hosts',
+    'time': 'times'
+}
+LOG_SCHEMA = pa.schema([(column, pa.timestamp('s') if column == 'time' else pa.string())
+                        for column in LOG_COLUMNS]) if pa else None
+
+# Version of the partial outputs; files recorded with another version are processed again
+PARTIAL_FORMAT = 2
+
+# Partial counters each mapreduce worker returns; every analysis is derived from these
+PARTIAL_COUNTERS = ('class_pod_level', 'hour_level', 'container', 'host', 'thread')
+
+ANALYSIS_MODES = ('mapreduce', 'dask')
+
+# Identifier columns of the analyses saved as pivots with one column per log level
+PIVOT_ID_COLUMNS = {
+    'class_level_counts': ['class'],
+    'class_level_pod': ['class', 'pod'],
+    'hourly_level_counts': ['hour']
+}
+
+# Completed source files and their partial outputs, kept in the output folder across runs
+MANIFEST_NAME = 'manifest.jsonl'
+PARTIALS_DIR = 'partials'
+
+# Bounds of the per-file chunk size, in records
+MIN_CHUNK_SIZE = 1000
+MAX_CHUNK_SIZE = 100000
+
+# Lines parsed per LogProcessor batch; workers compare their own RSS with their budget after each batch
+MEMORY_CHECK_INTERVAL = 1000
+
 class LogAnalysisError(Exception):
     """Custom exception for log analysis errors."""
     pass
 
+class RunManifest:
+    """
+    Append-only record of the source files whose partial output is complete.
+    
+    Each line holds one file's mode, relative source path, size, mtime, partial format and
+    partial output (relative to the output folder). A file is finished for a mode while its
+    latest entry still matches its size and mtime, was written in the current
+    PARTIAL_FORMAT and the partial output exists. A run interrupted mid-line leaves a
+    truncated last line, which is ignored.
+    """
+
+    def __init__(self, output_folder):
+        self.output_folder = Path(output_folder)
+        self.path = self.output_folder / MANIFEST_NAME
+        self.entries = {}
+        if self.path.exists():
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[(entry['mode'], entry['source'])] = entry
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue
+
+    def completed(self, mode, source, file_path):
+        """
+        The entry for a finished source file, or None if it has to be processed.
+        
+        Args:
+            mode (str): Analysis mode the partial output was written for
+            source (str): Source path relative to the base folder
+            file_path (Path): Source file, to compare its size and mtime with the entry
+        """
+        entry = self.entries.get((mode, source))
+        if entry is None or entry.get('format') != PARTIAL_FORMAT:
+            return None
+        stat = Path(file_path).stat()
+        if entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            return None
+        if not (self.output_folder / entry['output']).exists():
+            return None
+        return entry
+
+    def record(self, mode, source, file_path, output, lines, errors):
+        """Append a finished source file; its partial output must already be in place."""
+        stat = Path(file_path).stat()
+        entry = {
+            'mode': mode,
+            'source': source,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'format': PARTIAL_FORMAT,
+            'output': Path(output).relative_to(self.output_folder).as_posix(),
+            'lines': lines,
+            'errors': errors,
+            'completed_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        }
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+        self.entries[(mode, source)] = entry
+
+    def output_path(self, entry):
+        return self.output_folder / entry['output']
+
+    def reset(self):
+        """Forget all finished files."""
+        self.entries = {}
+        if self.path.exists():
+            self.path.unlink()
+
+class MemoryGovernor:
+    """
+    Keeps the parallel file processing within the memory budget.
+    
+    The worker count is sized from the budget rather than the core count, and a new file is
+    only started while the combined RSS of this process and its workers is below the high
+    watermark. With adaptive chunks (dask mode, where a worker buffers a chunk of records
+    before writing it), the chunk size handed to new files is also halved whenever RSS
+    crosses the high watermark and grown back once RSS falls below the low watermark. A
+    mapreduce worker only holds one parse batch and its counters, so there the chunk size
+    stays fixed and admission is the governor's only lever. RSS counts pages shared with
+    the parent in every worker, so the governor errs on the safe side.
+    """
+
+    HIGH_WATERMARK = 0.8
+    LOW_WATERMARK = 0.6
+
+    def __init__(self, max_memory, chunk_size, record_bytes, adaptive=True):
+        """
+        Args:
+            max_memory (float): Memory budget in bytes for this process and all workers
+            chunk_size (int): Initial (and largest) chunk size in records
+            record_bytes (float): Estimated in-memory size of one parsed record
+            adaptive (bool): Shrink and grow chunk_size with memory pressure (default: True)
+        """
+        self.max_memory = max_memory
+        self.adaptive = adaptive
+        self.max_chunk_size = chunk_size
+        self.chunk_size = chunk_size
+        self.record_bytes = record_bytes
+        self.process = psutil.Process()
+        # A worker starts as a copy of this process, so its RSS is the worker's fixed cost
+        self.worker_overhead = self.process.memory_info().rss
+        self.workers = self._calculate_workers()
+        self.peak_rss = 0
+        self.throttled = 0
+
+    def _calculate_workers(self):
+        """Largest worker count whose fixed cost and full chunks (plus their Arrow copies) fit the budget."""
+        per_worker = self.worker_overhead + self.chunk_size * self.record_bytes * 3
+        affordable = int((self.max_memory * self.HIGH_WATERMARK - self.worker_overhead) // per_worker)
+        return max(1, min(os.cpu_count() or 1, affordable))
+
+    @property
+    def worker_budget(self):
+        """RSS a single worker may reach before it flushes its chunk early."""
+        return self.max_memory * self.HIGH_WATERMARK / (self.workers + 1)
+
+    def rss(self):
+        """Combined RSS of this process and its worker processes in bytes."""
+        total = self.process.memory_info().rss
+        for child in self.process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                # The worker exited between listing and sampling
+                continue
+        self.peak_rss = max(self.peak_rss, total)
+        return total
+
+    def admit(self):
+        """
+        Whether another file may start now, adapting the chunk size to the current pressure.
+        
+        Returns:
+            bool: False while RSS is above the high watermark
+        """
+        rss = self.rss()
+        if rss > self.max_memory * self.HIGH_WATERMARK:
+            if self.adaptive:
+                self.chunk_size = max(MIN_CHUNK_SIZE, self.chunk_size // 2)
+            self.throttled += 1
+            return False
+        if self.adaptive and rss < self.max_memory * self.LOW_WATERMARK:
+            self.chunk_size = min(self.max_chunk_size, self.chunk_size * 2)
+        return True
+
+def _label(value):
+    """Grouping label of a raw field: UNKNOWN when missing, the odd number stringified."""
+    if value is None:
+        return 'UNKNOWN'
+    return value if isinstance(value, str) else str(value)
+
 @contextmanager
 def suppress_semaphore_warning():
     """Context manager to suppress semaphore warnings."""
@@ -60,7 +278,7 @@ def suppress_semaphore_warning():
 class LogAnalyzer:
     """Main class for scalable log analysis."""
 
-    def __init__(self, base_folder, output_folder=None, max_memory_gb=None):
+    def __init__(self, base_folder, output_folder=None, max_memory_gb=None, mode='mapreduce', resume=True):
         """
         Initialize LogAnalyzer with configurable parameters.
         
@@ -68,7 +286,12 @@ class LogAnalyzer:
             base_folder (str): Path to log files
             output_folder (str): Path for output files (default: base_folder/analysis)
             max_memory_gb (float): Maximum memory usage in GB (default: 70% of system memory)
+            mode (str): 'mapreduce' to merge per-file counters, 'dask' to aggregate temp Parquet with Dask
+            resume (bool): Skip source files the manifest records as finished (default: True)
         """
+        if mode not in ANALYSIS_MODES:
+            raise LogAnalysisError(f"Invalid mode: {mode}")
+        self.mode = mode
         self.base_folder = Path(base_folder)
         self.output_folder = Path(output_folder) if output_folder else self.base_folder / 'analysis'
         self.output_folder.mkdir(parents=True, exist_ok=True)
@@ -76,20 +299,40 @@ class LogAnalyzer:
         # Calculate memory limits
         total_memory = psutil.virtual_memory().total
         self.max_memory = max_memory_gb * 1024**3 if max_memory_gb else total_memory * 0.7
+        self.record_bytes = 1024
         self.chunk_size = self._calculate_chunk_size()
+        if mode == 'dask':
+            self.governor = MemoryGovernor(self.max_memory, self.chunk_size, self.record_bytes)
+        else:
+            # Counting workers parse one batch at a time, so that batch is their working set
+            self.governor = MemoryGovernor(self.max_memory, MEMORY_CHECK_INTERVAL, self.record_bytes,
+                                           adaptive=False)
         
         # Initialize counters
         self.total_lines = 0
         self.error_lines = 0
         self.files_processed = 0
         
-        # Create intermediate storage
-        self.temp_dir = self.output_folder / 'temp'
-        self.temp_dir.mkdir(exist_ok=True)
+        # Per-file partial outputs and the manifest of finished files survive the run
+        self.partials_dir = self.output_folder / PARTIALS_DIR
+        self.partials_dir.mkdir(exist_ok=True)
+        self.manifest = RunManifest(self.output_folder)
+        if not resume:
+            self.manifest.reset()
+        self.files_skipped = 0
         
         # Analysis results storage
         self.analyses = {}
 
+    def __getstate__(self):
+        # Workers receive a pickled copy of the analyzer with every submitted file; the governor,
+        # the manifest and the analyses stay in the parent so that copy does not grow with the run
+        state = self.__dict__.copy()
+        state['governor'] = None
+        state['manifest'] = None
+        state['analyses'] = None
+        return state
+
     def _calculate_chunk_size(self, sample_size=1000):
         """
         Dynamically calculate optimal chunk size based on sample data.
@@ -102,112 +345,130 @@ class LogAnalyzer:
         """
         try:
             # Sample a few log files to estimate memory usage
-            sample_data = []
+            processor = LogProcessor(extra_fields=True)
+            record_sizes = []
             for gz_file in self.base_folder.rglob('*.gz'):
-                with gzip.open(gz_file, 'rt', encoding='utf-8') as f:
-                    for _ in range(min(sample_size, 100)):
-                        try:
-                            line = next(f)
-                            sample_data.append(json.loads(line.strip()))
-                        except (StopIteration, json.JSONDecodeError):
-                            continue
-                if len(sample_data) >= sample_size:
+                with gzip.open(gz_file, 'rb') as f:
+                    columns = processor.parse_batch(islice(f, min(sample_size, 100)))
+                # Size of a record as held in the column lists: each value plus its list slot
+                records = zip(*(columns[name] for name in LOG_COLUMNS.values()))
+                record_sizes.extend(sum(sys.getsizeof(v) + 8 for v in record) for record in records)
+                if len(record_sizes) >= sample_size:
                     break
             
-            if not sample_data:
+            if not record_sizes:
                 return 10000  # Default if sampling fails
             
-            # Calculate average record size
-            avg_record_size = sum(sys.getsizeof(str(d)) for d in sample_data) / len(sample_data)
-            chunk_size = int(self.max_memory * 0.1 / avg_record_size)  # Use 10% of max memory per chunk
+            self.record_bytes = sum(record_sizes) / len(record_sizes)
+            chunk_size = int(self.max_memory * 0.1 / self.record_bytes)  # Use 10% of max memory per chunk
             
-            return max(1000, min(chunk_size, 100000))  # Keep within reasonable bounds
+            return max(MIN_CHUNK_SIZE, min(chunk_size, MAX_CHUNK_SIZE))  # Keep within reasonable bounds
             
         except Exception as e:
             print(f"Warning: Error calculating chunk size: {str(e)}")
             return 10000  # Default fallback
 
-    def _parse_log_entry(self, log_data):
-        """
-        Parse a single log entry from JSON data.
-        
-        Args:
-            log_data (dict): Raw JSON log data
-            
-        Returns:
-            dict: Parsed log entry or None if invalid
-        """
-        try:
-            return {
-                'timestamp': log_data.get('logtime'),
-                'thread': log_data.get('thread'),
-                'level': log_data.get('level'),
-                'class': log_data.get('class'),
-                'message': log_data.get('log'),
-                'container': log_data.get('kubernetes', {}).get('container_name'),
-                'namespace': log_data.get('kubernetes', {}).get('namespace_name'),
-                'pod': log_data.get('kubernetes', {}).get('pod_name'),
-                'host': log_data.get('kubernetes', {}).get('host')
-            }
-        except Exception:
-            return None
+    def _source_name(self, file_path):
+        """Path of a source file relative to base_folder, as recorded in the manifest."""
+        return Path(file_path).relative_to(self.base_folder).as_posix()
 
-    def process_file_streaming(self, file_path):
+    def _partial_path(self, file_path, suffix):
+        """Deterministic partial output path for a source file."""
+        # Hourly folders reuse file names, so the name is built from the path below base_folder
+        source_name = '__'.join(Path(file_path).relative_to(self.base_folder).with_suffix('').parts)
+        return self.partials_dir / f"{source_name}{suffix}"
+
+    def process_file_streaming(self, file_path, chunk_size=None, memory_budget=None):
         """
         Process a single log file using streaming to minimize memory usage.
         
         Args:
             file_path (Path): Path to gzip file
+            chunk_size (int): Records per row group (default: self.chunk_size)
+            memory_budget (float): RSS in bytes above which the chunk is written early and
+                the chunk size halved for the rest of the file (default: no limit)
             
         Returns:
-            tuple: (Path to temp file, lines processed, error count)
+            tuple: (Path to partial Parquet file or None, lines processed, error count)
         """
-        temp_file = self.temp_dir / f"temp_{file_path.stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.parquet"
-        current_chunk = []
+        chunk_size = chunk_size or self.chunk_size
+        process = psutil.Process() if memory_budget else None
+        processor = LogProcessor(extra_fields=True)
+        partial_file = self._partial_path(file_path, '.parquet')
+        # Written under a temporary name so an interrupted file never looks finished
+        temp_file = partial_file.with_name(partial_file.name + '.tmp')
+        columns = [[] for _ in LOG_COLUMNS]
+        rows = 0
         lines_processed = 0
         errors = 0
+        writer = None
 
         try:
-            with gzip.open(file_path, 'rt', encoding='utf-8') as f:
-                for line in f:
-                    lines_processed += 1
-                    try:
-                        log_data = json.loads(line.strip())
-                        entry = self._parse_log_entry(log_data)
-                        if entry:
-                            current_chunk.append(entry)
-                            
-                            # Write chunk to parquet when it reaches chunk size
-                            if len(current_chunk) >= self.chunk_size:
-                                self._save_chunk_to_parquet(current_chunk, temp_file)
-                                current_chunk = []
-                    except Exception:
-                        errors += 1
+            with gzip.open(file_path, 'rb') as f:
+                while True:
+                    batch = list(islice(f, MEMORY_CHECK_INTERVAL))
+                    if not batch:
+                        break
+                    lines_processed += len(batch)
+                    parsed = processor.parse_batch(batch)
+                    errors += len(parsed['invalid_json'])
+                    for column, name in zip(columns, LOG_COLUMNS.values()):
+                        column.extend(parsed[name])
+                    rows += len(parsed['positions'])
+                    
+                    # Under memory pressure, write what is buffered and use smaller chunks
+                    pressure = process is not None and process.memory_info().rss > memory_budget
+                    if pressure:
+                        chunk_size = max(MIN_CHUNK_SIZE, chunk_size // 2)
+                    
+                    # Write one row group when the chunk is full
+                    if rows and (rows >= chunk_size or pressure):
+                        writer = self._write_chunk(writer, columns, temp_file)
+                        columns = [[] for _ in LOG_COLUMNS]
+                        rows = 0
 
                 # Save any remaining records
-                if current_chunk:
-                    self._save_chunk_to_parquet(current_chunk, temp_file)
+                if rows:
+                    writer = self._write_chunk(writer, columns, temp_file)
 
-            return temp_file, lines_processed, errors
+            if writer is None:
+                return None, lines_processed, errors
+            writer.close()
+            writer = None
+            os.replace(temp_file, partial_file)
+            return partial_file, lines_processed, errors
 
         except Exception as e:
             print(f"Error processing {file_path}: {str(e)}")
             return None, lines_processed, errors
+        finally:
+            if writer:
+                writer.close()
 
-    def _save_chunk_to_parquet(self, chunk, file_path, append=True):
+    def _write_chunk(self, writer, columns, file_path):
         """
-        Save a chunk of data to parquet format.
+        Write one chunk of column arrays to a Parquet file as a single row group.
         
         Args:
-            chunk (list): List of log entries
+            writer (pq.ParquetWriter): Open writer, or None to open one on file_path
+            columns (list): One list of values per LOG_COLUMNS entry
             file_path (Path): Output file path
-            append (bool): Whether to append to existing file
+            
+        Returns:
+            pq.ParquetWriter: The open writer, to be reused for the file's next chunks
         """
-        df = pd.DataFrame(chunk)
-        if append and file_path.exists():
-            df.to_parquet(file_path, append=True, engine='fastparquet')
-        else:
-            df.to_parquet(file_path, engine='fastparquet')
+        if writer is None:
+            writer = pq.ParquetWriter(file_path, LOG_SCHEMA, compression='snappy')
+        arrays = []
+        for field, values in zip(LOG_SCHEMA, columns):
+            try:
+                arrays.append(pa.array(values, type=field.type))
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                # The odd numeric level or thread id in a string column is stringified
+                arrays.append(pa.array([v if v is None or isinstance(v, str) else str(v) for v in values],
+                                       type=field.type))
+        writer.write_table(pa.Table.from_arrays(arrays, schema=LOG_SCHEMA))
+        return writer
     def analyze_logs(self):
         """
         Main analysis method using parallel processing and streaming.
@@ -224,39 +485,21 @@ class LogAnalyzer:
                 raise LogAnalysisError("No .gz files found in the specified directory")
 
             print(f"\nFound {total_files} files to process")
-            print(f"Using chunk size of {self.chunk_size} records")
+            print(f"Mode: {self.mode}")
+            print(f"Parse engine: {'arrow' if pa else 'python'}")
+            if self.governor.adaptive:
+                print(f"Using chunk size of {self.chunk_size} records")
             print(f"Maximum memory limit: {self.max_memory / 1024**3:.1f} GB")
+            print(f"Using {self.governor.workers} workers")
             
-            temp_files = []
-            
-            # Process files in parallel
-            with ProcessPoolExecutor() as executor:
-                futures = {executor.submit(self.process_file_streaming, f): f 
-                          for f in gz_files}
-                
-                with tqdm(total=len(futures), desc="Processing files") as pbar:
-                    for future in as_completed(futures):
-                        temp_file, lines, errors = future.result()
-                        if temp_file:
-                            temp_files.append(temp_file)
-                        self.total_lines += lines
-                        self.error_lines += errors
-                        self.files_processed += 1
-                        pbar.update(1)
-                        pbar.set_postfix({
-                            'Lines': self.total_lines,
-                            'Errors': self.error_lines
-                        })
-
-            if not temp_files:
-                raise LogAnalysisError("No valid data processed from log files")
-
-            # Create Dask DataFrame from temporary parquet files
-            print("\nCombining results...")
-            ddf = dd.read_parquet(temp_files)
+            pending, completed = self._split_completed(gz_files)
+            if completed:
+                print(f"Resuming: {len(completed)} of {total_files} files already processed")
             
-            # Perform analyses
-            self.analyses = self._generate_analyses(ddf)
+            if self.mode == 'mapreduce':
+                self.analyses = self._analyze_mapreduce(pending, completed)
+            else:
+                self.analyses = self._analyze_dask(pending, completed)
             
             # Save results
             self._save_analyses()
@@ -273,6 +516,257 @@ class LogAnalyzer:
         finally:
             self._cleanup_temp_files()
 
+    def _split_completed(self, gz_files):
+        """
+        Separate the files still to process from those the manifest records as finished.
+        
+        Args:
+            gz_files (list): Paths of all .gz files under base_folder
+            
+        Returns:
+            tuple: (list of files to process, list of manifest entries of finished files)
+        """
+        pending, completed = [], []
+        for file_path in gz_files:
+            entry = self.manifest.completed(self.mode, self._source_name(file_path), file_path)
+            if entry is None:
+                pending.append(file_path)
+            else:
+                completed.append(entry)
+                self.total_lines += entry['lines']
+                self.error_lines += entry['errors']
+                self.files_skipped += 1
+        return pending, completed
+
+    def count_file_streaming(self, file_path):
+        """
+        Count a single log file into partial counters (the map step of mapreduce mode).
+        
+        Args:
+            file_path (Path): Path to gzip file
+            
+        Returns:
+            tuple: (dict of partial counters and timestamp stats, lines processed, error count)
+        """
+        counts = {name: Counter() for name in PARTIAL_COUNTERS}
+        counts.update({'records': 0, 'null_timestamps': 0, 'start_time': None, 'end_time': None})
+        processor = LogProcessor(extra_fields=True)
+        lines_processed = 0
+        errors = 0
+
+        try:
+            with gzip.open(file_path, 'rb') as f:
+                while True:
+                    batch = list(islice(f, MEMORY_CHECK_INTERVAL))
+                    if not batch:
+                        break
+                    lines_processed += len(batch)
+                    parsed = processor.parse_batch(batch)
+                    errors += len(parsed['invalid_json'])
+                    
+                    levels = ['UNKNOWN' if level is None else str(level).upper() for level in parsed['levels']]
+                    counts['class_pod_level'].update(zip(map(_label, parsed['class_fields']),
+                                                         map(_label, parsed['pods']), levels))
+                    counts['container'].update(map(_label, parsed['containers']))
+                    counts['host'].update(map(_label, parsed['hosts']))
+                    counts['thread'].update(map(_label, parsed['threads']))
+                    counts['records'] += len(levels)
+                    
+                    times = [(time, level) for time, level in zip(parsed['times'], levels) if time is not None]
+                    counts['null_timestamps'] += len(levels) - len(times)
+                    if not times:
+                        continue
+                    counts['hour_level'].update((time.hour, level) for time, level in times)
+                    start_time = min(time for time, _ in times)
+                    end_time = max(time for time, _ in times)
+                    if counts['start_time'] is None or start_time < counts['start_time']:
+                        counts['start_time'] = start_time
+                    if counts['end_time'] is None or end_time > counts['end_time']:
+                        counts['end_time'] = end_time
+
+            return counts, lines_processed, errors
+
+        except Exception as e:
+            print(f"Error processing {file_path}: {str(e)}")
+            return None, lines_processed, errors
+
+    def _run_parallel(self, submit, gz_files, desc):
+        """
+        Run one task per file on a worker pool sized and throttled by the memory governor.
+        
+        At most one file per worker is in flight, and a new one is only submitted while the
+        governor admits it; one file is always kept running so the run cannot stall.
+        
+        Args:
+            submit (callable): submit(executor, file_path) -> Future
+            gz_files (list): Paths of the .gz files to process
+            desc (str): Progress bar description
+            
+        Yields:
+            tuple: (file path, result of its task), in completion order
+        """
+        files = iter(gz_files)
+        pending = {}
+        exhausted = False
+        
+        with ProcessPoolExecutor(max_workers=self.governor.workers) as executor, \
+                tqdm(total=len(gz_files), desc=desc) as pbar:
+            while True:
+                while not exhausted and len(pending) < self.governor.workers and (
+                        not pending or self.governor.admit()):
+                    file_path = next(files, None)
+                    if file_path is None:
+                        exhausted = True
+                    else:
+                        pending[submit(executor, file_path)] = file_path
+                if not pending:
+                    break
+                
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                self.governor.rss()
+                for future in done:
+                    yield pending.pop(future), future.result()
+                    pbar.update(1)
+                    postfix = {'Lines': self.total_lines, 'Errors': self.error_lines}
+                    if self.governor.adaptive:
+                        postfix['Chunk'] = self.governor.chunk_size
+                    pbar.set_postfix(postfix)
+
+    def _analyze_mapreduce(self, gz_files, completed=()):
+        """
+        Count files in parallel and merge the partial counters into all analyses.
+        
+        Args:
+            gz_files (list): Paths of the .gz files to analyze
+            completed (list): Manifest entries of finished files whose saved counters are merged
+            
+        Returns:
+            dict: Analysis results
+        """
+        totals = {name: Counter() for name in PARTIAL_COUNTERS}
+        totals.update({'records': 0, 'null_timestamps': 0, 'start_time': None, 'end_time': None})
+        
+        for entry in completed:
+            with open(self.manifest.output_path(entry), 'rb') as f:
+                self._merge_counts(totals, pickle.load(f))
+        
+        submit = lambda executor, f: executor.submit(self.count_file_streaming, f)
+        for file_path, (counts, lines, errors) in self._run_parallel(submit, gz_files, "Counting files"):
+            if counts:
+                self._merge_counts(totals, counts)
+                self._save_partial_counts(file_path, counts, lines, errors)
+            self.total_lines += lines
+            self.error_lines += errors
+            self.files_processed += 1
+        
+        if not totals['records']:
+            raise LogAnalysisError("No valid data processed from log files")
+        if totals['null_timestamps']:
+            print(f"Warning: {totals['null_timestamps']} timestamps could not be parsed")
+        return self._analyses_from_counts(totals)
+
+    def _save_partial_counts(self, file_path, counts, lines, errors):
+        """Save one file's counters as its partial output and record the file as finished."""
+        partial_file = self._partial_path(file_path, '.counts.pkl')
+        temp_file = partial_file.with_name(partial_file.name + '.tmp')
+        with open(temp_file, 'wb') as f:
+            pickle.dump(counts, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, partial_file)
+        self.manifest.record(self.mode, self._source_name(file_path), file_path, partial_file, lines, errors)
+
+    @staticmethod
+    def _merge_counts(totals, counts):
+        """Add one file's partial counters into the running totals (the reduce step)."""
+        for name in PARTIAL_COUNTERS:
+            totals[name].update(counts[name])
+        totals['records'] += counts['records']
+        totals['null_timestamps'] += counts['null_timestamps']
+        for key, pick in (('start_time', min), ('end_time', max)):
+            values = [value for value in (totals[key], counts[key]) if value is not None]
+            totals[key] = pick(values) if values else None
+
+    def _analyses_from_counts(self, totals):
+        """
+        Build the same analyses as _generate_analyses from merged counters.
+        
+        Args:
+            totals (dict): Merged partial counters
+            
+        Returns:
+            dict: Analysis results
+        """
+        print("\nGenerating analyses...")
+        class_pod_level = pd.Series(totals['class_pod_level'], dtype='int64')
+        class_pod_level.index.names = ['class', 'pod', 'level']
+        class_level = class_pod_level.groupby(level=['class', 'level']).sum()
+
+        def summary(counter, name):
+            series = pd.Series(counter, dtype='int64').sort_index()
+            series.index.name = name
+            return series
+
+        hour_level = pd.Series(totals['hour_level'], dtype='int64')
+        if not hour_level.empty:
+            hour_level.index.names = ['hour', 'level']
+        errors = class_pod_level[class_pod_level.index.get_level_values('level') == 'ERROR']
+        level_summary = class_pod_level.groupby(level='level').sum().sort_values(ascending=False)
+        level_summary.name = 'count'
+
+        return {
+            'class_level_counts': class_level.unstack(fill_value=0).reset_index(),
+            'level_summary': level_summary,
+            'class_summary': class_pod_level.groupby(level='class').sum(),
+            'pod_summary': class_pod_level.groupby(level='pod').sum(),
+            'container_summary': summary(totals['container'], 'container'),
+            'host_summary': summary(totals['host'], 'host'),
+            'class_level_pod': class_pod_level.unstack(fill_value=0).reset_index(),
+            'hourly_level_counts': (hour_level.sort_index().unstack(fill_value=0).reset_index()
+                                    if not hour_level.empty else pd.DataFrame(columns=['hour'])),
+            'thread_summary': summary(totals['thread'], 'thread'),
+            'error_analysis': errors.droplevel('level').sort_values(ascending=False),
+            'time_range': pd.DataFrame([{
+                'start_time': pd.Timestamp(totals['start_time']) if totals['start_time'] else pd.NaT,
+                'end_time': pd.Timestamp(totals['end_time']) if totals['end_time'] else pd.NaT
+            }])
+        }
+
+    def _analyze_dask(self, gz_files, completed=()):
+        """
+        Write partial Parquet files in parallel and aggregate them with Dask.
+        
+        Args:
+            gz_files (list): Paths of the .gz files to analyze
+            completed (list): Manifest entries of finished files whose Parquet files are aggregated too
+            
+        Returns:
+            dict: Analysis results
+        """
+        import dask.dataframe as dd
+        
+        temp_files = [self.manifest.output_path(entry) for entry in completed]
+        
+        # Process files in parallel; each file gets the chunk size current when it starts
+        submit = lambda executor, f: executor.submit(self.process_file_streaming, f,
+                                                     self.governor.chunk_size, self.governor.worker_budget)
+        results = self._run_parallel(submit, gz_files, "Processing files")
+        for file_path, (temp_file, lines, errors) in results:
+            if temp_file:
+                temp_files.append(temp_file)
+                self.manifest.record(self.mode, self._source_name(file_path), file_path, temp_file, lines, errors)
+            self.total_lines += lines
+            self.error_lines += errors
+            self.files_processed += 1
+
+        if not temp_files:
+            raise LogAnalysisError("No valid data processed from log files")
+
+        # Create Dask DataFrame from the partial parquet files
+        print("\nCombining results...")
+        ddf = dd.read_parquet(temp_files)
+        
+        # Perform analyses
+        return self._generate_analyses(ddf)
+
     def _generate_analyses(self, ddf):
         """
         Generate analyses using Dask DataFrame with comprehensive error handling.
@@ -283,12 +777,14 @@ class LogAnalyzer:
         Returns:
             dict: Analysis results
         """
+        import dask
+        
         print("\nGenerating analyses...")
         analyses = {}
         
         try:
             # Validate input DataFrame
-            required_columns = ['timestamp', 'level', 'class', 'pod', 'container', 'host', 'thread']
+            required_columns = ['time', 'level', 'class', 'pod', 'container', 'host', 'thread']
             missing_columns = [col for col in required_columns if col not in ddf.columns]
             if missing_columns:
                 raise ValueError(f"Missing required columns: {', '.join(missing_columns)}")
@@ -306,60 +802,48 @@ class LogAnalyzer:
             ddf['host'] = ddf['host'].fillna('UNKNOWN')
             ddf['thread'] = ddf['thread'].fillna('UNKNOWN')
 
-            # Convert timestamps with error handling
-            print("Converting timestamps...")
-            try:
-                ddf['parsed_timestamp'] = dd.to_datetime(
-                    ddf['timestamp'],
-                    format='%d/%b/%Y:%H:%M:%S +0000',
-                    errors='coerce'
-                )
-                # Check for null timestamps after conversion
-                null_timestamps = ddf['parsed_timestamp'].isnull().compute().sum()
-                if null_timestamps > 0:
-                    print(f"Warning: {null_timestamps} timestamps could not be parsed")
-                
-                ddf['hour'] = ddf['parsed_timestamp'].dt.hour
-            except Exception as e:
-                raise ValueError(f"Error parsing timestamps: {str(e)}")
-
-            analysis_tasks = [
-                ('class_level_counts', lambda: ddf.groupby(['class', 'level'])
-                    .size().compute().unstack(fill_value=0).reset_index()),
-                ('level_summary', lambda: ddf.level.value_counts().compute()),
-                ('class_summary', lambda: ddf.groupby('class').size().compute()),
-                ('pod_summary', lambda: ddf.groupby('pod').size().compute()),
-                ('container_summary', lambda: ddf.groupby('container').size().compute()),
-                ('host_summary', lambda: ddf.groupby('host').size().compute()),
-                ('class_level_pod', lambda: ddf.groupby(['class', 'pod', 'level'])
-                    .size().compute().unstack(fill_value=0).reset_index()),
-                ('hourly_level_counts', lambda: ddf.groupby(['hour', 'level'])
-                    .size().compute().unstack(fill_value=0).reset_index()),
-                ('thread_summary', lambda: ddf.groupby('thread').size().compute()),
-                ('error_analysis', lambda: ddf[ddf.level == 'ERROR']
-                    .groupby(['class', 'pod']).size().compute().sort_values(ascending=False)),
-                ('time_range', lambda: pd.DataFrame([{
-                    'start_time': ddf['parsed_timestamp'].min().compute(),
-                    'end_time': ddf['parsed_timestamp'].max().compute()
-                }]))
-            ]
-
-            with tqdm(total=len(analysis_tasks), desc="Generating analyses") as pbar:
-                for name, task in analysis_tasks:
-                    try:
-                        pbar.set_description(f"Generating {name}")
-                        result = task()
-                        
-                        # Validate result is not empty
-                        if result.empty:
-                            print(f"\nWarning: {name} analysis produced empty result")
-                        
-                        analyses[name] = result
-                        pbar.update(1)
-                    except Exception as e:
-                        error_msg = f"\nError generating {name}: {str(e)}"
-                        print(error_msg)
-                        raise LogAnalysisError(error_msg)
+            # Log times were parsed by LogProcessor when the partial files were written
+            ddf['parsed_timestamp'] = ddf['time']
+            ddf['hour'] = ddf['parsed_timestamp'].dt.hour
+
+            # Read and clean once; every aggregation below reuses the persisted partitions.
+            # The message column is not needed for counting and is dropped before persisting.
+            ddf = ddf[['level', 'class', 'pod', 'container', 'host', 'thread', 'parsed_timestamp', 'hour']].persist()
+
+            lazy_results = {
+                'class_level_counts': ddf.groupby(['class', 'level']).size(),
+                'level_summary': ddf.level.value_counts(),
+                'class_summary': ddf.groupby('class').size(),
+                'pod_summary': ddf.groupby('pod').size(),
+                'container_summary': ddf.groupby('container').size(),
+                'host_summary': ddf.groupby('host').size(),
+                'class_level_pod': ddf.groupby(['class', 'pod', 'level']).size(),
+                'hourly_level_counts': ddf.groupby(['hour', 'level']).size(),
+                'thread_summary': ddf.groupby('thread').size(),
+                'error_analysis': ddf[ddf.level == 'ERROR'].groupby(['class', 'pod']).size(),
+                'start_time': ddf['parsed_timestamp'].min(),
+                'end_time': ddf['parsed_timestamp'].max(),
+                'null_timestamps': ddf['parsed_timestamp'].isnull().sum()
+            }
+            print("Computing all analyses in a single pass...")
+            results = dict(zip(lazy_results, dask.compute(*lazy_results.values())))
+            
+            if results['null_timestamps'] > 0:
+                print(f"Warning: {results['null_timestamps']} timestamps could not be parsed")
+            for name in ('class_level_counts', 'class_level_pod', 'hourly_level_counts'):
+                results[name] = results[name].unstack(fill_value=0).reset_index()
+            results['error_analysis'] = results['error_analysis'].sort_values(ascending=False)
+            results['time_range'] = pd.DataFrame([{
+                'start_time': results.pop('start_time'),
+                'end_time': results.pop('end_time')
+            }])
+            del results['null_timestamps']
+
+            for name, result in results.items():
+                # Validate result is not empty
+                if result.empty:
+                    print(f"\nWarning: {name} analysis produced empty result")
+                analyses[name] = result
 
             # Validate final results
             if not analyses:
@@ -384,7 +868,7 @@ class LogAnalyzer:
             pass
 
     def _save_analyses(self):
-        """Save analysis results to CSV files."""
+        """Save analysis results to CSV files and to one bundle the CSV Visualization tab loads directly."""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         
         print("\nSaving analysis files...")
@@ -392,6 +876,51 @@ class LogAnalyzer:
             output_file = self.output_folder / f"{name}_{timestamp}.csv"
             data.to_csv(output_file)
             print(f"Saved {name} to {output_file}")
+        
+        try:
+            from analyzer.bundle import BUNDLE_SUFFIX, write_bundle
+        except ImportError as e:
+            print(f"Warning: Skipping the analysis bundle, pyarrow is not available: {str(e)}")
+            return
+        bundle_file = write_bundle(
+            self.output_folder / f"analyses_{timestamp}{BUNDLE_SUFFIX}",
+            self._bundle_frames(),
+            {
+                'base_folder': str(self.base_folder),
+                'mode': self.mode,
+                'files': self.files_processed + self.files_skipped,
+                'total_lines': self.total_lines,
+                'error_lines': self.error_lines
+            }
+        )
+        print(f"Saved all analyses to {bundle_file}")
+
+    def _bundle_frames(self):
+        """
+        Analyses in the long shape the CSV Visualization tab charts.
+        
+        Series become (index columns, count) tables, level pivots are melted back into
+        (id columns, level, count) rows without the zero cells, and repeated labels are
+        stored once as dictionary-encoded (categorical) columns.
+        
+        Returns:
+            dict: One DataFrame per analysis
+        """
+        frames = {}
+        for name, data in self.analyses.items():
+            if isinstance(data, pd.Series):
+                df = data.rename('count').reset_index()
+            elif name in PIVOT_ID_COLUMNS:
+                df = data.melt(id_vars=PIVOT_ID_COLUMNS[name], var_name='level', value_name='count')
+                df = df[df['count'] > 0].reset_index(drop=True)
+            elif name == 'time_range':
+                df = data.assign(event='logs')
+            else:
+                df = data.copy()
+            for column in df.select_dtypes(include=['object', 'string']).columns:
+                df[column] = df[column].astype(str).astype('category')
+            frames[name] = df
+        return frames
 
     def _print_summary(self):
         """Print human-readable summary of analysis results."""
@@ -425,18 +954,25 @@ class LogAnalyzer:
         # Processing statistics
         print("\nProcessing Statistics:")
         print(f"Files Processed: {self.files_processed:,d}")
+        if self.files_skipped:
+            print(f"Files Reused From Earlier Runs: {self.files_skipped:,d}")
         print(f"Total Lines: {self.total_lines:,d}")
         print(f"Error Lines: {self.error_lines:,d}")
         if self.total_lines > 0:
             success_rate = ((self.total_lines - self.error_lines) / self.total_lines) * 100
             print(f"Success Rate: {success_rate:.2f}%")
+        if self.governor.peak_rss:
+            print(f"Peak RSS (all workers): {self.governor.peak_rss / 1024**3:.2f} GB")
+        if self.governor.throttled and self.governor.adaptive:
+            print(f"Throttled {self.governor.throttled} times; final chunk size {self.governor.chunk_size:,d}")
+        elif self.governor.throttled:
+            print(f"Throttled {self.governor.throttled} times")
 
     def _cleanup_temp_files(self):
-        """Clean up temporary files and directory."""
+        """Remove partial outputs left half-written by an interrupted file; finished ones are kept for resuming."""
         try:
-            for file in self.temp_dir.glob('*.parquet'):
+            for file in self.partials_dir.glob('*.tmp'):
                 file.unlink()
-            self.temp_dir.rmdir()
         except Exception as e:
             print(f"Warning: Error cleaning up temporary files: {str(e)}")
 
@@ -445,20 +981,24 @@ def main():
     print("Scalable Log Analysis Tool")
     print("-" * 80)
     
+    parser = argparse.ArgumentParser(description="Analyze gzipped JSON log files")
+    parser.add_argument('base_folder', nargs='?', help="Path to log files (prompted for if omitted)")
+    parser.add_argument('max_memory_gb', nargs='?', type=float, default=None,
+                        help="Maximum memory usage in GB (default: 70%% of system memory)")
+    parser.add_argument('--mode', choices=ANALYSIS_MODES, default='mapreduce',
+                        help="mapreduce merges per-file counters; dask aggregates temp Parquet files")
+    parser.add_argument('--output', default=None, help="Output folder (default: BASE_FOLDER/analysis)")
+    parser.add_argument('--fresh', action='store_true',
+                        help="Ignore the manifest of finished files and process every file again")
+    args = parser.parse_args()
+    
     try:
         # Get input path
-        if len(sys.argv) > 1:
-            base_folder = sys.argv[1]
-        else:
-            base_folder = input("Enter path to log files: ").strip()
-        
-        # Optional memory limit
-        max_memory = None
-        if len(sys.argv) > 2:
-            max_memory = float(sys.argv[2])
+        base_folder = args.base_folder or input("Enter path to log files: ").strip()
         
         # Initialize and run analyzer
-        analyzer = LogAnalyzer(base_folder, max_memory_gb=max_memory)
+        analyzer = LogAnalyzer(base_folder, output_folder=args.output, max_memory_gb=args.max_memory_gb,
+                               mode=args.mode, resume=not args.fresh)
         analyzer.analyze_logs()
         
     except KeyboardInterrupt: